@@ -1,40 +1,67 @@
 import streamlit as st
-import pandas as pd
-import FinanceDataReader as fdr
+from utils import equity, portfolio, risk
 from datetime import date, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-from matplotlib import rc
+import numpy as np
+import pandas as pd
 
-# 그래프 폰트
-plt.rcParams['font.family'] = 'Malgun Gothic'
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_equity_curve(user_id, seed_money, today):
+    """어제까지의 일별 총 자산 (새 거래/종가만 반영해 스냅샷을 덧붙인 뒤 읽음, 날짜별로 한 번)"""
+    return equity.get_store().curve(user_id, seed_money, today)["total_asset"]
+
+@st.cache_data(ttl=600)
+def get_last_prices(stock_names):
+    """보유 종목 전체의 현재가 (한 번에 조회)"""
+    return portfolio.fetch_last_prices(stock_names)
+
+@st.cache_data(ttl=3600, show_spinner="위험 지표 계산 중...")
+def get_risk_report(version, today, _holdings, _equity=None):
+    """보유 내역 버전과 날짜별로 한 번만 계산 (_holdings, _equity 는 캐시 키에서 제외 — 둘 다 거래/날짜가 바뀔 때만 바뀜)"""
+    return risk.portfolio_risk(_holdings.names, _holdings.quantities, _holdings.cash, today, equity=_equity)
+
+
+def show_risk_panel(report):
+    st.subheader("위험 분석")
+    confidence = f"{report['confidence']:.0%}"
+    col1, col2, col3 = st.columns(3)
+    col1.metric("연 변동성", f"{report['volatility']:.1%}")
+    col2.metric("KOSPI 대비 베타", "-" if np.isnan(report["beta"]) else f"{report['beta']:.2f}")
+    col3.metric(f"최대 낙폭 ({report['drawdown_basis']})", f"{report['max_drawdown']:.1%}")
+    col1, col2 = st.columns(2)
+    col1.metric(f"1일 VaR {confidence} (과거 수익률)", f"{report['var'] * report['stock_value']:,.0f}원",
+                f"CVaR {report['cvar'] * report['stock_value']:,.0f}원", delta_color="off")
+    col2.metric(f"{report['horizon']}일 VaR {confidence} (몬테카를로)", f"{report['mc_var'] * report['stock_value']:,.0f}원",
+                f"CVaR {report['mc_cvar'] * report['stock_value']:,.0f}원", delta_color="off")
+    st.caption(f"최근 {report['days']}거래일 기준. VaR 는 주식 평가액에서 해당 신뢰수준으로 예상되는 최대 손실, "
+               f"CVaR 는 그보다 큰 손실의 평균입니다. 최대 낙폭 구간: "
+               f"{report['drawdown_peak']:%Y-%m-%d} → {report['drawdown_trough']:%Y-%m-%d}"
+               + (" (자산 기록이 없어 지금 보유 종목을 과거 가격에 대입한 가정치)" if report["drawdown_basis"] == risk.HYPOTHETICAL else ""))
+    st.dataframe(report["assets"], use_container_width=True, hide_index=True)
+    if len(report["correlation"]) > 1:
+        fig = px.imshow(report["correlation"], zmin=-1, zmax=1, color_continuous_scale="RdBu_r", title="종목 간 상관계수")
+        st.plotly_chart(fig, use_container_width=True)
 
-@st.cache_data
-def get_historical_prices(stock_name, start_date, end_date):
-    """종목의 과거 가격 가져오기"""
-    try:
-        return fdr.DataReader(stock_name, start_date, end_date)
-    except Exception:
-        return pd.DataFrame()
 
 # UI
 st.title("마이페이지")
 if st.session_state.user1:
     user = st.session_state.user1
 
-    # 현재 자산 계산
-    total_stock_value = sum(stock.purchase_price * stock.count for stock in user.stocks)
-    total_asset = user.money + total_stock_value
-    proceeds = total_asset - user.seed_money
-    roi = (proceeds / user.seed_money) * 100 
+    # 현재 자산 계산 (현재가 기준 평가)
+    holdings = portfolio.Portfolio.from_user(user)
+    valuation = holdings.mark_to_market(get_last_prices(tuple(holdings.names)))
+    total_asset = valuation["total_asset"]
+    proceeds = valuation["proceeds"]
+    roi = valuation["roi"]
 
     # 사용자 정보 표시
     st.subheader("현재 자산 상황")
     st.write(f"👤 이름: {user.name}")
-    st.write(f"💼 총 자산: {total_asset:,}원")
-    st.write(f"🤑 수익금: {proceeds:,}원")
+    st.write(f"💼 총 자산: {total_asset:,.0f}원")
+    st.write(f"🤑 수익금: {proceeds:,.0f}원 (평가 손익 {valuation['unrealized_pnl']:,.0f}원 / 실현 손익 {valuation['realized_pnl']:,.0f}원)")
     st.write(f"💰 현금 자산: {user.money:,}원")
     st.metric(
         label="💸 총 투자 수익률",
@@ -45,28 +72,30 @@ if st.session_state.user1:
     # 보유 주식 요약
     st.subheader("보유 종목 요약")
     if user.stocks:
-        # stocks 리스트를 DataFrame으로 변환
-        stock_data = [
-            {"종목": stock.name, "구매가": stock.purchase_price, "보유 개수": stock.count}
-            for stock in user.stocks
-        ]
-        stock_df = pd.DataFrame(stock_data)
-        
-        # 자산 가치 계산 열 추가
-        stock_df["자산 가치"] = stock_df["보유 개수"] * stock_df["구매가"]
-        st.dataframe(stock_df[["종목", "구매가", "보유 개수", "자산 가치"]], use_container_width=True, hide_index= True)
+        stock_df = valuation["positions"]
+        st.dataframe(stock_df, use_container_width=True, hide_index= True)
     else:
         st.write("보유 종목이 없습니다.")
 
+    # 위험 분석 (보유 종목이 바뀌거나 날짜가 바뀔 때만 다시 계산)
+    if user.stocks:
+        # 최대 낙폭은 거래 시점의 보유 내역으로 쌓은 일별 자산 스냅샷 기준 (DB 계좌가 아니면 현재 보유 가정)
+        snapshots = None
+        if getattr(user, "user_id", None) is not None:
+            snapshots = get_equity_curve(user.user_id, user.seed_money, date.today())
+        report = get_risk_report(holdings.version, date.today(), holdings, snapshots)
+        if report is not None:
+            show_risk_panel(report)
+
     # 종목 비중
     st.subheader("종목 비중")
-    portfolio = {stock.name: stock.purchase_price* stock.count for stock in user.stocks}
-    portfolio["현금"] = user.money
+    portfolio_values = dict(zip(holdings.names, valuation["positions"]["자산 가치"]))
+    portfolio_values["현금"] = user.money
 
     # Plotly Pie Chart
     fig1 = px.pie(
-        names=portfolio.keys(),
-        values=portfolio.values(),
+        names=portfolio_values.keys(),
+        values=portfolio_values.values(),
         title="포트폴리오 비중",
         hole=0.3,  # 도넛 차트 스타일
     )
@@ -85,20 +114,16 @@ if st.session_state.user1:
     start_date = st.date_input("시작 날짜", value=date.today() - timedelta(days=30))
     end_date = st.date_input("종료 날짜", value=date.today())
 
-    historical_df = pd.DataFrame()
-    for stock in user.stocks:
-        df = get_historical_prices(stock.name, start_date, end_date)
-        if not df.empty:
-            df["name"] = stock.name
-            df["quantity"] = stock.count
-            df["value"] = df["Close"] * stock.count
-            historical_df = pd.concat([historical_df, df])
-
-    if not historical_df.empty:
-        historical_df.reset_index(inplace=True)
-        historical_df.rename(columns={"index": "날짜"}, inplace=True)
-        total_historical = historical_df.groupby("날짜")["value"].sum().reset_index()
-        total_historical["total_asset"] = total_historical["value"] + user.money
+    # 거래 시점의 보유 내역으로 쌓아 둔 일별 스냅샷 + 오늘은 현재가 기준 평가액
+    history = pd.Series([total_asset], index=[pd.Timestamp(date.today())])
+    if getattr(user, "user_id", None) is not None:
+        snapshots = get_equity_curve(user.user_id, user.seed_money, date.today())
+        if not snapshots.empty:
+            history = pd.concat([snapshots, history])
+    history = history.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+
+    if not history.empty:
+        total_historical = history.rename("total_asset").rename_axis("날짜").reset_index()
 
         # 데이터 요약
         max_asset = total_historical["total_asset"].max()
@@ -0,0 +1,80 @@
+import streamlit as st
+from utils import listing, screener
+
+st.title("종목 스크리너")
+st.markdown("#### 전체 상장 종목을 한 번에 비교해 보세요")
+
+# 조건 입력의 기본값 — 기본값 그대로인 조건은 적용하지 않음 (지표가 NaN 인 신규 상장 종목 등이 빠지지 않도록)
+DEFAULT_MIN_RETURN = -100.0
+DEFAULT_MAX_VOLATILITY = 200.0
+DEFAULT_MIN_VOLUME_SPIKE = 0.0
+DEFAULT_RSI_RANGE = (0, 100)
+
+
+def changed(value, default):
+    """사용자가 기본값에서 바꾼 조건만 반환 (그대로면 None)"""
+    return None if value == default else value
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_universe(lookback_days):
+    """로컬 저장소의 전체 종목 종가/거래량 행렬 (한 시간 캐시)"""
+    stocks = listing.get_listing()
+    return screener.load_universe(stocks.codes, lookback_days)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_screen_table(lookback_days):
+    codes, dates, close, volume = get_universe(lookback_days)
+    return screener.screen(codes, close, volume, listing.get_listing().code_to_name), dates
+
+
+@st.cache_resource(show_spinner=False)
+def get_sync():
+    """프로세스 전체에서 하나만 도는 전체 종목 동기화 작업"""
+    return screener.UniverseSync()
+
+
+@st.fragment(run_every=1)
+def show_sync_progress(sync):
+    """백그라운드 동기화 진행률 (끝나면 캐시를 비우고 페이지 전체를 다시 그림)"""
+    if sync.running:
+        failed = f", 실패 {sync.failed}" if sync.failed else ""
+        st.progress(sync.done / max(sync.total, 1), text=f"데이터 동기화 중... ({sync.done}/{sync.total}{failed})")
+        return
+    get_universe.clear()
+    get_screen_table.clear()
+    st.rerun()
+
+
+lookback_days = 120
+sync = get_sync()
+# 최초 1회는 오래 걸리므로 백그라운드에서 받아오고, 그동안 화면은 지금 있는 데이터로 그림
+if st.button("전체 종목 데이터 동기화", disabled=sync.running):
+    sync.start(listing.get_listing().codes, lookback_days)
+if sync.running:
+    show_sync_progress(sync)
+
+table, dates = get_screen_table(lookback_days)
+if table.empty:
+    st.warning("로컬 저장소에 데이터가 없습니다. 먼저 전체 종목 데이터를 동기화하세요.")
+else:
+    st.caption(f"{len(table):,}개 종목, 기준일 {dates[-1].date()}")
+
+    # 조건
+    col1, col2 = st.columns(2)
+    min_return = col1.number_input("20일 수익률 최소(%)", value=DEFAULT_MIN_RETURN, step=1.0)
+    max_volatility = col2.number_input("변동성 최대(%)", value=DEFAULT_MAX_VOLATILITY, step=5.0)
+    min_volume_spike = col1.number_input("거래량 급증 최소(배)", value=DEFAULT_MIN_VOLUME_SPIKE, step=0.5)
+    rsi_range = col2.slider("RSI 범위", 0, 100, DEFAULT_RSI_RANGE)
+    above_sma = st.checkbox("20일 이동평균선 위 종목만")
+    sort_by = st.selectbox("정렬 기준", [c for c in table.columns if c not in ("종목코드", "회사명")], index=3)
+
+    result = screener.apply_filters(table,
+                                    changed(min_return, DEFAULT_MIN_RETURN),
+                                    changed(max_volatility, DEFAULT_MAX_VOLATILITY),
+                                    changed(min_volume_spike, DEFAULT_MIN_VOLUME_SPIKE),
+                                    changed(tuple(rsi_range), DEFAULT_RSI_RANGE),
+                                    above_sma, sort_by)
+    st.subheader(f"검색 결과 {len(result):,}종목")
+    st.dataframe(result, use_container_width=True, hide_index=True)
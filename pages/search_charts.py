@@ -1,103 +1,90 @@
 import streamlit as st
 import pandas as pd
-import FinanceDataReader as fdr
 import datetime
-import plotly.graph_objects as go
-import numpy as np
-import tensorflow as tf
-from sklearn.preprocessing import MinMaxScaler
+import json
+from utils import charts, evaluation, forecast, indicators, listing, models, ohlcv_store
 
 st.title("차트 검색")
 
-# LSTM 모델 로드
-model = tf.keras.models.load_model('./model/keras_model_삼성전자.h5')
-
-# Scaler 설정
-scaler = MinMaxScaler()
-
-# 주가 정보 가져오기
-@st.cache_data
-def get_stock_info():
-    """KRX 상장 종목 정보를 가져오기"""
-    base_url = "http://kind.krx.co.kr/corpgeneral/corpList.do"
-    method = "download"
-    url = f"{base_url}?method={method}"
-    stock_info = pd.read_html(url, header=0, encoding="cp949")[0]
-    stock_info["종목코드"] = stock_info["종목코드"].apply(lambda x: f"{x:06d}")
-    stock_info = stock_info[["회사명", "종목코드"]]
-    return stock_info
-
-# 종목 코드 찾기
-def get_ticker_symbol(company_name):
-    df = get_stock_info()
-    code = df[df['회사명'] == company_name]['종목코드'].values
-    return code[0] if len(code) > 0 else None
-
-# 충분한 과거 데이터를 확보하는 함수
-def load_two_years_data(ticker_symbol, today):
-    start_date = today - datetime.timedelta(days=730)  # 2년 전
-    df = fdr.DataReader(f'KRX:{ticker_symbol}', start_date, today)
-    df = df[['Close']]
-    return df
+# LSTM 모델 백그라운드 워밍업 (프로세스당 한 번)
+models.start_warm_up()
+
+# 차트에 겹쳐 그리는 지표 / 아래 별도 차트로 그리는 지표
+PRICE_OVERLAYS = {
+    "이동평균(SMA)": ["SMA 5", "SMA 20", "SMA 60"],
+    "지수이동평균(EMA)": ["EMA 20"],
+    "볼린저 밴드": ["볼린저 상단", "볼린저 중심", "볼린저 하단"],
+    "VWAP": ["VWAP"],
+}
+OSCILLATORS = {
+    "RSI": ["RSI 14"],
+    "MACD": ["MACD", "MACD 시그널", "MACD 히스토그램"],
+    "ATR": ["ATR 14"],
+}
+
+@st.cache_data(ttl=600, max_entries=100, show_spinner=False)
+def get_indicators(ticker_symbol, start_p, end_p):
+    """(종목, 기간)별 보조 지표 — 표시할 지표를 바꿔도 다시 받아오거나 계산하지 않음"""
+    df = ohlcv_store.read(f'KRX:{ticker_symbol}', start_p, end_p)
+    return indicators.compute_all(df) if not df.empty else df
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_prices(ticker_symbol, stock_name, start_p, end_p, today):
+    """기간의 일봉과 (종료일이 미래이면) 종료일까지의 예측 종가"""
+    if end_p > today:
+        df = ohlcv_store.read(f'KRX:{ticker_symbol}', start_p, today + datetime.timedelta(days=1))
+        # 종료일까지 예측 (예측 서비스에서 캐시됨)
+        future_df = forecast.forecast_close(ticker_symbol, stock_name, (end_p - today).days, today)
+    else:
+        df = ohlcv_store.read(f'KRX:{ticker_symbol}', start_p, end_p)
+        future_df = pd.DataFrame()
+    return df, future_df
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_chart(ticker_symbol, stock_name, start_p, end_p, today, resolution, selected_indicators):
+    """(종목, 기간, 해상도, 지표)별로 만든 차트를 직렬화해 캐시 — 다시 실행해도 차트를 새로 만들지 않음"""
+    df, future_df = get_prices(ticker_symbol, stock_name, start_p, end_p, today)
+    overlays, oscillators = None, []
+    if selected_indicators:
+        indicator_df = get_indicators(ticker_symbol, start_p, min(end_p, today))
+        columns = [column for name in selected_indicators for column in PRICE_OVERLAYS.get(name, []) if column in indicator_df]
+        overlays = indicator_df[columns] if columns else None
+        oscillators = [(name, indicator_df[OSCILLATORS[name]]) for name in selected_indicators
+                       if name in OSCILLATORS and OSCILLATORS[name][0] in indicator_df]
+    fig, oscillator_figs = charts.price_figure(df, future_df, f'{stock_name} 주가 데이터', resolution, overlays, oscillators)
+    return fig.to_json(), [osc_fig.to_json() for osc_fig in oscillator_figs]
+
+@st.cache_data(ttl=3600, max_entries=20, show_spinner="과거 예측을 평가하는 중...")
+def get_evaluation(ticker_symbol, stock_name, today):
+    """과거 2년 전 시점에서의 예측 정확도 (종목/날짜별 최대 1시간 캐시 — 모델이 새로 학습되면 다음 계산부터 반영)"""
+    return evaluation.evaluate_ticker(ticker_symbol, stock_name, today)
 
 # 종목 검색 및 선택
-stock_info = get_stock_info()
-search_term = st.text_input("종목 검색 (회사명 입력)", key="search_stock")
-filtered_stocks = stock_info[stock_info["회사명"].str.contains(search_term, na=False)] if search_term else stock_info
+search_term = st.text_input("종목 검색 (회사명 또는 초성 입력)", key="search_stock")
+filtered_stocks = listing.search(search_term)
 
-if not filtered_stocks.empty:
-    stock_name = st.selectbox("검색 결과", filtered_stocks["회사명"], key="selected_stock")
+if filtered_stocks:
+    stock_name = st.selectbox("검색 결과", filtered_stocks, key="selected_stock")
 
 date_range = [st.date_input('시작일 입력', max_value= datetime.datetime.now()  - datetime.timedelta(days=1)), st.date_input('종료일 입력')]
+selected_indicators = st.multiselect("보조 지표", list(PRICE_OVERLAYS) + list(OSCILLATORS))
+resolution_choice = st.selectbox("차트 해상도", ["자동"] + list(charts.RESOLUTIONS),
+                                 help="자동: 기간이 길면 주봉/월봉으로 묶어서 표시")
+evaluation_mode = st.checkbox("예측 정확도 평가 (과거 데이터로 모델 검증)")
 
 if stock_name and date_range[0] and date_range[1]:
-    ticker_symbol = get_ticker_symbol(stock_name)
+    ticker_symbol = listing.get_ticker_symbol(stock_name)
     start_p = date_range[0]
     end_p = date_range[1] + datetime.timedelta(days=1) 
     today = datetime.date.today()
 
-    # 미래 예측
-    if end_p > today:
-        df = fdr.DataReader(f'KRX:{ticker_symbol}', start_p, today + datetime.timedelta(days=1))
-        last_date = df.index.max()
-        # 지난 2년간 데이터 불러오기
-        past_2y_data = load_two_years_data(ticker_symbol, today)
-        # 스케일링
-        scaler = MinMaxScaler()
-        scaled_data = scaler.fit_transform(past_2y_data)
-
-        x = []
-        for i in range(len(scaled_data) - 100):
-            x.append(scaled_data[i:i + 100])
-        x = np.array(x)
-        last_sequence = scaled_data[-100:]
-        future_predictions = []
-
-        predict_days = (end_p - today).days
-        for _ in range(predict_days):
-            # 모델로 예측
-            next_scaled = model.predict(last_sequence[np.newaxis, :, :])
-            future_predictions.append(next_scaled[0, 0])
-
-            # 새로운 값 추가 후 시퀀스 업데이트
-            next_scaled_sequence = np.vstack([last_sequence[1:], next_scaled.reshape(1, -1)])
-            last_sequence = next_scaled_sequence
-        # 예측값 스케일 복원
-        future_predictions = scaler.inverse_transform(np.array(future_predictions).reshape(-1, 1))
-
-        # future_predictions 조정
-        adjustment_value = future_predictions[0, 0] - df['Close'].iloc[-1]
-        future_predictions -= adjustment_value
-
-        # 예측 정리
-        future_dates = [last_date + datetime.timedelta(days=i) for i in range(0, predict_days)]
-        future_df = pd.DataFrame({'Close': future_predictions.flatten()}, index=future_dates)
-    else:
-        df = fdr.DataReader(f'KRX:{ticker_symbol}', start_p, end_p)
-        future_df = pd.DataFrame()
+    df, future_df = get_prices(ticker_symbol, stock_name, start_p, end_p, today)
+    resolution = charts.choose_resolution(len(df)) if resolution_choice == "자동" else resolution_choice
+    fig_json, oscillator_jsons = get_chart(ticker_symbol, stock_name, start_p, end_p, today, resolution,
+                                           tuple(selected_indicators))
 
     ## 표 이름 한글로 수정
-    df.rename(columns={
+    table = df.rename(columns={
         'Date': '날짜',
         'Close': '종가',
         'Open': '시가',
@@ -110,39 +97,32 @@ if stock_name and date_range[0] and date_range[1]:
         'Amount': '금액',
         'MarCap': '시가총액',
         'Shares': '발행주식수'
-    }, inplace=True)
+    })
 
-    # 변경된 데이터 출력
+    # 변경된 데이터 출력 (한 번에 한 페이지씩)
     st.subheader(f"{stock_name} 주가 데이터")
-    st.dataframe(df)
-
-    # 그래프
-    fig = go.Figure()
-
-    ## 종가(Close) 라인 차트 추가
-    fig.add_trace(go.Scatter(x=df.index, y=df['종가'],
-                         mode='lines',
-                         name='종가'))
-
-    # 캔들 차트 추가
-    if '시가' in df.columns:
-        fig.add_trace(go.Candlestick(x=df.index,
-                                 open=df['시가'],
-                                 high=df['고가'],
-                                 low=df['저가'],
-                                 close=df['종가'],
-                                 name='켄들 스틱'))
-
-    # 예측 주가 라인 (빨간색)
-    if not future_df.empty:
-        fig.add_trace(go.Scatter(x=future_df.index, y=future_df['Close'],
-                                 mode='lines',
-                                 name='예측 종가',
-                                 line=dict(color='red', dash='dot')))
-
-    fig.update_layout(title=f'{stock_name} 주가 데이터',
-                      xaxis_title='Date',
-                      yaxis_title='Price (KRW)',
-                      template='plotly_dark')
-    
-    st.plotly_chart(fig, use_container_width=True)
+    pages = charts.page_count(table)
+    page = st.number_input(f"페이지 (전체 {pages}쪽, {len(table):,}행)", min_value=1, max_value=pages, value=1, step=1)
+    st.dataframe(charts.page_of(table, page))
+
+    st.plotly_chart(json.loads(fig_json), use_container_width=True)
+    badge = evaluation.confidence_badge(ticker_symbol) if not future_df.empty else None
+    if badge:
+        st.caption(badge)
+    warning = forecast.range_warning(future_df) if not future_df.empty else None
+    if warning:
+        st.caption(warning)
+    for osc_json in oscillator_jsons:
+        st.plotly_chart(json.loads(osc_json), use_container_width=True)
+
+    # 예측 정확도 평가
+    if evaluation_mode:
+        result = get_evaluation(ticker_symbol, stock_name, today)
+        if result is None:
+            st.write("평가에 필요한 데이터가 부족합니다.")
+        else:
+            scores, pred, actual = result
+            st.subheader(f"{stock_name} 예측 정확도")
+            st.dataframe(scores, use_container_width=True, hide_index=True)
+            horizon = st.selectbox("비교할 예측 기간(일)", list(pred.columns))
+            st.plotly_chart(evaluation.evaluation_figure(pred, actual, horizon, f'{stock_name} 예측 vs 실제'), use_container_width=True)
@@ -1,165 +1,170 @@
 
 import streamlit as st
-import FinanceDataReader as fdr
-import tensorflow as tf
-import plotly.graph_objects as go
-import pandas as pd
 import datetime
 import requests
-import numpy as np
-from sklearn.preprocessing import MinMaxScaler
+import pandas as pd
+from utils import evaluation, exchange, forecast, listing, models, ohlcv_store, quotes, tasks
+from utils.account import Trade
 
-# LSTM 모델 로드
-model = tf.keras.models.load_model('./model/keras_model_삼성전자.h5')
+# LSTM 모델 백그라운드 워밍업 (프로세스당 한 번)
+models.start_warm_up()
 
-# Scaler 설정
-scaler = MinMaxScaler()
 
-try:
-    # API 요청
-    response = requests.get("https://api.ivl.is/hangangtemp/")
+def get_hangang_temperature():
+    """한강 수온 API 요청"""
+    response = requests.get("https://api.ivl.is/hangangtemp/", timeout=5)
     response.raise_for_status()  # HTTP 에러 확인
-
     # JSON 데이터 파싱
-    data = response.json()
+    return response.json()
 
+
+def show_hangang_temperature(data):
     # 결과 출력
     st.subheader(f"지금 한강물, {data['temperature']}℃")
     st.write(f"{data['date'][:4]}년 {data['date'][4:6]}월 {data['date'][6:]}일  {data['time']}시 {data['location']}에서 가져온 정보입니다.")
-except requests.exceptions.RequestException as e:
-    st.error(f"API 호출 실패: {e}")
 
 
-@st.cache_data
-def get_stock_info():
-    """KRX 상장 종목 정보를 가져오기"""
-    base_url = "http://kind.krx.co.kr/corpgeneral/corpList.do"
-    method = "download"
-    url = f"{base_url}?method={method}"
-    stock_info = pd.read_html(url, header=0, encoding="cp949")[0]
-    stock_info["종목코드"] = stock_info["종목코드"].apply(lambda x: f"{x:06d}")
-    stock_info = stock_info[["회사명", "종목코드"]]
-    return stock_info
+def show_api_error(e):
+    st.error(f"API 호출 실패: {e}")
+
 
-@st.cache_data
 def get_stock_price(stock_code):
-    """FinanceDataReader를 이용해 특정 종목의 현재 주가를 가져오기"""
-    try:
-        today = datetime.date.today()
-        df = fdr.DataReader(stock_code, today - datetime.timedelta(days=1), today)
-        if not df.empty:
-            return df["Close"][-1]
-        else:
-            return None
-    except Exception:
-        return None
-    
-# 충분한 과거 데이터를 확보하는 함수
-def load_two_years_data(ticker_symbol, today):
-    start_date = today - datetime.timedelta(days=730)  # 2년 전
-    df = fdr.DataReader(f'KRX:{ticker_symbol}', start_date, today)
-    df = df[['Close']]
-    return df
+    """공유 시세 서비스에서 종목의 현재가 (세션은 upstream 에 직접 요청하지 않음)"""
+    quote = quotes.get_service().get(stock_code)
+    return int(quote.price) if quote else None
+
+
+@st.fragment(run_every=quotes.REFRESH_SECONDS)
+def show_stock_price(stock_code, stock_name):
+    """현재가 표시 (REFRESH_SECONDS 마다 이 부분만 다시 그림)"""
+    quote = quotes.get_service().get(stock_code)
+    if quote:
+        st.info(f"{stock_name} ({stock_code})의 현재 주가: {int(quote.price):,}원")
+        st.caption(f"{quote.time:%H:%M:%S} 기준")
+
+
+# 주문 종류 이름 -> (거래소 주문 종류, 지정가 입력 여부, 스톱 가격 입력 여부)
+ORDER_KINDS = {
+    "시장가": (exchange.MARKET, False, False),
+    "지정가": (exchange.LIMIT, True, False),
+    "스톱": (exchange.STOP, False, True),
+    "스톱 지정가": (exchange.STOP, True, True),
+}
+STATUS_NAMES = {exchange.OPEN: "대기", exchange.FILLED: "체결", exchange.CANCELLED: "취소"}
+
+
+def order_form(key, stock_price):
+    """주문 종류와 가격 입력 -> (주문 종류, 지정가, 스톱 가격)"""
+    kind_name = st.radio("주문 종류", list(ORDER_KINDS), horizontal=True, key=f"{key}_kind")
+    kind, needs_price, needs_stop = ORDER_KINDS[kind_name]
+    price = stop_price = None
+    if needs_stop:
+        stop_price = st.number_input("스톱 가격 (시세가 이 가격에 닿으면 주문)", min_value=1, value=stock_price, step=10,
+                                     key=f"{key}_stop")
+    if needs_price:
+        price = st.number_input("지정가", min_value=1, value=stock_price, step=10, key=f"{key}_price")
+    return kind, price, stop_price
+
+
+def show_order_result(order):
+    if order.status == exchange.FILLED:
+        st.success(f"{order.name} {order.quantity}주 체결 (평균 {order.average_price:,.0f}원)")
+    elif order.status == exchange.OPEN:
+        st.info(f"주문 접수: {order.filled}주 체결, {order.remaining}주 대기 중 (시세가 닿으면 체결됩니다)")
+    else:
+        st.error(f"주문 취소: {order.reason} ({order.filled}주 체결)")
+
+
+@st.fragment(run_every=quotes.REFRESH_SECONDS)
+def show_orders(user):
+    """내 주문 목록과 미체결 주문 취소 (체결되면 다음 갱신 때 반영)"""
+    market = exchange.get_exchange()
+    orders = market.orders(user.name)
+    if not orders:
+        return
+    st.subheader("🧾 내 주문")
+    st.dataframe(pd.DataFrame([{
+        "주문번호": order.id,
+        "종목": order.name,
+        "구분": "매수" if order.side == Trade.BUY else "매도",
+        "종류": ("스톱 " if order.stop_price else "") + ("지정가" if order.price else "시장가"),
+        "스톱 가격": order.stop_price,
+        "지정가": order.price,
+        "수량": order.quantity,
+        "체결": order.filled,
+        "평균 체결가": order.average_price,
+        "상태": STATUS_NAMES[order.status] + (f" ({order.reason})" if order.reason else ""),
+    } for order in orders]), hide_index=True, use_container_width=True)
+    open_ids = [order.id for order in orders if order.status == exchange.OPEN]
+    if open_ids:
+        order_id = st.selectbox("취소할 주문", open_ids, key="cancel_order")
+        if st.button("주문 취소"):
+            market.cancel(order_id, user.name)
+            st.rerun(scope="fragment")
+
+
+def load_forecast(stock_code, stock_name, predict_days):
+    """한 달 주가 데이터와 predict_days일 예측 (백그라운드에서 실행)"""
+    today = datetime.date.today()
+    df = ohlcv_store.read(f'KRX:{stock_code}', today - datetime.timedelta(days=31), today + datetime.timedelta(days=1))
+    future_df = forecast.forecast_close(stock_code, stock_name, predict_days, today)
+    return df, future_df
+
+
+def show_forecast_chart(stock_code, stock_name):
+    def render(result):
+        df, future_df = result
+        fig = forecast.forecast_figure(df, future_df, f'{stock_name} 주가 데이터 및 예측가')
+        st.plotly_chart(fig, use_container_width=True)
+        badge = evaluation.confidence_badge(stock_code)
+        if badge:
+            st.caption(badge)
+        warning = forecast.range_warning(future_df)
+        if warning:
+            st.caption(warning)
+    return render
+
+
+# 한강 수온은 기다리지 않고 자리만 잡아 두고 나머지 화면부터 그림
+temperature_job = tasks.start(get_hangang_temperature, render=show_hangang_temperature, on_error=show_api_error)
+buy_job = sell_job = None
 
 # UI
 st.title("주식 거래")
 if st.session_state.user1:
     user = st.session_state.user1
+    market = exchange.get_exchange()
 
     # Tabs for Buy and Sell
     tab1, tab2 = st.tabs(["📈 주식 매수", "📉 주식 매도"])
 
     # 종목 검색 및 선택
-    stock_info = get_stock_info()
-    search_term = st.text_input("종목 검색 (회사명 입력)", key="search_stock")
-    filtered_stocks = stock_info[stock_info["회사명"].str.contains(search_term, na=False)] if search_term else stock_info
+    search_term = st.text_input("종목 검색 (회사명 또는 초성 입력)", key="search_stock")
+    filtered_stocks = listing.search(search_term)
 
-    if not filtered_stocks.empty:
-        selected_stock = st.selectbox("검색 결과", filtered_stocks["회사명"], key="selected_stock")
-        selected_code = filtered_stocks[filtered_stocks["회사명"] == selected_stock]["종목코드"].values[0]
+    if filtered_stocks:
+        selected_stock = st.selectbox("검색 결과", filtered_stocks, key="selected_stock")
+        selected_code = listing.get_ticker_symbol(selected_stock)
         stock_price = get_stock_price(selected_code)
 
         with tab1:
             # 매수 화면
             st.subheader("📈 주식 매수")
             if stock_price:
-                st.info(f"{selected_stock} ({selected_code})의 현재 주가: {stock_price:,}원")
+                show_stock_price(selected_code, selected_stock)
                 buy_count = st.number_input("매수 수량", min_value=1, step=1, key="buy_count")
+                buy_kind, buy_price, buy_stop = order_form("buy", stock_price)
                 future_date = datetime.date.today() + datetime.timedelta(days=7)
-                # 그래프
-                df = fdr.DataReader(f'KRX:{selected_code}', datetime.date.today() - datetime.timedelta(days=31), datetime.date.today() + datetime.timedelta(days=1))
-                last_date = df.index.max()
-
-                # 지난 2년간 데이터 불러오기
-                today = datetime.date.today()
-                past_2y_data = load_two_years_data(selected_code, today)
-                # 스케일링
-                scaler = MinMaxScaler()
-                scaled_data = scaler.fit_transform(past_2y_data)
-
-                x = []
-                for i in range(len(scaled_data) - 100):
-                    x.append(scaled_data[i:i + 100])
-                x = np.array(x)
-                last_sequence = scaled_data[-100:]
-                future_predictions = []
-
-                predict_days = (future_date - today).days
-                for _ in range(predict_days):
-                    # 모델로 예측
-                    next_scaled = model.predict(last_sequence[np.newaxis, :, :])
-                    future_predictions.append(next_scaled[0, 0])
-
-                    # 새로운 값 추가 후 시퀀스 업데이트
-                    next_scaled_sequence = np.vstack([last_sequence[1:], next_scaled.reshape(1, -1)])
-                    last_sequence = next_scaled_sequence
-                # 예측값 스케일 복원
-                future_predictions = scaler.inverse_transform(np.array(future_predictions).reshape(-1, 1))
-
-                # future_predictions 조정
-                adjustment_value = future_predictions[0, 0] - df['Close'].iloc[-1]
-                future_predictions -= adjustment_value
-
-                # 예측 정리
-                future_dates = [last_date + datetime.timedelta(days=i) for i in range(0, predict_days)]
-                future_df = pd.DataFrame({'Close': future_predictions.flatten()}, index=future_dates)
-
-                fig = go.Figure()
-
-                ## 종가(Close) 라인 차트 추가
-                fig.add_trace(go.Scatter(x=df.index, y=df['Close'],
-                                    mode='lines',
-                                    name='Close Price'))
-
-                # 캔들 차트 추가
-                if 'Open' in df.columns:
-                    fig.add_trace(go.Candlestick(x=df.index,
-                                            open=df['Open'],
-                                            high=df['High'],
-                                            low=df['Low'],
-                                            close=df['Close'],
-                                            name='Candlestick'))
-                
-                # 예측 주가 라인 (빨간색)
-                if not future_df.empty:
-                    fig.add_trace(go.Scatter(x=future_df.index, y=future_df['Close'],
-                                            mode='lines',
-                                            name='예측 종가',
-                                            line=dict(color='red', dash='dot')))
-                
-                fig.update_layout(title=f'{selected_stock} 주가 데이터 및 예측가',
-                        xaxis_title='Date',
-                        yaxis_title='Price (KRW)',
-                        template='plotly_dark')
-                
-                st.plotly_chart(fig, use_container_width=True)
+                # 그래프 (일주일 예측, 예측 서비스에서 캐시됨)
+                buy_job = tasks.start(load_forecast, selected_code, selected_stock, (future_date - datetime.date.today()).days,
+                                      render=show_forecast_chart(selected_code, selected_stock), loading="주가 예측 중...")
 
                 if st.button("주식 구매"):
-                    result = user.buy_stock(selected_stock, stock_price, buy_count)
-                    if "잔액 부족" in result:
-                        st.error(result)  # 구매 실패 메시지
-                    else:
-                        st.success(result)  # 구매 성공 메시지
+                    # 모의 거래소에 주문 (시장가는 현재 시세로, 나머지는 시세가 닿을 때 체결)
+                    # 체결 내용은 이 세션의 계좌에 반영 (폴러 스레드에서 체결돼도 같은 객체)
+                    order = market.submit(exchange.Order(user.name, selected_code, selected_stock, Trade.BUY, buy_kind,
+                                                         buy_count, buy_price, buy_stop), user)
+                    show_order_result(order)
             else:
                 st.warning("현재 주가를 가져올 수 없습니다.")
 
@@ -167,89 +172,30 @@ if st.session_state.user1:
             # 매도 화면
             st.subheader("📉 주식 매도")
             if stock_price:
-                
-                st.info(f"{selected_stock} ({selected_code})의 현재 주가: {int(future_df['Close'][-1]):,}원")
+                show_stock_price(selected_code, selected_stock)
                 sell_count = st.number_input("매도 수량", min_value=1, step=1, key="sell_count")
-                sell_date = st.date_input("매도 날짜 선택", value=datetime.date.today() + datetime.timedelta(days=1) , min_value= datetime.date.today() + datetime.timedelta(days=1),  key="sell_date")
+                sell_kind, sell_price, sell_stop = order_form("sell", stock_price)
+                sell_date = st.date_input("예측 기간 (매도 예정일)", value=datetime.date.today() + datetime.timedelta(days=1) , min_value= datetime.date.today() + datetime.timedelta(days=1),  key="sell_date")
 
-                # 그래프
+                # 그래프 (지정가를 정할 때 참고)
                 if sell_date:
-                    df = fdr.DataReader(f'KRX:{selected_code}', datetime.date.today() - datetime.timedelta(days=31), datetime.date.today() + datetime.timedelta(days=1))
-                    last_date = df.index.max()
-                    # 지난 2년간 데이터 불러오기
-                    today = datetime.date.today()
-                    past_2y_data = load_two_years_data(selected_code, today)
-                    # 스케일링
-                    scaler = MinMaxScaler()
-                    scaled_data = scaler.fit_transform(past_2y_data)
-
-                    x = []
-                    for i in range(len(scaled_data) - 100):
-                        x.append(scaled_data[i:i + 100])
-                    x = np.array(x)
-                    last_sequence = scaled_data[-100:]
-                    future_predictions = []
-
-                    predict_days = (sell_date - today).days
-                    for _ in range(predict_days):
-                        # 모델로 예측
-                        next_scaled = model.predict(last_sequence[np.newaxis, :, :])
-                        future_predictions.append(next_scaled[0, 0])
-
-                        # 새로운 값 추가 후 시퀀스 업데이트
-                        next_scaled_sequence = np.vstack([last_sequence[1:], next_scaled.reshape(1, -1)])
-                        last_sequence = next_scaled_sequence
-                    # 예측값 스케일 복원
-                    future_predictions = scaler.inverse_transform(np.array(future_predictions).reshape(-1, 1))
-
-                    # future_predictions 조정
-                    adjustment_value = future_predictions[0, 0] - df['Close'].iloc[-1]
-                    future_predictions -= adjustment_value
-
-                    # 예측 정리
-                    future_dates = [last_date + datetime.timedelta(days=i) for i in range(0, predict_days)]
-                    future_df = pd.DataFrame({'Close': future_predictions.flatten()}, index=future_dates)
-
-
-                    fig = go.Figure()
-
-                    ## 종가(Close) 라인 차트 추가
-                    fig.add_trace(go.Scatter(x=df.index, y=df['Close'],
-                                        mode='lines',
-                                        name='종가'))
-
-                    # 캔들 차트 추가
-                    if 'Open' in df.columns:
-                        fig.add_trace(go.Candlestick(x=df.index,
-                                                open=df['Open'],
-                                                high=df['High'],
-                                                low=df['Low'],
-                                                close=df['Close'],
-                                                name='캔들 스틱'))
-                    # 예측 주가 라인 (빨간색)
-                    if not future_df.empty:
-                        fig.add_trace(go.Scatter(x=future_df.index, y=future_df['Close'],
-                                                mode='lines',
-                                                name='예측 종가',
-                                                line=dict(color='red', dash='dot')))
-                    
-                    fig.update_layout(title=f'{selected_stock} 주가 데이터 및 예측가',
-                            xaxis_title='Date',
-                            yaxis_title='Price (KRW)',
-                            template='plotly_dark')
-                    
-                    st.plotly_chart(fig, use_container_width=True)
+                    # 매도일까지 예측 (매수 탭의 일주일 예측을 앞부분으로 재사용)
+                    sell_job = tasks.start(load_forecast, selected_code, selected_stock, (sell_date - datetime.date.today()).days,
+                                           render=show_forecast_chart(selected_code, selected_stock), loading="주가 예측 중...")
 
                 if st.button("주식 판매"):
-                    result = user.sell_stock(selected_stock, int(future_df['Close'][-1]), sell_count)
-                    if "보유하고 있지 않습니다" in result or "없습니다" in result:
-                        st.error(result)  # 매도 실패 메시지
-                    else:
-                        st.success(result)  # 매도 성공 메시지
+                    order = market.submit(exchange.Order(user.name, selected_code, selected_stock, Trade.SELL, sell_kind,
+                                                         sell_count, sell_price, sell_stop), user)
+                    show_order_result(order)
             else:
                 st.warning("현재 주가를 가져올 수 없습니다.")
 
+        show_orders(user)
+
     else:
         st.write("검색 결과가 없습니다.")
 else:
-    st.warning("로그인 하세요.")
\ No newline at end of file
+    st.warning("로그인 하세요.")
+
+# 작업이 끝나는 대로 각 패널 채우기
+tasks.fill(temperature_job, buy_job, sell_job)
@@ -0,0 +1 @@
+# 페이지들이 공유하는 예측/데이터/계좌 모듈 모음
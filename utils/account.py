@@ -0,0 +1,159 @@
+import datetime
+from contextlib import contextmanager
+from utils import portfolio
+
+
+#종목 클래스 정의 
+class Stock:
+    __slots__ = ("name", "purchase_price", "count")
+
+    def __init__(self, name, purchase_price, count):
+        self.name = name                    # 종목명
+        self.purchase_price = purchase_price  # 평균 매입가
+        self.count = count            # 보유 주식 수
+
+    def total_value(self): #자산
+        return self.purchase_price * self.count
+
+
+# 거래 기록 (한 번 기록되면 바뀌지 않음)
+class Trade:
+    __slots__ = ("time", "side", "name", "price", "count")
+
+    BUY = "buy"
+    SELL = "sell"
+
+    def __init__(self, side, name, price, count, time=None):
+        self.time = time or datetime.datetime.now()
+        self.side = side
+        self.name = name
+        self.price = price
+        self.count = count
+
+
+class TradeError(Exception):
+    """잔액 부족, 보유량 부족 등으로 거래할 수 없을 때"""
+
+
+class Holdings:
+    """종목명으로 O(1) 조회하는 보유 종목 모음 (추가된 순서대로 순회)"""
+
+    def __init__(self):
+        self._stocks = {}
+
+    def __iter__(self):
+        return iter(list(self._stocks.values()))
+
+    def __len__(self):
+        return len(self._stocks)
+
+    def __contains__(self, name):
+        return name in self._stocks
+
+    def get(self, name):
+        return self._stocks.get(name)
+
+    def append(self, stock):
+        self._stocks[stock.name] = stock
+
+    def remove(self, stock):
+        del self._stocks[stock.name]
+
+
+# User 클래스 정의
+class User:
+    def __init__(self, name, money):
+        self.name = name
+        self.seed_money = money
+        self.money = money
+        self.stocks = Holdings()
+        self.ledger = []  # 거래 기록 (추가만 함)
+        self.realized_pnl = 0  # 매도로 확정된 손익
+
+    def add_stock(self, stock_name, purchase_price, count):
+        new_stock = Stock(stock_name, purchase_price, count)
+        self.stocks.append(new_stock)
+
+    def total_asset(self, prices=None):
+        """총 자산 계산 (보유 종목 포함) — prices(종목명 -> 현재가)가 주어지면 현재가로 평가"""
+        if prices is None:
+            stock_value = sum(stock.total_value() for stock in self.stocks)
+            return self.money + stock_value
+        last_prices = [prices.get(stock.name, float("nan")) for stock in self.stocks]
+        return portfolio.Portfolio.from_user(self).mark_to_market(last_prices)["total_asset"]
+
+    def list_stocks(self):
+        """보유 종목 출력"""
+        return [stock.name for stock in self.stocks]
+
+    def buy(self, stock_name, stock_price, stock_count, time=None):
+        """매수 후 거래 기록 반환, 실패 시 TradeError"""
+        total_cost = stock_price * stock_count
+        if self.money < total_cost:
+            raise TradeError(f"잔액 부족: 현재 잔액은 {self.money:,}원입니다.")
+        stock = self.stocks.get(stock_name)
+        if stock is None:
+            self.stocks.append(Stock(stock_name, stock_price, stock_count))
+        else:
+            # 추가 매수 시 평균 매입가 갱신
+            new_count = stock.count + stock_count
+            stock.purchase_price = (stock.purchase_price * stock.count + total_cost) / new_count
+            stock.count = new_count
+        self.money -= total_cost
+        trade = Trade(Trade.BUY, stock_name, stock_price, stock_count, time)
+        self.ledger.append(trade)
+        return trade
+
+    def sell(self, stock_name, stock_price, stock_count, time=None):
+        """매도 후 거래 기록 반환, 실패 시 TradeError"""
+        stock = self.stocks.get(stock_name)
+        if stock is None:
+            raise TradeError(f"{self.name}님은 {stock_name}을 보유하고 있지 않습니다.")
+        # 보유량보다 많은 주식을 매도하려는 경우
+        if stock_count > stock.count:
+            raise TradeError(f"현재 {self.name}님의 {stock_name} 보유량은 {stock.count}개입니다. 매도할 수 없습니다.")
+        # 정상 매도
+        stock.count -= stock_count
+        self.money += stock_price * stock_count
+        self.realized_pnl += (stock_price - stock.purchase_price) * stock_count
+        # 보유량이 0이 되면 종목 제거
+        if stock.count == 0:
+            self.stocks.remove(stock)
+        trade = Trade(Trade.SELL, stock_name, stock_price, stock_count, time)
+        self.ledger.append(trade)
+        return trade
+
+    @contextmanager
+    def transaction(self, stock_name):
+        """안에서 예외가 나면 현금/손익/거래 기록과 stock_name 보유 상태를 들어오기 전으로 되돌림"""
+        stock = self.stocks.get(stock_name)
+        state = (self.money, self.realized_pnl, len(self.ledger), stock, stock and (stock.purchase_price, stock.count))
+        try:
+            yield
+        except BaseException:
+            self.money, self.realized_pnl, ledger_size, stock, position = state
+            del self.ledger[ledger_size:]
+            current = self.stocks.get(stock_name)
+            if current is not None:
+                self.stocks.remove(current)
+            if stock is not None:
+                stock.purchase_price, stock.count = position
+                self.stocks.append(stock)
+            raise
+
+    def buy_stock(self,stock_name,stock_price,stock_count):
+        try:
+            self.buy(stock_name, stock_price, stock_count)
+        except TradeError as e:
+            return str(e)
+        # 매수 후 보유 수량이 이번 매수 수량과 같으면 새 종목 (DB 계좌는 거래 후 다시 읽은 보유 행 기준)
+        if self.stocks.get(stock_name).count == stock_count:
+            return f"{stock_name} 종목이 새로 {stock_count}개 추가되었습니다."
+        return f"{stock_name} 종목을 {stock_count}개 매수하였습니다."
+
+    def sell_stock(self, stock_name, stock_price, stock_count):
+        try:
+            self.sell(stock_name, stock_price, stock_count)
+        except TradeError as e:
+            return str(e)
+        return f"{stock_name} 종목을 {stock_count}개 매도하였습니다. 총 {stock_price * stock_count:,}원이 입금되었습니다."
@@ -0,0 +1,213 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from utils import indicators, portfolio
+from utils.account import User
+
+TRADING_DAYS = 252
+
+# 신호 값
+BUY, HOLD, SELL = 1, 0, -1
+
+
+class BacktestConfig:
+    """백테스트 조건 (초기 자금은 종목마다 따로 배정)"""
+
+    def __init__(self, initial_cash=10_000_000, fee_rate=0.00015, slippage=0.0005):
+        self.initial_cash = initial_cash
+        self.fee_rate = fee_rate      # 매수/매도 수수료율
+        self.slippage = slippage      # 체결가 불리하게 밀리는 비율
+
+
+def drawdown(equity):
+    """고점 대비 하락률 (0 이하)"""
+    equity = np.asarray(equity, dtype=float)
+    return equity / np.maximum.accumulate(equity) - 1
+
+
+def metrics(equity):
+    """총 수익률, 연 환산 수익률, 최대 낙폭, 샤프 지수"""
+    equity = np.asarray(equity, dtype=float)
+    returns = np.diff(equity) / equity[:-1]
+    years = max(len(equity) - 1, 1) / TRADING_DAYS
+    std = returns.std()
+    return {
+        "총 수익률(%)": (equity[-1] / equity[0] - 1) * 100,
+        "연 수익률(%)": ((equity[-1] / equity[0]) ** (1 / years) - 1) * 100,
+        "최대 낙폭(%)": drawdown(equity).min() * 100,
+        "샤프 지수": returns.mean() / std * np.sqrt(TRADING_DAYS) if std > 0 else 0.0,
+    }
+
+
+def simulate(name, close, signals, config):
+    """
+    한 종목을 User 의 매수/매도 규칙 그대로 하루씩 재생
+    t일 신호는 t+1일 종가에 체결 (미래 정보 사용 방지), 매수는 가능한 만큼 전량, 매도는 보유 전량
+    """
+    close = np.asarray(close, dtype=float)
+    user = User(name, config.initial_cash)
+    equity = np.empty(len(close))
+    last_price = np.nan
+    trades = 0
+    for t in range(len(close)):
+        price = close[t]
+        signal = signals[t - 1] if t > 0 else HOLD
+        if not np.isnan(price):
+            last_price = price
+            held = user.stocks.get(name)
+            if signal == BUY and held is None:
+                fill = price * (1 + config.slippage)
+                count = int(user.money // (fill * (1 + config.fee_rate)))
+                if count > 0:
+                    user.buy(name, fill, count)
+                    user.money -= fill * count * config.fee_rate
+                    trades += 1
+            elif signal == SELL and held is not None:
+                fill = price * (1 - config.slippage)
+                count = held.count
+                user.sell(name, fill, count)
+                user.money -= fill * count * config.fee_rate
+                trades += 1
+        held = user.stocks.get(name)
+        equity[t] = user.money + (held.count * last_price if held is not None else 0)
+    return {"name": name, "equity": equity, "trades": trades}
+
+
+def _simulate_job(job):
+    return simulate(*job)
+
+
+def run(names, dates, close, signals, config=None, processes=None):
+    """
+    종목마다 별도 프로세스에서 simulate 실행
+    close, signals: (종목 x 날짜) 행렬
+    반환값: (종목별 지표 표, 종목별 자산 곡선 DataFrame, 전체 합산 자산 곡선 Series)
+    """
+    config = config or BacktestConfig()
+    jobs = [(name, close[i], signals[i], config) for i, name in enumerate(names)]
+    processes = processes or os.cpu_count()
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+            results = list(pool.map(_simulate_job, jobs, chunksize=max(1, len(jobs) // (processes * 4))))
+    else:
+        results = [simulate(*job) for job in jobs]
+
+    curves = pd.DataFrame({r["name"]: r["equity"] for r in results}, index=dates)
+    summary = pd.DataFrame([{"종목": r["name"], "거래 횟수": r["trades"], **metrics(r["equity"])} for r in results])
+    total = curves.sum(axis=1)
+    return summary, curves, total
+
+
+# 전략: (종목 x 날짜) 종가 행렬 -> 같은 모양의 신호 행렬
+
+def sma_cross(fast=5, slow=20):
+    """단기 이동평균이 장기 이동평균 위면 매수, 아래면 매도"""
+    def strategy(names, close):
+        fast_ma, slow_ma = indicators.sma(close, fast), indicators.sma(close, slow)
+        signals = np.where(fast_ma > slow_ma, BUY, SELL)
+        signals[np.isnan(slow_ma)] = HOLD
+        return signals
+    return strategy
+
+
+def lstm_strategy(horizon=5, threshold=0.01, every=5, history=500, batch_size=4096):
+    """
+    LSTM 이 horizon일 뒤 threshold 이상 오를 것으로 예측하면 매수, 그만큼 내릴 것으로 예측하면 매도
+    every일마다 모든 종목/날짜의 입력 창을 모아 배치 추론 (각 창은 그 시점까지의 history일 최저/최고가로 스케일)
+    """
+    def strategy(names, close):
+        from utils import forecast, models
+
+        window = forecast.WINDOW
+        signals = np.zeros(close.shape, dtype=int)
+        if close.shape[1] < history:
+            return signals
+        # 그 시점까지의 데이터만 쓰는 최저/최고가 (미래 정보 사용 방지)
+        lows = np.full(close.shape, np.nan)
+        highs = np.full(close.shape, np.nan)
+        lows[:, history - 1:] = sliding_window_view(close, history, axis=1).min(axis=-1)
+        highs[:, history - 1:] = sliding_window_view(close, history, axis=1).max(axis=-1)
+        days = np.arange(history - 1, close.shape[1], every)
+        windows = sliding_window_view(close, window, axis=1)  # (종목, 날짜 - window + 1, window)
+
+        groups = {}
+        for i, name in enumerate(names):
+            groups.setdefault(models.model_key_for(name), []).append(i)
+        for model_key, rows in groups.items():
+            model = models.load_model(model_key, models.model_version(model_key))
+            row_index, day_index = np.meshgrid(rows, days, indexing="ij")
+            row_index, day_index = row_index.ravel(), day_index.ravel()
+            low, high = lows[row_index, day_index], highs[row_index, day_index]
+            batch = windows[row_index, day_index - window + 1]
+            valid = ~np.isnan(batch).any(axis=1) & (high > low)
+            row_index, day_index, low, high = row_index[valid], day_index[valid], low[valid], high[valid]
+            scale = high - low
+            scaled = (batch[valid] - low[:, None]) / scale[:, None]
+            for start in range(0, len(scaled), batch_size):
+                chunk = slice(start, start + batch_size)
+                predicted = forecast.rollout(model, scaled[chunk, :, None], horizon)
+                # 예측 수익률: forecast_close 와 같이 스케일 복원 후 첫 예측값을 현재 종가에 맞춰 평행 이동한 경로의 마지막 값 기준
+                now = close[row_index[chunk], day_index[chunk]]
+                scaler = {"min": low[chunk, None], "max": high[chunk, None]}
+                future = forecast.level_shift(forecast.unscale(predicted, scaler), now)[:, -1]
+                expected = future / now - 1
+                sig = np.where(expected > threshold, BUY, np.where(expected < -threshold, SELL, HOLD))
+                # 다음 판단일까지 같은 신호 유지
+                for offset in range(every):
+                    target = day_index[chunk] + offset
+                    inside = target < close.shape[1]
+                    signals[row_index[chunk][inside], target[inside]] = sig[inside]
+        return signals
+    return strategy
+
+
+def backtest(codes, strategy, start, end, config=None, processes=None):
+    """로컬 저장소의 종가로 전략 신호를 만들고 종목별로 병렬 백테스트"""
+    prices = portfolio.fetch_price_matrix(codes, start, end)
+    if prices.empty:
+        return pd.DataFrame(), pd.DataFrame(), pd.Series(dtype=float)
+    names = list(prices.columns)
+    close = prices.to_numpy(dtype=float).T
+    signals = strategy(names, close)
+    return run(names, prices.index, close, signals, config, processes)
+
+
+# 테스트 실행 (가상 데이터로 병렬 백테스트)
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    tickers, days = 64, 750
+    names = [f"{i:06d}" for i in range(tickers)]
+    dates = pd.bdate_range("2022-01-03", periods=days)
+    close = 10_000 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (tickers, days)), axis=1))
+    signals = sma_cross()(names, close)
+
+    started = time.perf_counter()
+    summary, curves, total = run(names, dates, close, signals)
+    print(summary.head())
+    print(metrics(total.to_numpy()))
+    print(f"{tickers}종목 x {days}일 백테스트: {time.perf_counter() - started:.2f}초")
+
+    # LSTM 신호가 같은 창/스케일러로 forecast_close 를 호출해 만든 신호와 같은지 확인
+    from utils import forecast
+
+    horizon, threshold, history = 5, 0.005, 500
+    series = close[:1, :history + 40]
+    lstm_signals = lstm_strategy(horizon, threshold, every=1, history=history)(names[:1], series)
+    mismatches, checked = 0, []
+    for day in range(history - 1, series.shape[1], 4):
+        trailing = series[0, day - history + 1:day + 1]
+        forecast.load_history = lambda ticker, today: pd.DataFrame({"Close": series[0, :day + 1]}, index=dates[:day + 1])
+        forecast.get_scaler = lambda model_key, ticker, frame: {"min": trailing.min(), "max": trailing.max()}
+        path = forecast.forecast_close(names[0], horizon=horizon)["Close"].to_numpy()
+        assert path[0] == series[0, day]
+        expected = path[-1] / series[0, day] - 1
+        signal = BUY if expected > threshold else SELL if expected < -threshold else HOLD
+        mismatches += signal != lstm_signals[0, day]
+        checked.append(signal)
+    assert mismatches == 0, mismatches
+    print(f"LSTM 신호와 forecast_close 기준 신호 일치 ({len(checked)}개 시점, 매수 {checked.count(BUY)} / "
+          f"매도 {checked.count(SELL)} / 유지 {checked.count(HOLD)})")
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# 차트 해상도: 이름 -> pandas 리샘플 규칙 (None 이면 일봉 그대로)
+RESOLUTIONS = {"일봉": None, "주봉": "W-FRI", "월봉": "ME"}
+
+# 자동 해상도에서 한 차트에 그리는 최대 봉 수, 선 그래프의 최대 점 수 (넘으면 LTTB 로 줄임)
+MAX_BARS = 600
+MAX_POINTS = 1500
+
+# 표 한 페이지의 행 수
+PAGE_SIZE = 100
+
+OHLC_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def choose_resolution(n_days, max_bars=MAX_BARS):
+    """보이는 기간의 거래일 수에 맞는 해상도 (일봉 -> 주봉 -> 월봉 순으로 max_bars 이하가 되는 첫 번째)"""
+    if n_days <= max_bars:
+        return "일봉"
+    if n_days / 5 <= max_bars:
+        return "주봉"
+    return "월봉"
+
+
+def resample_ohlc(df, resolution):
+    """일봉 OHLCV -> 주봉/월봉 (시가는 첫 값, 고가/저가는 최대/최소, 종가는 마지막 값, 거래량은 합)"""
+    rule = RESOLUTIONS[resolution]
+    if rule is None or df.empty:
+        return df
+    agg = {column: how for column, how in OHLC_AGG.items() if column in df}
+    bars = df.resample(rule).agg(agg)
+    # 봉의 날짜는 기간의 마지막 거래일 (미래 날짜가 찍히지 않도록)
+    bars.index = pd.DatetimeIndex(df.index.to_series().resample(rule).last())
+    return bars.dropna(subset=["Close"])
+
+
+def resample_last(df, resolution):
+    """지표처럼 한 시점의 값인 열들은 기간의 마지막 값으로 맞춤 (봉 날짜와 같은 인덱스)"""
+    rule = RESOLUTIONS[resolution]
+    if rule is None or df.empty:
+        return df
+    out = df.resample(rule).last()
+    out.index = pd.DatetimeIndex(df.index.to_series().resample(rule).last())
+    return out.loc[out.index.notna()]
+
+
+def lttb(x, y, threshold=MAX_POINTS):
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링: 모양(고점/저점)을 최대한 유지하며 threshold 개의 점만 남김
+    x 는 단조 증가하는 숫자 배열, 반환값은 남길 점의 위치(정수 배열)
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # 첫 점과 마지막 점은 항상 남기고, 사이를 threshold - 2 개 구간으로 나눔
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # 다음 구간의 평균점 (마지막 구간 다음은 마지막 점)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        # 이전에 고른 점, 다음 구간 평균점과 만드는 삼각형이 가장 큰 점 선택
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_series(series, threshold=MAX_POINTS):
+    """날짜 인덱스 Series 를 LTTB 로 줄임 (결측값은 빼고 계산)"""
+    series = series.dropna()
+    if len(series) <= threshold:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(), threshold)]
+
+
+def line_trace(series, name, threshold=MAX_POINTS, **kwargs):
+    """WebGL(Scattergl) 선 그래프 — 점이 많으면 LTTB 로 줄여서 전송"""
+    series = downsample_series(series, threshold)
+    return go.Scattergl(x=series.index, y=series.to_numpy(), mode="lines", name=name, **kwargs)
+
+
+def price_traces(df, resolution):
+    """종가 선 + 캔들 스틱 (주봉/월봉이면 집계한 봉으로)"""
+    bars = resample_ohlc(df, resolution)
+    traces = [line_trace(bars["Close"], "종가")]
+    if "Open" in bars.columns:
+        traces.append(go.Candlestick(x=bars.index, open=bars["Open"], high=bars["High"], low=bars["Low"],
+                                     close=bars["Close"], name="캔들 스틱"))
+    return traces
+
+
+def price_figure(df, future_df, title, resolution, overlays=None, oscillators=None):
+    """
+    가격 차트와 아래쪽 지표 차트 목록
+    overlays: 가격 차트에 겹칠 지표 DataFrame (열 = 지표), oscillators: [(제목, 지표 DataFrame)]
+    """
+    fig = go.Figure(price_traces(df, resolution))
+    if overlays is not None:
+        overlays = resample_last(overlays, resolution)
+        for column in overlays.columns:
+            fig.add_trace(line_trace(overlays[column], column))
+    if future_df is not None and not future_df.empty:
+        fig.add_trace(line_trace(future_df["Close"], "예측 종가", line=dict(color="red", dash="dot")))
+    fig.update_layout(title=f"{title} ({resolution})", xaxis_title="Date", yaxis_title="Price (KRW)",
+                      template="plotly_dark", xaxis_rangeslider_visible=False)
+
+    oscillator_figs = []
+    for name, frame in oscillators or []:
+        frame = resample_last(frame, resolution)
+        osc_fig = go.Figure([line_trace(frame[column], column) for column in frame.columns])
+        osc_fig.update_layout(title=name, height=250, template="plotly_dark", margin=dict(t=40, b=20))
+        oscillator_figs.append(osc_fig)
+    return fig, oscillator_figs
+
+
+def page_of(df, page, page_size=PAGE_SIZE):
+    """표의 page 번째(1부터) 페이지"""
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def page_count(df, page_size=PAGE_SIZE):
+    return max(1, -(-len(df) // page_size))
+
+
+# 테스트 실행: 기간별 전송량(직렬화한 차트 크기)과 서버 쪽 생성+직렬화 시간 비교
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end="2026-10-16", periods=250 * 20)
+    close = 50000 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+    full = pd.DataFrame({"Open": close * (1 + rng.normal(0, 0.003, len(dates))), "Close": close,
+                         "Volume": rng.integers(1e5, 1e6, len(dates))}, index=dates)
+    full["High"] = full[["Open", "Close"]].max(axis=1) * 1.01
+    full["Low"] = full[["Open", "Close"]].min(axis=1) * 0.99
+    sma = pd.DataFrame({"SMA 20": full["Close"].rolling(20).mean(), "SMA 60": full["Close"].rolling(60).mean()})
+
+    def build_old(df, overlay):
+        return go.Figure([go.Scatter(x=df.index, y=df["Close"], mode="lines", name="종가"),
+                          go.Candlestick(x=df.index, open=df["Open"], high=df["High"], low=df["Low"], close=df["Close"])]
+                         + [go.Scatter(x=overlay.index, y=overlay[c], mode="lines", name=c) for c in overlay],
+                         layout=dict(template="plotly_dark")).to_json()
+
+    def build_new(df, overlay):
+        return price_figure(df, None, "벤치마크", choose_resolution(len(df)), overlay)[0].to_json()
+
+    def measure(build, *args):
+        """(직렬화 크기, 세 번 중 가장 빠른 시간 ms)"""
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            payload = build(*args)
+            best = min(best, (time.perf_counter() - start) * 1000)
+        return len(payload), best
+
+    for years in (1, 5, 20):
+        df, overlay = full.iloc[-250 * years:], sma.iloc[-250 * years:]
+        old_size, old_ms = measure(build_old, df, overlay)
+        new_size, new_ms = measure(build_new, df, overlay)
+        print(f"{years:>2}년 ({len(df)}일): {old_size / 1024:,.0f}KB {old_ms:.0f}ms -> "
+              f"{choose_resolution(len(df))} {new_size / 1024:,.0f}KB {new_ms:.0f}ms")
+
+    # LTTB 가 양 끝점과 고점/저점 모양을 유지하는지 확인
+    kept = downsample_series(full["Close"], 500)
+    assert len(kept) == 500 and kept.index[0] == full.index[0] and kept.index[-1] == full.index[-1]
+    peak_error = 1 - kept.max() / full["Close"].max()
+    trough_error = kept.min() / full["Close"].min() - 1
+    print(f"LTTB 20년 종가 {len(full)}점 -> {len(kept)}점, 최고가 오차 {peak_error:.2%}, 최저가 오차 {trough_error:.2%}")
@@ -0,0 +1,214 @@
+import datetime
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import portfolio
+from utils.account import Trade
+
+# 계좌별 일별 자산 스냅샷 위치: <EQUITY_DIR>/<user_id>/part-<시작일>.parquet + meta.json
+EQUITY_DIR = "./data/equity"
+
+# 조각 파일이 이만큼 쌓이면 하나로 합침 (행은 바꾸지 않음)
+COMPACT_PARTS = 10
+
+COLUMNS = ["cash", "stock_value", "total_asset"]
+
+
+def _to_date(value):
+    return pd.Timestamp(value).date()
+
+
+class EquityStore:
+    """
+    계좌별 일별 자산(현금, 주식 평가액, 총 자산) 스냅샷을 추가만 하는 Parquet 표로 보관
+    materialize 는 마지막 스냅샷 이후의 거래와 종가만 읽어 어제까지의 행을 덧붙임 (오늘은 장중이라 제외)
+    meta.json 에 마지막 날짜, 마지막으로 반영한 거래 id, 그날 장 마감 기준 현금/보유 수량/종가를 남겨 다음 계산의 출발점으로 씀
+    accounts: AccountStore (load_trades_since), prices: (종목 목록, 시작일, 종료일) -> 가격 행렬
+    """
+
+    def __init__(self, accounts, root=EQUITY_DIR, prices=None):
+        self.accounts = accounts
+        self.root = root
+        self.prices = prices or portfolio.fetch_price_matrix
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _lock(self, user_id):
+        with self._locks_guard:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def _dir(self, user_id):
+        return os.path.join(self.root, str(user_id))
+
+    def _load_meta(self, user_id, seed_money):
+        path = os.path.join(self._dir(user_id), "meta.json")
+        if not os.path.exists(path):
+            return {"last_date": None, "last_trade_id": 0, "cash": seed_money, "positions": {}, "closes": {}}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_meta(self, user_id, meta):
+        path = os.path.join(self._dir(user_id), "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _parts(self, user_id):
+        directory = self._dir(user_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.startswith("part-") and name.endswith(".parquet"))
+
+    def _append(self, user_id, rows):
+        """새 행을 조각 파일 하나로 추가 (같은 시작일로 다시 쓰면 덮어써서 중복이 생기지 않음)"""
+        os.makedirs(self._dir(user_id), exist_ok=True)
+        path = os.path.join(self._dir(user_id), f"part-{rows.index[0]:%Y%m%d}.parquet")
+        rows.to_parquet(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        parts = self._parts(user_id)
+        if len(parts) >= COMPACT_PARTS:
+            # 전부 합쳐 첫 조각 이름으로 교체한 뒤 나머지를 지움 (중간에 멈춰도 read 에서 중복 제거)
+            merged = self.read(user_id)
+            merged.to_parquet(parts[0] + ".tmp")
+            os.replace(parts[0] + ".tmp", parts[0])
+            for part in parts[1:]:
+                os.remove(part)
+
+    def read(self, user_id):
+        """저장된 일별 스냅샷 전체 (날짜 인덱스, 열: cash / stock_value / total_asset)"""
+        parts = self._parts(user_id)
+        if not parts:
+            return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="date"))
+        df = pd.concat([pd.read_parquet(part) for part in parts])
+        return df[~df.index.duplicated(keep="last")].sort_index()
+
+    def materialize(self, user_id, seed_money, today=None):
+        """마지막 스냅샷 다음 날부터 어제까지의 행을 계산해 추가하고 추가한 행 수 반환"""
+        today = today or datetime.date.today()
+        end = today - datetime.timedelta(days=1)
+        with self._lock(user_id):
+            meta = self._load_meta(user_id, seed_money)
+            trades = [row for row in self.accounts.load_trades_since(user_id, meta["last_trade_id"])
+                      if _to_date(row[1]) <= end]
+            if meta["last_date"] is None:
+                if not trades:
+                    return 0
+                start = _to_date(trades[0][1])
+            else:
+                start = _to_date(meta["last_date"]) + datetime.timedelta(days=1)
+            days = pd.bdate_range(start, end, name="date")
+            if days.empty:
+                return 0
+
+            # 거래 직후 상태 (예전 거래처럼 기록이 없으면 직전 상태에서 계산)
+            cash, counts, closes = meta["cash"], dict(meta["positions"]), dict(meta["closes"])
+            events = []
+            for _, traded_at, side, name, price, count, cash_after, count_after in trades:
+                sign = 1 if side == Trade.BUY else -1
+                cash = cash_after if cash_after is not None else cash - sign * price * count
+                counts[name] = count_after if count_after is not None else counts.get(name, 0) + sign * count
+                closes.setdefault(name, price)
+                events.append((pd.Timestamp(_to_date(traded_at)), name, counts[name], cash))
+
+            names = sorted(set(meta["positions"]) | {name for _, name, _, _ in events})
+            # 하루의 마지막 거래 기준 상태를 날짜별로 펼침 (거래가 없는 날은 직전 상태 유지)
+            before = pd.Timestamp(start) - pd.Timedelta(days=1)
+            counts_by_day = pd.DataFrame([[meta["positions"].get(name, 0) for name in names]], index=[before], columns=names)
+            cash_by_day = pd.Series([meta["cash"]], index=[before])
+            if events:
+                log = pd.DataFrame(events, columns=["date", "name", "count", "cash"])
+                counts_by_day = pd.concat([counts_by_day, log.pivot_table(index="date", columns="name", values="count",
+                                                                          aggfunc="last")]).groupby(level=0).last()
+                cash_by_day = pd.concat([cash_by_day, log.groupby("date")["cash"].last()]).groupby(level=0).last()
+            timeline = counts_by_day.index.union(days)
+            held = counts_by_day.reindex(timeline).ffill().reindex(index=days, columns=names).fillna(0)
+            cash_series = cash_by_day.reindex(timeline).ffill().reindex(days)
+
+            # 새 구간의 종가만 받고, 그 전 값은 지난 스냅샷의 종가(없으면 거래 가격)로 채움
+            if names:
+                prices = self.prices(tuple(names), days[0].date(), end)
+                prices = prices.reindex(index=days, columns=names).ffill() if not prices.empty \
+                    else pd.DataFrame(np.nan, index=days, columns=names)
+                prices = prices.fillna(pd.Series({name: closes.get(name, np.nan) for name in names}))
+                stock_value = (held.to_numpy() * np.nan_to_num(prices.to_numpy())).sum(axis=1)
+            else:
+                prices = pd.DataFrame(index=days)
+                stock_value = np.zeros(len(days))
+
+            rows = pd.DataFrame({"cash": cash_series.to_numpy(dtype=float), "stock_value": stock_value}, index=days)
+            rows["total_asset"] = rows["cash"] + rows["stock_value"]
+            self._append(user_id, rows)
+
+            last_held = held.iloc[-1]
+            self._save_meta(user_id, {
+                "last_date": end.isoformat(),
+                "last_trade_id": trades[-1][0] if trades else meta["last_trade_id"],
+                "cash": float(rows["cash"].iloc[-1]),
+                "positions": {name: int(count) for name, count in last_held.items() if count},
+                "closes": {name: float(value) for name, value in prices.iloc[-1].items() if pd.notna(value)},
+            })
+            return len(rows)
+
+    def curve(self, user_id, seed_money, today=None):
+        """어제까지 스냅샷을 갱신하고 전체 일별 자산 반환"""
+        self.materialize(user_id, seed_money, today)
+        return self.read(user_id)
+
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    """프로세스 전체에서 공유하는 자산 스냅샷 저장소"""
+    from utils import storage
+
+    return EquityStore(storage.get_store())
+
+
+# 테스트 실행: 기간 중 거래가 있는 계좌의 스냅샷을 하루씩 쌓은 결과가 한 번에 계산한 결과와 같은지 확인
+if __name__ == "__main__":
+    import tempfile
+    import time
+    from utils import storage
+
+    dates = pd.bdate_range("2026-09-01", "2026-10-16")
+    closes = pd.DataFrame({"삼성전자": np.linspace(70000, 75000, len(dates)),
+                           "SK하이닉스": np.linspace(180000, 170000, len(dates))}, index=dates)
+    fetched = []
+
+    def stub_prices(names, start, end):
+        fetched.append((start, end))
+        return closes.loc[pd.Timestamp(start):pd.Timestamp(end), list(names)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        accounts = storage.AccountStore(os.path.join(tmp, "accounts.db"))
+        user = accounts.create_user("테스트", 10_000_000)
+        user.buy("삼성전자", 70000, 10, time=datetime.datetime(2026, 8, 30, 10))  # 일요일 거래
+        user.buy("SK하이닉스", 180000, 5, time=datetime.datetime(2026, 9, 10, 10))
+        user.sell("삼성전자", 72000, 4, time=datetime.datetime(2026, 9, 20, 10))  # 토요일 거래
+
+        daily = EquityStore(accounts, os.path.join(tmp, "daily"), stub_prices)
+        for day in pd.date_range("2026-08-31", "2026-10-17"):
+            daily.materialize(user.user_id, user.seed_money, day.date())
+        once = EquityStore(accounts, os.path.join(tmp, "once"), stub_prices)
+        once.materialize(user.user_id, user.seed_money, datetime.date(2026, 10, 17))
+        pd.testing.assert_frame_equal(daily.read(user.user_id), once.read(user.user_id))
+
+        # 기대값: 날짜별 보유 수량 x 종가 + 현금
+        curve = once.read(user.user_id)
+        held = pd.DataFrame({"삼성전자": np.where(dates < "2026-09-20", 10, 6),
+                             "SK하이닉스": np.where(dates < "2026-09-10", 0, 5)}, index=dates)
+        cash = np.select([dates < "2026-09-10", dates < "2026-09-20"], [9_300_000, 8_400_000], 8_688_000)
+        expected = (held * closes).sum(axis=1) + cash
+        assert curve.index[0] == pd.Timestamp("2026-08-31") and curve["total_asset"].iloc[0] == 10_000_000
+        assert np.allclose(curve.loc[dates, "total_asset"].to_numpy(), expected.to_numpy())
+        print(f"스냅샷 {len(curve)}일, 조각 파일 {len(daily._parts(user.user_id))}개, 하루씩 쌓은 결과와 한 번에 계산한 결과 일치")
+
+        # 읽기 시간 (일 단위 행만 읽음)
+        start = time.perf_counter()
+        for _ in range(20):
+            daily.read(user.user_id)
+        print(f"읽기 {(time.perf_counter() - start) / 20 * 1000:.1f}ms, 가격 조회 {len(fetched)}회 (매번 새 구간만)")
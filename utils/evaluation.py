@@ -0,0 +1,155 @@
+import datetime
+import os
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from numpy.lib.stride_tricks import sliding_window_view
+from utils import forecast, listing, models
+
+# 평가할 예측 기간(거래일)과 결과 저장 위치
+HORIZONS = (1, 5, 20)
+SCORES_PATH = "./data/evaluation.parquet"
+
+# 평가에 쓴 스케일러 표시 (score 표의 "스케일러" 열)
+SERVING_SCALER = "서비스 스케일러"
+EXPANDING_SCALER = "시점별 누적 최저/최고가 (대체)"
+
+# 배지에 쓰는 기준 기간과 방향 적중률 구간
+BADGE_HORIZON = 5
+BADGE_LEVELS = ((0.6, "🟢"), (0.5, "🟡"), (0.0, "🔴"))
+
+
+def walk_forward(model, close, horizons=HORIZONS, window=forecast.WINDOW, batch_size=4096, scaler=None):
+    """
+    과거 모든 시점에서 예측 서비스와 같은 방식으로 예측해 실제 값과 비교
+    입력 창은 sliding_window_view 로 복사 없이 만들고, 모든 창을 한 배치로 롤아웃
+    scaler: 고정 스케일러 (예측 서비스가 쓰는 스케일러, 학습 구간 스케일러 등) — 모든 시점에 같은 값을 씀
+            없으면 대체용으로 시점마다 그 시점까지의 최저/최고가 (서비스 모델과 스케일이 달라 참고용)
+    반환값: 시작 시점별 예측값(원래 가격 단위, 열 = 기간)과 실제값 DataFrame 두 개
+    """
+    close = np.asarray(close, dtype=float)
+    steps = max(horizons)
+    windows = sliding_window_view(close, window)[:len(close) - window]  # 마지막 창은 비교할 실제값이 없음
+    origins = np.arange(len(windows)) + window - 1
+    last_close = close[origins]
+    if scaler is None:
+        lows, highs = np.minimum.accumulate(close)[origins], np.maximum.accumulate(close)[origins]
+    else:
+        lows, highs = np.full(len(windows), scaler["min"]), np.full(len(windows), scaler["max"])
+    scalers = {"min": lows[:, None], "max": highs[:, None]}
+
+    # 예측 서비스와 같은 전처리/후처리 (범위 밖 입력은 잘라내고, 스케일 복원 후 첫 예측값을 마지막 종가에 맞춤)
+    predicted = np.empty((len(windows), steps + 1))
+    for i in range(0, len(windows), batch_size):
+        chunk = slice(i, i + batch_size)
+        scaled = forecast.scale(windows[chunk], {"min": scalers["min"][chunk], "max": scalers["max"][chunk]}, clip=True)
+        predicted[chunk] = forecast.rollout(model, scaled[:, :, None], steps + 1)
+    predicted = forecast.level_shift(forecast.unscale(predicted, scalers), last_close)
+
+    pred = {}
+    actual = {}
+    for h in horizons:
+        target = origins + h
+        inside = target < len(close)
+        pred[h] = np.where(inside, predicted[:, h], np.nan)
+        actual[h] = np.where(inside, close[np.minimum(target, len(close) - 1)], np.nan)
+    return pd.DataFrame(pred, index=origins), pd.DataFrame(actual, index=origins), last_close
+
+
+def score(pred, actual, last_close):
+    """기간별 MAE, MAPE, 방향 적중률"""
+    rows = []
+    for h in pred.columns:
+        p, a = pred[h].to_numpy(), actual[h].to_numpy()
+        ok = ~np.isnan(a)
+        error = p[ok] - a[ok]
+        direction = np.sign(p[ok] - last_close[ok]) == np.sign(a[ok] - last_close[ok])
+        rows.append({
+            "기간(일)": h,
+            "MAE": np.abs(error).mean() if ok.any() else np.nan,
+            "MAPE(%)": (np.abs(error) / a[ok]).mean() * 100 if ok.any() else np.nan,
+            "방향 적중률": direction.mean() if ok.any() else np.nan,
+            "표본 수": int(ok.sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+def evaluate_ticker(ticker, company_name=None, today=None, horizons=HORIZONS, serving_scaler=True):
+    """
+    종목 하나의 과거 2년 예측 정확도 (지표 표, 예측값, 실제값, 날짜 인덱스)
+    기본은 예측 서비스와 같은 모델/스케일러로 평가해 배지가 실제로 서비스하는 예측을 설명함
+    (서비스 스케일러는 평가 구간의 가격을 보고 맞췄을 수 있음), serving_scaler=False 면 시점별 누적 스케일러로 대체
+    """
+    today = today or datetime.date.today()
+    history = forecast.load_history(ticker, today)
+    if len(history) <= forecast.WINDOW + max(horizons):
+        return None
+    model_key = models.model_key_for(ticker, company_name)
+    model = models.load_model(model_key, models.model_version(model_key))
+    scaler = forecast.get_scaler(model_key, ticker, history) if serving_scaler else None
+    pred, actual, last_close = walk_forward(model, history["Close"].to_numpy(), horizons, scaler=scaler)
+    pred.index = actual.index = history.index[pred.index]
+    scores = score(pred, actual, last_close).assign(스케일러=SERVING_SCALER if serving_scaler else EXPANDING_SCALER)
+    return scores, pred, actual
+
+
+def evaluation_figure(pred, actual, horizon, title):
+    """h일 전 예측값과 실제 종가 비교 차트 (예측한 날이 아니라 맞히려던 날 기준)"""
+    target_dates = actual.index[horizon:]
+    fig = go.Figure([
+        go.Scatter(x=target_dates, y=actual[horizon].to_numpy()[:len(target_dates)], mode="lines", name="실제 종가"),
+        go.Scatter(x=target_dates, y=pred[horizon].to_numpy()[:len(target_dates)], mode="lines",
+                   name=f"{horizon}일 전 예측", line=dict(color="red", dash="dot")),
+    ])
+    fig.update_layout(title=title, xaxis_title="Date", yaxis_title="Price (KRW)", template="plotly_dark")
+    return fig
+
+
+def score_listing(codes=None, today=None, path=SCORES_PATH):
+    """상장 종목 전체 평가 후 저장 (배치 작업)"""
+    today = today or datetime.date.today()
+    codes = codes if codes is not None else listing.get_listing().codes
+    frames = []
+    for code in codes:
+        try:
+            result = evaluate_ticker(code, listing.get_company_name(code), today)
+        except Exception as e:
+            print(f"평가 실패 ({code}): {e}")
+            continue
+        if result is not None:
+            frames.append(result[0].assign(종목코드=code, 평가일=today.isoformat()))
+    scores = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    scores.to_parquet(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return scores
+
+
+def load_scores(path=SCORES_PATH):
+    """배치 평가 결과 (없으면 빈 DataFrame)"""
+    return pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_scores():
+    return load_scores()
+
+
+def confidence_badge(ticker, horizon=BADGE_HORIZON, scores=None):
+    """예측 옆에 붙일 모델 신뢰도 문구 (평가 결과가 없으면 None)"""
+    scores = cached_scores() if scores is None else scores
+    if scores.empty:
+        return None
+    row = scores[(scores["종목코드"] == ticker) & (scores["기간(일)"] == horizon)]
+    if row.empty or np.isnan(row["방향 적중률"].iloc[0]):
+        return None
+    accuracy = row["방향 적중률"].iloc[0]
+    mark = next(mark for level, mark in BADGE_LEVELS if accuracy >= level)
+    return f"{mark} 모델 신뢰도: {horizon}일 방향 적중률 {accuracy:.0%}, MAPE {row['MAPE(%)'].iloc[0]:.1f}%"
+
+
+# 배치 실행: python -m utils.evaluation
+if __name__ == "__main__":
+    result = score_listing()
+    print(f"{result['종목코드'].nunique() if not result.empty else 0}개 종목 평가 완료 -> {SCORES_PATH}")
@@ -0,0 +1,530 @@
+import datetime
+import heapq
+import itertools
+import threading
+from contextlib import ExitStack
+import streamlit as st
+from utils.account import Trade, TradeError
+
+# 주문 종류: 시장가(바로 체결), 지정가(가격 이하 매수/이상 매도), 스톱(가격에 닿으면 시장가/지정가로 전환)
+MARKET = "market"
+LIMIT = "limit"
+STOP = "stop"
+
+# 주문 상태
+OPEN = "open"
+FILLED = "filled"
+CANCELLED = "cancelled"
+
+# 계좌별로 남겨 두는 체결/취소된 주문 수 (대기 중인 주문은 개수와 관계없이 남김)
+HISTORY_SIZE = 50
+
+# 같은 계좌의 매수/매도 주문이 서로 체결될 때 새 주문의 남은 수량을 취소하며 남기는 사유
+SELF_TRADE = "자기 주문과 체결 불가 (자전 거래 방지)"
+
+
+class Order:
+    """주문 하나 (remaining 이 0 이 되면 체결 완료)"""
+    __slots__ = ("id", "owner", "account", "code", "name", "side", "kind", "quantity", "remaining", "price",
+                 "stop_price", "time", "status", "reason", "fills")
+
+    def __init__(self, owner, code, name, side, kind, quantity, price=None, stop_price=None, time=None):
+        if side not in (Trade.BUY, Trade.SELL):
+            raise ValueError(f"알 수 없는 주문 방향: {side}")
+        if kind not in (MARKET, LIMIT, STOP):
+            raise ValueError(f"알 수 없는 주문 종류: {kind}")
+        if quantity <= 0:
+            raise ValueError("주문 수량은 1 이상이어야 합니다.")
+        if kind == LIMIT and price is None:
+            raise ValueError("지정가 주문에는 가격이 필요합니다.")
+        if kind == STOP and stop_price is None:
+            raise ValueError("스톱 주문에는 스톱 가격이 필요합니다.")
+        self.id = None
+        self.owner = owner
+        self.account = None  # 체결을 반영할 계좌 (submit 할 때 지정)
+        self.code = code
+        self.name = name
+        self.side = side
+        self.kind = kind
+        self.quantity = quantity
+        self.remaining = quantity
+        self.price = price  # 지정가 (시장가/스톱 시장가는 None)
+        self.stop_price = stop_price
+        self.time = time or datetime.datetime.now()
+        self.status = OPEN
+        self.reason = None
+        self.fills = []  # 체결 기록 [(가격, 수량, 시각)]
+
+    @property
+    def filled(self):
+        return self.quantity - self.remaining
+
+    @property
+    def average_price(self):
+        """평균 체결가 (체결이 없으면 None)"""
+        if not self.fills:
+            return None
+        return sum(price * quantity for price, quantity, _ in self.fills) / self.filled
+
+
+class OrderBook:
+    """
+    종목 하나의 호가창: 가격-시간 우선순위 힙
+    bids: (-가격, 순번, 주문), asks: (가격, 순번, 주문) — 취소/체결된 주문은 맨 위에 올라올 때 버림
+    스톱 주문은 발동 전까지 따로 보관 (매수 스톱: 시세 >= 스톱 가격, 매도 스톱: 시세 <= 스톱 가격)
+    """
+
+    def __init__(self, code):
+        self.code = code
+        self.bids = []
+        self.asks = []
+        self.buy_stops = []
+        self.sell_stops = []
+        self.last = None
+        self.lock = threading.Lock()
+
+    def best(self, heap):
+        """맨 앞 주문 (없으면 None)"""
+        while heap and heap[0][2].status != OPEN:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def depth(self, levels=5):
+        """가격별 잔량 [(가격, 수량)] — (매수 호가, 매도 호가) 각각 좋은 가격부터 levels 개"""
+        def aggregate(heap, reverse):
+            totals = {}
+            for _, _, order in heap:
+                if order.status == OPEN:
+                    totals[order.price] = totals.get(order.price, 0) + order.remaining
+            return sorted(totals.items(), reverse=reverse)[:levels]
+        return aggregate(self.bids, True), aggregate(self.asks, False)
+
+    def has_orders(self):
+        return any(order.status == OPEN for heap in (self.bids, self.asks, self.buy_stops, self.sell_stops)
+                   for _, _, order in heap)
+
+
+class Exchange:
+    """
+    모의 거래소: 종목별 호가창에서 사용자 주문끼리 가격-시간 우선으로 체결하고,
+    남은 주문은 시세(실시간 또는 재생)가 닿을 때 그 시세로 체결
+    체결되면 주문을 낸 세션의 계좌(User)에 매수/매도를 반영하고, 현금/보유량이 모자라면 가능한 만큼만 체결
+    같은 계좌(owner)의 한도 확인과 반영은 계좌별 잠금 안에서 하므로, 여러 종목에서 동시에 체결돼도 현금을 두 번 쓰지 않음
+    quotes: QuoteService (주면 시세 갱신 때마다 체결하고, 미체결 주문이 있는 종목은 계속 시세를 받음)
+    """
+
+    def __init__(self, quotes=None):
+        self.quotes = quotes
+        self._books = {}
+        self._books_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._history = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        if quotes is not None:
+            quotes.add_listener(self.on_quotes)
+
+    def book(self, code):
+        book = self._books.get(code)
+        if book is None:
+            with self._books_lock:
+                book = self._books.setdefault(code, OrderBook(code))
+        return book
+
+    def _lock(self, owner):
+        """계좌별 잠금 (한 체결 안에서 다시 잡을 수 있도록 RLock)"""
+        lock = self._locks.get(owner)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(owner, threading.RLock())
+        return lock
+
+    def _locked(self, *orders):
+        """주문들의 계좌 잠금을 owner 순서대로 잡음 (교착 방지, 계좌가 없는 주문은 건너뜀)"""
+        stack = ExitStack()
+        for owner in sorted({order.owner for order in orders if order.account is not None}):
+            stack.enter_context(self._lock(owner))
+        return stack
+
+    def orders(self, owner):
+        """계좌의 최근 주문 (최신순)"""
+        with self._lock(owner):
+            return list(reversed(self._history.get(owner, ())))
+
+    def _trim(self, history):
+        """체결/취소된 주문이 HISTORY_SIZE 개를 넘으면 오래된 것부터 지움 (대기 주문은 남김)"""
+        excess = sum(order.status != OPEN for order in history) - HISTORY_SIZE
+        if excess <= 0:
+            return
+        kept = []
+        for order in history:
+            if excess > 0 and order.status != OPEN:
+                excess -= 1
+            else:
+                kept.append(order)
+        history[:] = kept
+
+    def submit(self, order, account=None):
+        """
+        주문 접수 후 바로 체결할 수 있는 만큼 체결하고 주문 반환 (남은 수량은 호가창/스톱 목록에 대기)
+        account: 체결을 반영할 계좌 (주문을 낸 세션의 User — 나중에 폴러 스레드에서 체결돼도 이 객체에 반영)
+        """
+        order.id = next(self._ids)
+        order.account = account
+        if order.owner is not None:
+            with self._lock(order.owner):
+                self._history.setdefault(order.owner, []).append(order)
+        book = self.book(order.code)
+        with book.lock:
+            if book.last is None and self.quotes is not None:
+                quote = self.quotes.last(order.code)
+                book.last = quote.price if quote else None
+            if order.kind == STOP:
+                if self._stop_triggered(order, book.last):
+                    self._activate(order)
+                    self._match(book, order, order.time)
+                else:
+                    heap = book.buy_stops if order.side == Trade.BUY else book.sell_stops
+                    key = order.stop_price if order.side == Trade.BUY else -order.stop_price
+                    heapq.heappush(heap, (key, next(self._seq), order))
+            else:
+                self._match(book, order, order.time)
+        if order.owner is not None:
+            # 체결 결과가 정해진 뒤에 정리해야 방금 닫힌 주문까지 개수에 들어감
+            with self._lock(order.owner):
+                self._trim(self._history[order.owner])
+        if self.quotes is not None and order.status == OPEN:
+            self.quotes.pin(order.code)
+        return order
+
+    def cancel(self, order_id, owner=None):
+        """미체결 수량 취소 (owner 를 주면 본인 주문만) — 취소했으면 True"""
+        if owner is not None:
+            order = next((o for o in self.orders(owner) if o.id == order_id), None)
+        else:
+            order = next((o for orders in list(self._history.values()) for o in list(orders) if o.id == order_id), None)
+        if order is None:
+            return False
+        book = self.book(order.code)
+        with book.lock:
+            if order.status != OPEN:
+                return False
+            self._close(order, CANCELLED, "사용자 취소")
+        self._release(book)
+        return True
+
+    def on_quote(self, code, price, size=None, time=None):
+        """
+        시세 한 건 반영: 스톱 주문 발동 후, 시세에 닿은 대기 주문을 우선순위대로 그 시세로 체결
+        size: 이 시세로 체결할 수 있는 최대 수량 (None 이면 제한 없음) — 넘으면 부분 체결
+        """
+        time = time or datetime.datetime.now()
+        book = self.book(code)
+        with book.lock:
+            book.last = price
+            for order in self._pop_triggered(book, price):
+                self._activate(order)
+                self._match(book, order, time)
+            available = float("inf") if size is None else size
+            available = self._sweep(book, book.bids, lambda o: o.price >= price, price, available, time)
+            self._sweep(book, book.asks, lambda o: o.price <= price, price, available, time)
+        self._release(book)
+
+    def on_quotes(self, quotes, time=None):
+        """QuoteService 리스너: {종목코드: 가격} (미체결 주문이 있는 종목만 처리)"""
+        for code, price in quotes.items():
+            if code in self._books:
+                self.on_quote(code, price, time=time)
+
+    # 아래는 book.lock 을 잡은 상태에서 호출
+
+    def _stop_triggered(self, order, last):
+        if last is None:
+            return False
+        return last >= order.stop_price if order.side == Trade.BUY else last <= order.stop_price
+
+    def _activate(self, order):
+        """발동한 스톱 주문을 시장가(가격이 없으면) 또는 지정가로 전환"""
+        order.kind = MARKET if order.price is None else LIMIT
+
+    def _pop_triggered(self, book, price):
+        triggered = []
+        while book.buy_stops and book.buy_stops[0][0] <= price:
+            triggered.append(heapq.heappop(book.buy_stops))
+        while book.sell_stops and -book.sell_stops[0][0] >= price:
+            triggered.append(heapq.heappop(book.sell_stops))
+        # 접수 순서대로 처리
+        return [order for _, _, order in sorted(triggered, key=lambda item: item[1]) if order.status == OPEN]
+
+    def _capacity(self, order, price, quantity):
+        """계좌의 현금/보유량으로 체결할 수 있는 수량 (계좌가 없으면 제한 없음, 계좌 잠금 안에서 호출)"""
+        account = order.account
+        if account is None:
+            return quantity
+        if order.side == Trade.BUY:
+            return min(quantity, int(account.money // price))
+        stock = account.stocks.get(order.name)
+        return min(quantity, stock.count if stock else 0)
+
+    def _settle(self, order, price, quantity, time):
+        self._charge(order, price, quantity, time)
+        self._record(order, price, quantity, time)
+
+    def _charge(self, order, price, quantity, time):
+        """계좌에 거래 반영 (실패 시 TradeError)"""
+        account = order.account
+        if account is not None:
+            if order.side == Trade.BUY:
+                account.buy(order.name, price, quantity, time)
+            else:
+                account.sell(order.name, price, quantity, time)
+
+    def _record(self, order, price, quantity, time):
+        order.fills.append((price, quantity, time))
+        order.remaining -= quantity
+        if not order.remaining:
+            order.status = FILLED
+
+    def _close(self, order, status, reason):
+        order.status = status
+        order.reason = reason
+
+    def _fill(self, order, price, quantity, time):
+        """계좌 한도 안에서 체결하고 체결 수량 반환 (한도가 모자라면 체결한 뒤 남은 수량 취소)"""
+        if order.account is None:
+            self._settle(order, price, quantity, time)
+            return quantity
+        with self._locked(order):
+            allowed = self._capacity(order, price, quantity)
+            if allowed > 0:
+                try:
+                    self._settle(order, price, allowed, time)
+                except TradeError as e:
+                    self._close(order, CANCELLED, str(e))
+                    return 0
+        if allowed < quantity and order.status == OPEN:
+            self._close(order, CANCELLED, self._shortage(order))
+        return max(allowed, 0)
+
+    def _shortage(self, order):
+        return "잔액 부족" if order.side == Trade.BUY else "보유 수량 부족"
+
+    def _cross(self, order, resting, price, quantity, time):
+        """
+        들어온 주문과 대기 주문을 같은 수량으로 체결 (두 계좌 잠금 안에서 호출)
+        두 계좌 정산을 한 거래로 묶어 한쪽이 TradeError 로 실패하면 양쪽 모두 되돌리고 실패한 주문만 취소
+        """
+        if self._capacity(resting, price, quantity) <= 0:
+            self._close(resting, CANCELLED, self._shortage(resting))
+            return
+        quantity = self._capacity(resting, price, quantity)
+        allowed = self._capacity(order, price, quantity)
+        if allowed > 0:
+            failed = None
+            try:
+                with ExitStack() as stack:
+                    for side in (order, resting):
+                        if side.account is not None:
+                            stack.enter_context(side.account.transaction(side.name))
+                    for failed in (order, resting):
+                        self._charge(failed, price, allowed, time)
+            except TradeError as e:
+                self._close(failed, CANCELLED, str(e))
+                return
+            self._record(order, price, allowed, time)
+            self._record(resting, price, allowed, time)
+        if allowed < quantity and order.status == OPEN:
+            self._close(order, CANCELLED, self._shortage(order))
+
+    def _match(self, book, order, time):
+        """들어온 주문을 반대편 호가, 그다음 현재 시세와 체결하고 남은 지정가 주문은 호가창에 넣음"""
+        buy = order.side == Trade.BUY
+        opposite = book.asks if buy else book.bids
+        limit = order.price
+        while order.status == OPEN:
+            resting = book.best(opposite)
+            if resting is None or (limit is not None and (resting.price > limit if buy else resting.price < limit)):
+                break
+            if order.owner is not None and resting.owner == order.owner:
+                # 자기 주문과는 체결하지 않고 새 주문의 남은 수량 취소
+                self._close(order, CANCELLED, SELF_TRADE)
+                return
+            price = resting.price
+            quantity = min(order.remaining, resting.remaining)
+            if order.account is not None or resting.account is not None:
+                # 두 계좌를 함께 잠그고 양쪽을 한 번에 정산 — 한도가 없거나 실패한 쪽을 취소 (들어온 주문이면 여기서 끝)
+                with self._locked(order, resting):
+                    self._cross(order, resting, price, quantity, time)
+                continue
+            self._settle(order, price, quantity, time)
+            self._settle(resting, price, quantity, time)
+
+        last = book.last
+        if order.status == OPEN and last is not None and (limit is None or (last <= limit if buy else last >= limit)):
+            # 남은 수량은 시장(현재 시세)과 체결
+            self._fill(order, last, order.remaining, time)
+        if order.status != OPEN:
+            return
+        if order.kind == MARKET:
+            self._close(order, CANCELLED, "체결할 시세 없음")
+            return
+        heapq.heappush(book.bids if buy else book.asks, (-limit if buy else limit, next(self._seq), order))
+
+    def _sweep(self, book, heap, crosses, price, available, time):
+        """시세에 닿은 대기 주문을 우선순위대로 available 수량까지 체결하고 남은 수량 반환"""
+        while available > 0:
+            order = book.best(heap)
+            if order is None or not crosses(order):
+                break
+            available -= self._fill(order, price, min(order.remaining, available), time)
+        return available
+
+    def _release(self, book):
+        """대기 주문이 없는 종목은 더 이상 시세를 붙잡아 두지 않음"""
+        if self.quotes is not None:
+            with book.lock:
+                idle = not book.has_orders()
+            if idle:
+                self.quotes.unpin(book.code)
+
+
+@st.cache_resource(show_spinner=False)
+def get_exchange():
+    """프로세스 전체에서 공유하는 모의 거래소 (공유 시세 서비스로 체결)"""
+    from utils import quotes
+
+    return Exchange(quotes.get_service())
+
+
+# 테스트 실행: 체결 규칙 확인 후 주문 처리량 측정
+if __name__ == "__main__":
+    import random
+    import time as timer
+    from utils.account import User
+
+    # 가격-시간 우선순위와 부분 체결
+    ex = Exchange()
+    a = ex.submit(Order("a", "005930", "삼성전자", Trade.SELL, LIMIT, 10, price=70100))
+    b = ex.submit(Order("b", "005930", "삼성전자", Trade.SELL, LIMIT, 10, price=70000))
+    c = ex.submit(Order("c", "005930", "삼성전자", Trade.SELL, LIMIT, 10, price=70000))
+    buy = ex.submit(Order("d", "005930", "삼성전자", Trade.BUY, LIMIT, 25, price=70100))
+    assert [fill[:2] for fill in buy.fills] == [(70000, 10), (70000, 10), (70100, 5)]
+    assert b.status == c.status == FILLED and a.remaining == 5 and buy.status == FILLED
+
+    # 시장가는 시세가 없으면 남은 수량 취소, 시세가 있으면 그 시세로 체결
+    market = ex.submit(Order("d", "000660", "SK하이닉스", Trade.BUY, MARKET, 3))
+    assert market.status == CANCELLED and not market.fills
+    ex.on_quote("000660", 180000)
+    market = ex.submit(Order("d", "000660", "SK하이닉스", Trade.BUY, MARKET, 3))
+    assert market.status == FILLED and market.fills[0][0] == 180000
+
+    # 지정가 대기 주문은 시세가 닿으면 우선순위대로, size 만큼만 체결
+    low = ex.submit(Order("e", "000660", "SK하이닉스", Trade.BUY, LIMIT, 5, price=179000))
+    high = ex.submit(Order("f", "000660", "SK하이닉스", Trade.BUY, LIMIT, 5, price=179500))
+    ex.on_quote("000660", 179000, size=7)
+    assert high.status == FILLED and low.remaining == 3 and low.fills[0][0] == 179000
+
+    # 스톱 매도: 시세가 스톱 가격 이하로 내려오면 시장가로 체결
+    stop = ex.submit(Order("e", "000660", "SK하이닉스", Trade.SELL, STOP, 2, stop_price=175000))
+    ex.on_quote("000660", 176000)
+    assert stop.status == OPEN
+    ex.on_quote("000660", 174500)
+    assert stop.status == FILLED and stop.fills[0][0] == 174500
+
+    # 계좌 잔액만큼만 체결 (부분 체결 후 나머지 취소)
+    account = User("g", 200_000)
+    ex.on_quote("035720", 50000)
+    partial = ex.submit(Order("g", "035720", "카카오", Trade.BUY, MARKET, 10), account)
+    assert partial.filled == 4 and partial.status == CANCELLED and partial.reason == "잔액 부족"
+    assert account.stocks.get("카카오").count == 4
+
+    # 같은 계좌의 반대 주문과는 체결하지 않음 (새 주문 취소, 기존 주문은 그대로)
+    resting = ex.submit(Order("g", "035720", "카카오", Trade.SELL, LIMIT, 4, price=51000), account)
+    crossing = ex.submit(Order("g", "035720", "카카오", Trade.BUY, LIMIT, 4, price=51000), account)
+    assert crossing.status == CANCELLED and crossing.reason == SELF_TRADE and not crossing.fills
+    assert resting.status == OPEN and resting.remaining == 4
+
+    # 주문 기록은 체결/취소된 주문만 잘라내고 대기 주문은 남김
+    for _ in range(HISTORY_SIZE + 10):
+        ex.submit(Order("g", "000660", "SK하이닉스", Trade.BUY, MARKET, 1), account)
+    assert resting in ex.orders("g") and sum(order.status != OPEN for order in ex.orders("g")) == HISTORY_SIZE
+    assert ex.cancel(resting.id, "g") and resting.status == CANCELLED
+
+    # 한 계좌가 여러 종목에서 동시에 체결돼도 현금을 두 번 쓰거나 갱신을 잃지 않음
+    from concurrent.futures import ThreadPoolExecutor
+
+    class SlowUser(User):
+        """잔액을 읽고 쓰는 사이가 긴 계좌 (DB 왕복처럼 다른 스레드가 끼어들 틈이 있음)"""
+
+        def buy(self, stock_name, stock_price, stock_count, time=None):
+            money = self.money
+            timer.sleep(0.0005)
+            trade = super().buy(stock_name, stock_price, stock_count, time)
+            self.money = money - stock_price * stock_count
+            return trade
+
+    ex = Exchange()
+    racer = SlowUser("h", 1_000_000)
+    race_codes = [f"{i:06d}" for i in range(20)]
+    for code in race_codes:
+        ex.on_quote(code, 10_000)
+    with ThreadPoolExecutor(20) as pool:
+        raced = list(pool.map(lambda code: ex.submit(Order("h", code, code, Trade.BUY, MARKET, 10), racer), race_codes * 5))
+    spent = sum(order.filled for order in raced) * 10_000
+    assert racer.money == 1_000_000 - spent >= 0 and spent == 1_000_000, (racer.money, spent)
+
+    # 대기 주문 쪽 정산이 실패하면 이미 정산한 들어온 주문도 되돌림 (한쪽만 체결된 거래가 남지 않음)
+    class BrokenUser(User):
+        """보유량 검사는 통과하지만 매도 정산에서 실패하는 계좌 (다른 세션이 먼저 팔아 버린 DB 계좌처럼)"""
+
+        def sell(self, stock_name, stock_price, stock_count, time=None):
+            raise TradeError("다른 세션에서 이미 매도됨")
+
+    ex = Exchange()
+    seller, buyer = BrokenUser("i", 0), User("j", 1_000_000)
+    seller.add_stock("카카오", 40000, 5)
+    ask = ex.submit(Order("i", "035720", "카카오", Trade.SELL, LIMIT, 5, price=52000), seller)
+    bid = ex.submit(Order("j", "035720", "카카오", Trade.BUY, LIMIT, 5, price=52000), buyer)
+    assert ask.status == CANCELLED and ask.reason == "다른 세션에서 이미 매도됨" and not ask.fills
+    assert not bid.fills and bid.remaining == 5 and bid.status == OPEN
+    assert buyer.money == 1_000_000 and "카카오" not in buyer.stocks and not buyer.ledger
+    print("체결 규칙 확인 완료")
+
+    # 처리량: 종목 10개, 주문 N건 (지정가 80%, 시장가 10%, 스톱 10%), 100건마다 시세 한 건 (세 번 중 가장 빠른 기록)
+    def make_orders(n, codes, mid, seed):
+        rng = random.Random(seed)
+        orders = []
+        for i in range(n):
+            code = codes[i % len(codes)]
+            side = Trade.BUY if rng.random() < 0.5 else Trade.SELL
+            roll = rng.random()
+            if roll < 0.8:
+                orders.append(Order(None, code, code, side, LIMIT, rng.randint(1, 100),
+                                    price=mid + rng.randint(-20, 20) * 10))
+            elif roll < 0.9:
+                orders.append(Order(None, code, code, side, MARKET, rng.randint(1, 100)))
+            else:
+                orders.append(Order(None, code, code, side, STOP, rng.randint(1, 100),
+                                    stop_price=mid + rng.randint(-50, 50) * 10))
+        ticks = [(codes[i % len(codes)], mid + rng.randint(-30, 30) * 10) for i in range(n // 100)]
+        return orders, ticks
+
+    n, mid = 300_000, 50000
+    codes = [f"{i:06d}" for i in range(10)]
+    best = None
+    for seed in range(3):
+        orders, ticks = make_orders(n, codes, mid, seed)
+        ex = Exchange()
+        for code in codes:
+            ex.on_quote(code, mid)
+        start = timer.perf_counter()
+        for i, order in enumerate(orders):
+            ex.submit(order)
+            if i % 100 == 99:
+                ex.on_quote(*ticks[i // 100], size=500)
+        elapsed = timer.perf_counter() - start
+        fills = sum(len(order.fills) for order in orders)
+        if best is None or elapsed < best[0]:
+            best = elapsed, fills
+    print(f"주문 {n:,}건, 체결 {best[1]:,}건: {best[0]:.2f}초 ({n / best[0]:,.0f}건/초)")
@@ -0,0 +1,307 @@
+import datetime
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from utils import inference, models, ohlcv_store
+
+# 모델 입력 길이와 학습에 쓰는 과거 데이터 기간
+WINDOW = 100
+HISTORY_DAYS = 730
+
+# 예측 결과 캐시 크기 (LRU)
+CACHE_SIZE = 256
+
+
+def rollout(model, sequences, steps):
+    """
+    자기회귀 방식으로 steps일 만큼 미래 값을 예측
+    sequences: (종목 수, window, features) 스케일된 마지막 시퀀스 — 여러 종목을 한 배치로 처리
+    반환값: (종목 수, steps) 스케일된 예측값
+    """
+    sequences = np.asarray(sequences, dtype=np.float32)
+    if sequences.ndim == 2:
+        sequences = sequences[np.newaxis, :, :]
+    batch, window, features = sequences.shape
+    predictions = np.empty((batch, steps), dtype=np.float32)
+    if steps <= 0:
+        return predictions
+
+    # 입력 + 예측값을 담을 버퍼를 미리 할당하고 창(window)만 한 칸씩 밀어가며 사용
+    buffer = np.empty((batch, window + steps, features), dtype=np.float32)
+    buffer[:, :window] = sequences
+    infer = inference.runner_for(model)
+    for i in range(steps):
+        next_scaled = np.asarray(infer(buffer[:, i:i + window])).reshape(batch, -1)
+        predictions[:, i] = next_scaled[:, 0]
+        buffer[:, window + i] = next_scaled[:, :features]
+    return predictions
+
+
+def rollout_many(model, sequences_by_ticker, steps):
+    """
+    종목코드 -> 마지막 시퀀스 딕셔너리를 받아 한 번의 배치 롤아웃으로 예측
+    반환값: 종목코드 -> (steps,) 예측값
+    """
+    tickers = list(sequences_by_ticker)
+    if not tickers:
+        return {}
+    batch = np.stack([np.asarray(sequences_by_ticker[t], dtype=np.float32) for t in tickers])
+    predictions = rollout(model, batch, steps)
+    return dict(zip(tickers, predictions))
+
+
+class _ForecastCache:
+    """
+    (종목, 마지막 데이터 날짜, 모델 버전) -> 예측 상태 LRU 캐시
+    더 긴 기간을 요청하면 저장된 예측을 앞부분으로 재사용하고 나머지만 이어서 예측
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = create()
+        with self._lock:
+            entry = self._entries.setdefault(key, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _ForecastCache()
+
+
+logger = logging.getLogger(__name__)
+
+
+def fit_scaler(close):
+    """종가의 최저/최고가"""
+    close = np.asarray(close, dtype=float)
+    return {"min": float(close.min()), "max": float(close.max())}
+
+
+def get_scaler(model_key, ticker, history):
+    """
+    모델과 종목에 고정된 스케일러 (서비스 중에는 다시 맞추지 않음)
+    학습 파이프라인이 저장한 값이 없으면 처음 요청한 시점의 데이터로 한 번 맞춰 scalers.json 에 남김 (모든 프로세스가 같은 값 사용)
+    """
+    scaler = models.get_scaler(model_key, ticker)
+    if scaler is not None:
+        return scaler
+    return models.share_scaler(model_key, ticker, fit_scaler(history["Close"].to_numpy()))
+
+
+def out_of_range(values, scaler):
+    """스케일러의 최저~최고가를 벗어난 값의 비율"""
+    values = np.asarray(values, dtype=float)
+    return float(((values < scaler["min"]) | (values > scaler["max"])).mean()) if values.size else 0.0
+
+
+def range_warning(future_df):
+    """입력 창이 스케일러 범위를 벗어나 예측을 믿기 어려우면 안내 문구 (아니면 None)"""
+    outside = future_df.attrs.get("out_of_range", 0)
+    if outside:
+        return f"최근 {WINDOW}일 중 {outside:.0%}가 모델이 학습한 가격 범위를 벗어나 예측이 평평하게 나올 수 있습니다."
+    return None
+
+
+def _affine(scaler):
+    """스케일러 -> (최저가, 범위) — 값은 스칼라 또는 행별 배열, 범위가 0이면 1"""
+    low = np.asarray(scaler["min"], dtype=float)
+    span = np.asarray(scaler["max"], dtype=float) - low
+    return low, np.where(span == 0, 1.0, span)
+
+
+def scale(values, scaler, clip=False):
+    """가격 -> 모델 입력 (고정된 최저/최고가로 아핀 변환, clip=True 면 범위 밖 값을 0~1 로 자름)"""
+    low, span = _affine(scaler)
+    scaled = (np.asarray(values, dtype=float) - low) / span
+    if clip:
+        scaled = np.clip(scaled, 0, 1)
+    return scaled.astype(np.float32)
+
+
+def unscale(scaled, scaler):
+    """모델 출력 -> 가격"""
+    low, span = _affine(scaler)
+    return np.asarray(scaled, dtype=float) * span + low
+
+
+def level_shift(predictions, last_close):
+    """
+    예측값 전체를 같은 크기만큼 평행 이동해 첫 예측값을 마지막 종가에 맞춤
+    모델 출력은 가격 수준이 어긋나기 쉽지만 흐름(일별 변화량)은 그대로 쓸 수 있음
+    그래서 첫 예측값과 마지막 종가의 차이를 모든 예측값에서 뺀다 (예측값 사이의 변화량은 유지됨)
+    차트에서는 예측선이 마지막 종가 날짜에서 시작하므로 실제 종가와 끊김 없이 이어짐
+    predictions: (..., horizon) 가격 단위, last_close: 스칼라 또는 (...,)
+    """
+    predictions = np.asarray(predictions, dtype=float)
+    last_close = np.asarray(last_close, dtype=float)[..., np.newaxis]
+    return predictions - predictions[..., :1] + last_close
+
+
+class _ForecastEntry:
+    """한 종목의 마지막 입력 시퀀스와 지금까지 예측한 값"""
+
+    def __init__(self, model, history, scaler, ticker=None):
+        self.model = model
+        self.scaler = scaler
+        window = history["Close"].to_numpy()[-WINDOW:]
+        # 범위를 벗어난 입력은 학습 범위(0~1)로 잘라 넣되 (외삽하면 예측이 크게 어긋남) 그 비율을 남겨 화면에 알림
+        self.out_of_range = out_of_range(window, scaler)
+        if self.out_of_range:
+            logger.warning("%s (%s): 입력 창의 %.0f%%가 스케일러 범위 [%s, %s] 밖이라 잘라서 예측함", ticker,
+                           history.index[-1], self.out_of_range * 100, scaler["min"], scaler["max"])
+        self.sequence = scale(window, scaler, clip=True).reshape(WINDOW, 1)
+        self.scaled = np.empty(0, dtype=np.float32)
+        self.last_close = history["Close"].iloc[-1]
+        self.last_date = history.index[-1]
+        self._lock = threading.Lock()
+
+    def predict(self, horizon):
+        """horizon일 예측값 (원래 가격 단위, 마지막 종가에 맞춰 평행 이동)"""
+        with self._lock:
+            missing = horizon - len(self.scaled)
+            if missing > 0:
+                # 이미 예측한 값 뒤에 이어서 예측 (자기회귀이므로 처음부터 다시 한 것과 같음)
+                tail = np.concatenate([self.sequence[:, 0], self.scaled])[-WINDOW:]
+                more = rollout(self.model, tail.reshape(WINDOW, 1), missing)[0]
+                self.scaled = np.concatenate([self.scaled, more])
+            scaled = self.scaled[:horizon]
+        return level_shift(unscale(scaled, self.scaler), self.last_close)
+
+
+def load_history(ticker, today):
+    """예측에 쓰는 과거 2년 종가"""
+    start_date = today - datetime.timedelta(days=HISTORY_DAYS)
+    return ohlcv_store.read(f"KRX:{ticker}", start_date, today)[["Close"]]
+
+
+def forecast_close(ticker, company_name=None, horizon=7, today=None):
+    """
+    종목의 향후 horizon일 종가 예측 (캐시됨)
+    반환값: 'Close' 열 하나짜리 DataFrame, 마지막 데이터 날짜부터 하루 단위 인덱스
+    """
+    today = today or datetime.date.today()
+    if horizon <= 0:
+        return pd.DataFrame()
+    history = load_history(ticker, today)
+    if len(history) < WINDOW:
+        return pd.DataFrame()
+
+    model_key = models.model_key_for(ticker, company_name)
+    key = (ticker, history.index[-1], models.model_version(model_key))
+    entry = _cache.get(key, lambda: _ForecastEntry(models.load_model(model_key, key[2]), history,
+                                                   get_scaler(model_key, ticker, history), ticker))
+    predictions = entry.predict(horizon)
+
+    future_dates = [entry.last_date + datetime.timedelta(days=i) for i in range(0, horizon)]
+    future_df = pd.DataFrame({"Close": predictions}, index=future_dates)
+    future_df.attrs["out_of_range"] = entry.out_of_range
+    return future_df
+
+
+def forecast_traces(df, future_df):
+    """과거 데이터(종가/캔들)와 예측 종가 트레이스 목록 (선 그래프는 WebGL)"""
+    traces = [go.Scattergl(x=df.index, y=df["Close"], mode="lines", name="종가")]
+    if "Open" in df.columns:
+        traces.append(go.Candlestick(x=df.index,
+                                     open=df["Open"],
+                                     high=df["High"],
+                                     low=df["Low"],
+                                     close=df["Close"],
+                                     name="캔들 스틱"))
+    # 예측 주가 라인 (빨간색)
+    if not future_df.empty:
+        traces.append(go.Scattergl(x=future_df.index, y=future_df["Close"],
+                                 mode="lines",
+                                 name="예측 종가",
+                                 line=dict(color="red", dash="dot")))
+    return traces
+
+
+def forecast_figure(df, future_df, title):
+    """주가 데이터 및 예측가 차트"""
+    fig = go.Figure(forecast_traces(df, future_df))
+    fig.update_layout(title=title,
+                      xaxis_title="Date",
+                      yaxis_title="Price (KRW)",
+                      template="plotly_dark")
+    return fig
+
+
+# 테스트 실행: 예전 방식(매번 최근 2년으로 스케일러를 다시 맞춤)과 고정 스케일러(범위 밖 입력 외삽/잘라내기)의 예측 품질/지연 비교
+if __name__ == "__main__":
+    import time
+    from numpy.lib.stride_tricks import sliding_window_view
+    from sklearn.preprocessing import MinMaxScaler
+
+    model = models.load_model(models.DEFAULT_KRX_MODEL, models.model_version(models.DEFAULT_KRX_MODEL))
+    close = ohlcv_store.get_store().read_local("KRX:005930")
+    if len(close) > 1000:
+        close = close["Close"].to_numpy(dtype=float)
+    else:
+        # 로컬 데이터가 없으면 삼성전자와 비슷한 가격대의 임의 보행 사용
+        close = 60000 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.015, 1500)))
+    history_days, horizon = 490, 5
+    origins = np.arange(history_days - 1, len(close) - horizon, 5)
+    windows = sliding_window_view(close, WINDOW)[origins - WINDOW + 1]
+    actual = close[origins + horizon - 1]
+
+    # 예전 방식: 시점마다 그때까지의 최근 2년 최저/최고가
+    trailing = sliding_window_view(close, history_days)[origins - history_days + 1]
+    old_scaler = {"min": trailing.min(axis=1)[:, None], "max": trailing.max(axis=1)[:, None]}
+    # 새 방식: 첫 시점 이전 데이터로 한 번 맞춘 값을 끝까지 유지 (범위를 벗어난 입력은 외삽, 비교용으로 잘라내기도 측정)
+    fixed = fit_scaler(trailing[0])
+    outside = ((windows < fixed["min"]) | (windows > fixed["max"])).any(axis=1).mean()
+    variants = [("매번 다시 맞춤", old_scaler, False), ("고정 + 외삽", fixed, False), ("고정 + 잘라내기", fixed, True)]
+
+    for name, scaler, clip in variants:
+        predicted = rollout(model, scale(windows, scaler, clip)[:, :, None], horizon)
+        predicted = level_shift(unscale(predicted, scaler), close[origins])
+        error = np.abs(predicted[:, -1] - actual) / actual * 100
+        hit = np.sign(predicted[:, -1] - close[origins]) == np.sign(actual - close[origins])
+        print(f"{name}: {horizon}일 MAPE {error.mean():.2f}%, 방향 적중률 {hit.mean():.2f} ({len(origins)}개 시점)")
+    print(f"고정 스케일러 범위를 벗어난 입력 창 비율: {outside:.0%}")
+
+    # 서비스 중 처음 맞춘 스케일러는 파일에 남아, 나중에 다른 데이터로 맞춘 프로세스도 먼저 저장된 값을 씀
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scalers.json")
+        first = models.share_scaler(models.DEFAULT_KRX_MODEL, "999999", fit_scaler(close[:300]), path)
+        later = models.share_scaler(models.DEFAULT_KRX_MODEL, "999999", fit_scaler(close[-300:]), path)
+        assert later == first and models._read_scalers(path)[models.model_version(models.DEFAULT_KRX_MODEL)]["999999"] == first
+    entry = _ForecastEntry(model, pd.DataFrame({"Close": close[-WINDOW:]}, index=np.arange(WINDOW)), fixed, "999999")
+    assert entry.out_of_range == out_of_range(close[-WINDOW:], fixed)
+    future_df = pd.DataFrame({"Close": entry.predict(horizon)})
+    future_df.attrs["out_of_range"] = entry.out_of_range
+    print(f"마지막 입력 창 범위 밖 비율: {entry.out_of_range:.0%} —", range_warning(future_df))
+
+    # 지연: 요청마다 하던 스케일러 학습 + 변환 vs 저장된 값으로 변환
+    history = pd.DataFrame({"Close": close[-history_days:]})
+    runs = 2000
+    start = time.perf_counter()
+    for _ in range(runs):
+        MinMaxScaler().fit_transform(history[["Close"]].values)[-WINDOW:]
+    old_ms = (time.perf_counter() - start) / runs * 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        scale(history["Close"].to_numpy()[-WINDOW:], fixed, clip=True)
+    new_ms = (time.perf_counter() - start) / runs * 1000
+    print(f"스케일 변환 지연: {old_ms:.3f} ms -> {new_ms:.3f} ms")
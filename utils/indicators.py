@@ -0,0 +1,113 @@
+# 보조 지표 계산 (NumPy 벡터 연산)
+# 모든 함수는 마지막 축을 날짜로 보므로 한 종목(1차원 배열)과 여러 종목(종목 x 날짜 행렬)에 똑같이 쓸 수 있음
+# 계산할 수 없는 앞부분은 NaN
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _asarray(x):
+    return np.asarray(x, dtype=float)
+
+
+def _rolling(x, n, reduce):
+    """길이 n 창마다 reduce 한 값 (복사 없이 창을 만드는 sliding_window_view 사용)"""
+    x = _asarray(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= n:
+        out[..., n - 1:] = reduce(sliding_window_view(x, n, axis=-1), axis=-1)
+    return out
+
+
+def sma(x, n=20):
+    """단순 이동평균"""
+    return _rolling(x, n, np.mean)
+
+
+def rolling_std(x, n=20):
+    return _rolling(x, n, np.std)
+
+
+def _ewm(x, alpha):
+    """지수 가중 평균 (pandas ewm(adjust=False) 와 같음), 선형 필터로 날짜 축 전체를 한 번에 계산"""
+    # scipy 는 불러오는 데 오래 걸려 지표를 처음 계산할 때 import
+    from scipy.signal import lfilter
+
+    x = _asarray(x)
+    if x.shape[-1] == 0:
+        return x.copy()
+    first = x[..., :1]
+    return lfilter([alpha], [1, alpha - 1], x - first, axis=-1) + first
+
+
+def ema(x, n=20):
+    """지수 이동평균"""
+    return _ewm(x, 2 / (n + 1))
+
+
+def _wilder(x, n):
+    """RSI/ATR 에 쓰는 Wilder 평활"""
+    return _ewm(x, 1 / n)
+
+
+def rsi(close, n=14):
+    close = _asarray(close)
+    diff = np.diff(close, axis=-1)
+    gain = _wilder(np.clip(diff, 0, None), n)
+    loss = _wilder(np.clip(-diff, 0, None), n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+    out = np.full(close.shape, np.nan)
+    out[..., 1:] = value
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """(MACD, 시그널, 히스토그램)"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, n=20, k=2):
+    """(중심선, 상단, 하단)"""
+    mid = sma(close, n)
+    width = k * rolling_std(close, n)
+    return mid, mid + width, mid - width
+
+
+def true_range(high, low, close):
+    high, low, close = _asarray(high), _asarray(low), _asarray(close)
+    prev_close = np.concatenate([close[..., :1], close[..., :-1]], axis=-1)
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, n=14):
+    return _wilder(true_range(high, low, close), n)
+
+
+def vwap(high, low, close, volume):
+    """조회 구간 시작부터 누적한 거래량 가중 평균 가격"""
+    typical = (_asarray(high) + _asarray(low) + _asarray(close)) / 3
+    volume = _asarray(volume)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.cumsum(typical * volume, axis=-1) / np.cumsum(volume, axis=-1)
+
+
+def compute_all(df):
+    """OHLCV DataFrame 에 대한 모든 지표 (같은 인덱스의 DataFrame)"""
+    close = df["Close"].to_numpy(dtype=float)
+    result = {
+        "SMA 5": sma(close, 5),
+        "SMA 20": sma(close, 20),
+        "SMA 60": sma(close, 60),
+        "EMA 20": ema(close, 20),
+        "RSI 14": rsi(close, 14),
+    }
+    result["MACD"], result["MACD 시그널"], result["MACD 히스토그램"] = macd(close)
+    result["볼린저 중심"], result["볼린저 상단"], result["볼린저 하단"] = bollinger(close)
+    if {"High", "Low", "Volume"}.issubset(df.columns):
+        high, low, volume = (df[c].to_numpy(dtype=float) for c in ("High", "Low", "Volume"))
+        result["ATR 14"] = atr(high, low, close, 14)
+        result["VWAP"] = vwap(high, low, close, volume)
+    return pd.DataFrame(result, index=df.index)
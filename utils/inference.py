@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import threading
+import weakref
+import numpy as np
+
+# 추론 백엔드 설정 (.env 또는 환경 변수): keras | tflite | onnx
+# tflite/onnx 는 TensorFlow 를 불러오지 않으므로 워커 시작이 빠르고 메모리를 적게 씀
+BACKEND_ENV = "INFERENCE_BACKEND"
+DEFAULT_BACKEND = "keras"
+
+# 변환한 모델 파일 확장자 (원본 .h5 와 같은 위치, 같은 이름)
+# <이름>.export.json 에 변환할 때의 원본 해시를 남겨, 원본이 바뀌면 변환 파일을 쓰지 않음
+EXPORT_SUFFIX = {"tflite": ".tflite", "onnx": ".onnx"}
+EXPORT_META_SUFFIX = ".export.json"
+
+# Keras 모델 -> 컴파일된 실행기 (모델이 사라지면 함께 정리됨)
+_keras_runners = weakref.WeakKeyDictionary()
+
+
+def get_backend():
+    backend = os.getenv(BACKEND_ENV, DEFAULT_BACKEND).lower()
+    if backend not in ("keras", *EXPORT_SUFFIX):
+        raise ValueError(f"지원하지 않는 추론 백엔드: {backend}")
+    return backend
+
+
+class KerasRunner:
+    """model.predict 대신 쓰는 컴파일된 추론 함수 (배치 크기와 무관하게 한 번만 트레이싱)"""
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.input_shape = tuple(model.input_shape)
+        window, features = self.input_shape[1], self.input_shape[2]
+
+        @tf.function(input_signature=[tf.TensorSpec([None, window, features], tf.float32)])
+        def fn(x):
+            return model(x, training=False)
+
+        self._fn = fn
+
+    def __call__(self, x):
+        return self._fn(np.asarray(x, dtype=np.float32)).numpy()
+
+
+def _tflite_interpreter():
+    """가벼운 TFLite 런타임 (LiteRT -> tflite-runtime -> TensorFlow 순)"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteRunner:
+    """
+    TFLite 로 변환한 모델 실행기
+    LSTM 을 TFLite 기본 연산으로 바꾸려면 배치 크기가 고정되어야 하므로 배치 1로 변환하고 행마다 실행
+    인터프리터는 스레드 안전하지 않아 잠금으로 보호
+    """
+
+    def __init__(self, path, num_threads=None):
+        self._interpreter = _tflite_interpreter()(model_path=path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        source = self._interpreter.get_input_details()[0]
+        target = self._interpreter.get_output_details()[0]
+        self._input, self._output = source["index"], target["index"]
+        self._outputs = int(target["shape"][-1])
+        self.input_shape = (None, *(int(d) for d in source["shape"][1:]))
+        self._lock = threading.Lock()
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        out = np.empty((len(x), self._outputs), dtype=np.float32)
+        with self._lock:
+            for i in range(len(x)):
+                self._interpreter.set_tensor(self._input, x[i:i + 1])
+                self._interpreter.invoke()
+                out[i] = self._interpreter.get_tensor(self._output)[0]
+        return out
+
+
+class OnnxRunner:
+    """ONNX Runtime(CPU) 실행기 — 배치 크기 자유, 여러 스레드에서 동시에 호출 가능"""
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        source = self._session.get_inputs()[0]
+        self._input = source.name
+        self.input_shape = (None, *source.shape[1:])
+
+    def __call__(self, x):
+        return self._session.run(None, {self._input: np.asarray(x, dtype=np.float32)})[0]
+
+
+RUNNERS = {"tflite": TFLiteRunner, "onnx": OnnxRunner}
+
+
+def runner_for(model):
+    """실행기는 그대로, Keras 모델은 컴파일된 실행기로 감싸서 반환 (rollout 에서 사용)"""
+    if isinstance(model, (KerasRunner, TFLiteRunner, OnnxRunner)):
+        return model
+    runner = _keras_runners.get(model)
+    if runner is None:
+        runner = _keras_runners[model] = KerasRunner(model)
+    return runner
+
+
+def export_path(path, backend):
+    return os.path.splitext(path)[0] + EXPORT_SUFFIX[backend]
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + EXPORT_META_SUFFIX
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _read_meta(path):
+    if not os.path.exists(_meta_path(path)):
+        return {}
+    with open(_meta_path(path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_exported(path, backend):
+    """원본 .h5 와 같은 내용으로 변환한 파일이 있는지"""
+    return (os.path.exists(export_path(path, backend))
+            and _read_meta(path).get(backend) == _sha256(path))
+
+
+def load(path, backend=None):
+    """
+    .h5 모델 경로로 설정된 백엔드의 실행기 생성
+    변환 파일이 없거나 원본이 바뀌었으면 Keras 로 실행 (python -m utils.inference export 로 변환)
+    """
+    backend = backend or get_backend()
+    if backend != "keras":
+        if is_exported(path, backend):
+            return RUNNERS[backend](export_path(path, backend))
+        print(f"{backend} 변환 파일이 없거나 오래되어 Keras 로 실행합니다: {path}")
+
+    import tensorflow as tf
+
+    # 추론만 하므로 옵티마이저 등은 복원하지 않음
+    return KerasRunner(tf.keras.models.load_model(path, compile=False))
+
+
+def export_tflite(model, path):
+    """배치 1 고정 입력으로 TFLite 변환 (LSTM 이 TFLite 기본 연산으로 변환됨)"""
+    import tensorflow as tf
+
+    fixed = tf.keras.Sequential([tf.keras.Input(batch_shape=(1, *model.input_shape[1:]))] + model.layers)
+    data = tf.lite.TFLiteConverter.from_keras_model(fixed).convert()
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def export_onnx(model, path):
+    """배치 크기가 자유로운 ONNX 로 변환 (tf2onnx 필요)"""
+    import tensorflow as tf
+    import tf2onnx
+
+    fn = tf.function(lambda x: model(x, training=False))
+    signature = [tf.TensorSpec([None, *model.input_shape[1:]], tf.float32, name="x")]
+    proto, _ = tf2onnx.convert.from_function(fn, input_signature=signature, opset=17)
+    with open(path + ".tmp", "wb") as f:
+        f.write(proto.SerializeToString())
+    os.replace(path + ".tmp", path)
+
+
+def export(path, backends=tuple(EXPORT_SUFFIX), model=None):
+    """.h5 모델을 TFLite/ONNX 로 변환해 옆에 저장 (변환 도구가 없는 백엔드는 건너뜀)"""
+    import tensorflow as tf
+
+    model = model or tf.keras.models.load_model(path, compile=False)
+    exporters = {"tflite": export_tflite, "onnx": export_onnx}
+    meta, source = _read_meta(path), _sha256(path)
+    written = []
+    for backend in backends:
+        try:
+            exporters[backend](model, export_path(path, backend))
+        except ImportError as e:
+            print(f"{backend} 변환 건너뜀 ({e.name} 필요)")
+            continue
+        meta[backend] = source
+        written.append(export_path(path, backend))
+    with open(_meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return written
+
+
+# 콜드 스타트 측정용: 새 프로세스에서 import + 모델 로드 + 첫 추론 시간과 최대 메모리
+# (ru_maxrss 는 exec 후에도 부모 값이 남을 수 있어 /proc 의 VmHWM 사용)
+_COLD_START = """
+import sys, time
+start = time.perf_counter()
+import numpy as np
+from utils import inference
+runner = inference.load(sys.argv[1], sys.argv[2])
+runner(np.zeros((1, *runner.input_shape[1:]), dtype=np.float32))
+elapsed = time.perf_counter() - start
+peak = next(line.split()[1] for line in open("/proc/self/status") if line.startswith("VmHWM"))
+print(elapsed, int(peak) / 1024)
+"""
+
+
+# 실행: python -m utils.inference export  (model/ 의 모든 .h5 변환)
+#       python -m utils.inference bench   (Keras 와의 일치 여부 + 콜드 스타트/지연/메모리 비교)
+if __name__ == "__main__":
+    import subprocess
+    import sys
+    import time
+    from utils import models
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    paths = list(models.list_models().values())
+    if command == "export":
+        for path in paths:
+            print(path, "->", export(path))
+        sys.exit()
+
+    path = models.list_models()[models.DEFAULT_KRX_MODEL]
+    if not all(is_exported(path, b) for b in EXPORT_SUFFIX):
+        export(path)
+    x = np.random.default_rng(0).random((64, 100, 1), dtype=np.float32)
+    reference = load(path, "keras")(x)
+    for backend in ("keras", *EXPORT_SUFFIX):
+        seconds, rss = subprocess.run([sys.executable, "-c", _COLD_START, path, backend], capture_output=True,
+                                      text=True, env={**os.environ, "PYTHONPATH": os.getcwd()}).stdout.split()[-2:]
+        runner = load(path, backend)
+        diff = np.abs(runner(x) - reference).max()
+        latency = {}
+        for batch in (1, 64):
+            runner(x[:batch])
+            runs = 50 if batch == 1 else 5
+            start = time.perf_counter()
+            for _ in range(runs):
+                runner(x[:batch])
+            latency[batch] = (time.perf_counter() - start) / runs * 1000
+        print(f"{backend:>6}: 최대 오차 {diff:.2e} | 콜드 스타트 {float(seconds):.2f}s, 최대 메모리 {float(rss):.0f}MB"
+              f" | 추론 지연 배치 1: {latency[1]:.2f}ms, 배치 64: {latency[64]:.1f}ms")
@@ -0,0 +1,142 @@
+import datetime
+import os
+import pandas as pd
+import streamlit as st
+
+# KRX 상장 종목 목록 원본 및 로컬 사본
+KRX_LISTING_URL = "http://kind.krx.co.kr/corpgeneral/corpList.do?method=download"
+LISTING_PATH = "./data/krx_listing.csv"
+
+# 로컬 사본을 새로 받아오는 주기
+LISTING_TTL = datetime.timedelta(days=1)
+
+# 한글 초성 (유니코드 음절 순서)
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+
+
+def to_chosung(text):
+    """'삼성전자' -> 'ㅅㅅㅈㅈ' (한글이 아닌 문자는 그대로)"""
+    chars = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        chars.append(CHOSUNG[code // 588] if 0 <= code < 11172 else ch)
+    return "".join(chars)
+
+
+def is_chosung_query(text):
+    return bool(text) and all(ch in CHOSUNG for ch in text)
+
+
+def download_listing():
+    """KRX에서 상장 종목 목록(회사명, 종목코드, 업종) 다운로드"""
+    stock_info = pd.read_html(KRX_LISTING_URL, header=0, encoding="cp949")[0]
+    stock_info["종목코드"] = stock_info["종목코드"].apply(lambda x: f"{x:06d}")
+    return stock_info[["회사명", "종목코드", "업종"]]
+
+
+def load_listing(path=LISTING_PATH, ttl=LISTING_TTL, download=download_listing):
+    """로컬 사본이 TTL 이내면 그대로 쓰고, 아니면 새로 받아 저장 (실패 시 오래된 사본 사용)"""
+    if os.path.exists(path):
+        age = datetime.datetime.now() - datetime.datetime.fromtimestamp(os.path.getmtime(path))
+        if age < ttl:
+            return pd.read_csv(path, dtype=str)
+    try:
+        stock_info = download()
+    except Exception:
+        if os.path.exists(path):
+            return pd.read_csv(path, dtype=str)
+        raise
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    stock_info.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return stock_info
+
+
+class _NgramIndex:
+    """부분 문자열 검색용 1-gram / 2-gram 역색인"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.postings = {}
+        for i, text in enumerate(texts):
+            for gram in self._grams(text):
+                self.postings.setdefault(gram, set()).add(i)
+
+    @staticmethod
+    def _grams(text):
+        grams = set(text)
+        grams.update(text[j:j + 2] for j in range(len(text) - 1))
+        return grams
+
+    def search(self, query):
+        """query를 포함하는 항목 번호 (원래 순서대로)"""
+        grams = [query[j:j + 2] for j in range(len(query) - 1)] or [query]
+        candidates = None
+        # 가장 짧은 포스팅부터 교집합
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram)
+            if not posting:
+                return []
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return []
+        # 2-gram 이 모두 있어도 연속하지 않을 수 있으므로 최종 확인
+        return sorted(i for i in candidates if query in self.texts[i])
+
+
+class ListingIndex:
+    """회사명 <-> 종목코드 해시 색인 + 회사명/초성 부분 검색"""
+
+    def __init__(self, stock_info):
+        self.names = stock_info["회사명"].astype(str).tolist()
+        self.codes = stock_info["종목코드"].astype(str).str.zfill(6).tolist()
+        self.name_to_code = {}
+        for name, code in zip(self.names, self.codes):
+            self.name_to_code.setdefault(name, code)
+        self.code_to_name = dict(zip(self.codes, self.names))
+        self._names = _NgramIndex(self.names)
+        self._chosung = _NgramIndex([to_chosung(name) for name in self.names])
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, term):
+        """회사명 검색 (부분 일치, 'ㅅㅅㅈㅈ' 같은 초성 검색 지원) — 검색어가 없으면 전체 목록"""
+        if not term:
+            return list(self.names)
+        index = self._chosung if is_chosung_query(term) else self._names
+        return [self.names[i] for i in index.search(term)]
+
+    def code_of(self, company_name):
+        return self.name_to_code.get(company_name)
+
+    def name_of(self, code):
+        return self.code_to_name.get(code)
+
+
+@st.cache_resource(ttl=LISTING_TTL, show_spinner=False)
+def get_listing():
+    """프로세스 전체에서 공유하는 종목 색인 (TTL 마다 갱신)"""
+    return ListingIndex(load_listing())
+
+
+def search(term):
+    return get_listing().search(term)
+
+
+def get_ticker_symbol(company_name):
+    """회사명 -> 종목코드 (없으면 None)"""
+    return get_listing().code_of(company_name)
+
+
+def get_company_name(code):
+    """종목코드 -> 회사명 (없으면 None)"""
+    return get_listing().name_of(code)
+
+
+# 테스트 실행
+if __name__ == "__main__":
+    sample = pd.DataFrame({"회사명": ["삼성전자", "삼성SDI", "SK하이닉스", "LG전자", "현대차"],
+                           "종목코드": ["005930", "006400", "000660", "066570", "005380"]})
+    index = ListingIndex(sample)
+    print(index.search("전자"), index.search("ㅅㅅ"), index.search("하이"), index.code_of("현대차"), index.name_of("000660"))
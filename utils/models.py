@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import numpy as np
+import streamlit as st
+from filelock import FileLock
+from utils import inference
+
+# 모델 파일 위치 및 이름 규칙: keras_model_<종목명 또는 티커>.h5
+MODEL_DIR = "./model"
+MODEL_PREFIX = "keras_model_"
+MODEL_SUFFIX = ".h5"
+
+# 학습 파이프라인(utils/training.py)이 만든 모델 목록: 모델 키별 버전 이력 + 종목코드 -> 모델 키
+MANIFEST_PATH = os.path.join(MODEL_DIR, "manifest.json")
+
+# 기본 모델(매니페스트에 없는 모델)용 종목별 스케일러: 모델 버전 -> 종목코드 -> 최저/최고가 (새 버전이 학습되면 무효)
+# python -m utils.training --scalers 가 미리 맞춰 두고, 없는 종목은 예측 서비스가 처음 맞춘 값을 한 번만 추가 (덮어쓰지 않음)
+SCALERS_PATH = os.path.join(MODEL_DIR, "scalers.json")
+
+# 프로세스에 올려 두는 모델 수 (종목/업종별 모델이 많으므로 넘치면 오래된 것부터 내림)
+MODEL_CACHE_SIZE = 32
+
+# 전용 모델이 없을 때 쓰는 기본 모델 (국내 종목 / 해외 종목)
+DEFAULT_KRX_MODEL = "삼성전자"
+DEFAULT_FOREIGN_MODEL = "AAPL"
+
+
+_manifest_cache = {}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """매니페스트 읽기 (파일이 바뀔 때만 다시 읽음, 없으면 빈 매니페스트) — 반환값은 공유 객체이므로 고쳐 쓰지 않음"""
+    if not os.path.exists(path):
+        return {"models": {}, "tickers": {}}
+    mtime = os.path.getmtime(path)
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding="utf-8") as f:
+            cached = (mtime, json.load(f))
+        _manifest_cache[path] = cached
+    # 매번 복사하지 않고 캐시된 객체를 그대로 반환 — 고쳐 쓰는 쪽(training.train)이 직접 복사
+    return cached[1]
+
+
+def model_info(key):
+    """학습 파이프라인이 만든 모델의 최신 버전 메타데이터 (스케일러, 학습 기간, 평가 지표) — 없으면 None"""
+    versions = load_manifest()["models"].get(key)
+    return versions[-1] if versions else None
+
+
+_scalers_lock = threading.Lock()
+
+
+def _scalers_file_lock(path):
+    """scalers.json 을 고쳐 쓰는 여러 프로세스(학습 배치, 서비스 워커) 사이의 잠금"""
+    return FileLock(path + ".lock")
+
+
+def _read_scalers(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_scalers(path=SCALERS_PATH, mtime=None):
+    """
+    저장된 스케일러를 프로세스당 한 번만 읽어 모든 세션이 공유 (파일이 바뀌어 mtime 이 달라질 때만 다시 읽음)
+    반환값은 공유 객체이므로 고쳐 쓰지 않음
+    """
+    return _read_scalers(path)
+
+
+def get_scaler(key, ticker):
+    """
+    모델과 종목에 고정된 스케일러 {"min", "max"} (없으면 None)
+    학습 파이프라인이 매니페스트에 남긴 값, 없으면 기본 모델용으로 scalers.json 에 저장해 둔 값
+    """
+    info = model_info(key)
+    trained = info.get("scaler", {}).get(ticker) if info is not None else None
+    if trained is not None:
+        return trained
+    mtime = os.path.getmtime(SCALERS_PATH) if os.path.exists(SCALERS_PATH) else None
+    return load_scalers(SCALERS_PATH, mtime).get(model_version(key), {}).get(ticker)
+
+
+def save_scalers(key, scalers, path=SCALERS_PATH):
+    """현재 모델 버전의 종목별 스케일러 {종목코드: {"min", "max"}} 저장 (학습 파이프라인 전용)"""
+    version = model_version(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _scalers_lock, _scalers_file_lock(path):
+        saved = _read_scalers(path)
+        saved.setdefault(version, {}).update(scalers)
+        _write_scalers(saved, path)
+    return scalers
+
+
+def share_scaler(key, ticker, scaler, path=SCALERS_PATH):
+    """
+    학습된 값이 없는 종목에 서비스 중 맞춘 스케일러를 저장하고, 다른 프로세스가 먼저 저장했으면 그 값 반환
+    모든 워커와 재시작 후에도 (모델 버전, 종목)마다 같은 스케일러를 씀
+    """
+    version = model_version(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _scalers_lock, _scalers_file_lock(path):
+        saved = _read_scalers(path)
+        shared = saved.setdefault(version, {}).get(ticker)
+        if shared is not None:
+            return shared
+        saved[version][ticker] = scaler
+        _write_scalers(saved, path)
+    return scaler
+
+
+def _write_scalers(saved, path):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(saved, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def list_models():
+    """model/ 폴더의 모델 목록 (키 -> 파일 경로), 매니페스트의 최신 버전이 같은 이름의 파일보다 우선"""
+    models = {}
+    if not os.path.isdir(MODEL_DIR):
+        return models
+    for file_name in sorted(os.listdir(MODEL_DIR)):
+        if file_name.startswith(MODEL_PREFIX) and file_name.endswith(MODEL_SUFFIX):
+            key = file_name[len(MODEL_PREFIX):-len(MODEL_SUFFIX)]
+            models[key] = os.path.join(MODEL_DIR, file_name)
+    for key, versions in load_manifest()["models"].items():
+        if versions:
+            models[key] = os.path.join(MODEL_DIR, versions[-1]["path"])
+    return models
+
+
+def model_version(key):
+    """캐시 키로 쓰는 모델 버전 (파일이 바뀌거나 새 버전이 학습되면 달라짐)"""
+    info = model_info(key)
+    if info is not None:
+        return f"{key}@v{info['version']}"
+    path = list_models()[key]
+    return f"{key}@{int(os.path.getmtime(path))}"
+
+
+def model_key_for(ticker, company_name=None):
+    """종목에 맞는 모델 키 선택 (매니페스트의 종목별/업종별 모델 -> 종목명 -> 티커 -> 시장별 기본 모델 순)"""
+    trained = load_manifest()["tickers"].get(str(ticker)) if ticker else None
+    if trained:
+        return trained
+    models = list_models()
+    for key in (company_name, ticker):
+        if key and key in models:
+            return key
+    if ticker and str(ticker).isdigit():
+        return DEFAULT_KRX_MODEL
+    return DEFAULT_FOREIGN_MODEL
+
+
+@st.cache_resource(show_spinner=False, max_entries=MODEL_CACHE_SIZE)
+def load_model(key, version=None):
+    """
+    모델 실행기를 프로세스당 한 번만 로드해 모든 세션/페이지가 공유 (version 이 바뀌면 새로 로드)
+    백엔드(Keras/TFLite/ONNX)는 INFERENCE_BACKEND 설정을 따름
+    """
+    return inference.load(list_models()[key])
+
+
+def get_model(ticker, company_name=None):
+    """종목에 맞는 (공유) 모델 반환"""
+    key = model_key_for(ticker, company_name)
+    return load_model(key, model_version(key))
+
+
+def _warm_up():
+    """
+    model/ 폴더의 모델을 미리 로드하고 추론 함수를 한 번 실행해 트레이싱까지 끝내 둠
+    매니페스트의 종목별/업종별 모델은 수가 많으므로 처음 쓰일 때 로드
+    """
+    from utils import forecast
+
+    trained = load_manifest()["models"]
+    for key in list_models():
+        if key in trained:
+            continue
+        try:
+            model = load_model(key, model_version(key))
+            window, features = model.input_shape[1], model.input_shape[2]
+            forecast.rollout(model, np.zeros((1, window, features), dtype=np.float32), 1)
+        except Exception as e:
+            print(f"모델 워밍업 실패 ({key}): {e}")
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """백그라운드 워밍업 스레드를 프로세스당 한 번만 시작"""
+    thread = threading.Thread(target=_warm_up, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,156 @@
+import threading
+import time
+from urllib.parse import quote
+import requests
+from lxml import html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 네이버 금융 주요 뉴스 / 네이버 뉴스 검색
+MAIN_NEWS_URL = "https://finance.naver.com/news/"
+SEARCH_NEWS_URL = "https://search.naver.com/search.naver?where=news&query={keyword}&sm=tab_tmr"
+
+# 같은 주소는 이 시간 동안 다시 요청하지 않음 (모든 세션 공유)
+NEWS_TTL = 300
+# (연결, 응답) 타임아웃 초
+TIMEOUT = (3, 10)
+
+
+def _make_session():
+    """keep-alive 커넥션 풀과 재시도 설정이 된 공용 세션"""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "Mozilla/5.0"
+    return session
+
+
+session = _make_session()
+
+
+class _CachedPage:
+    __slots__ = ("fetched_at", "etag", "last_modified", "value", "lock")
+
+    def __init__(self):
+        self.fetched_at = 0.0
+        self.etag = None
+        self.last_modified = None
+        self.value = None
+        self.lock = threading.Lock()
+
+
+_pages = {}
+_pages_lock = threading.Lock()
+
+
+def fetch_parsed(url, parse, ttl=NEWS_TTL):
+    """
+    url 을 받아 parse(text) 결과를 TTL 동안 캐시
+    만료되면 ETag / Last-Modified 로 조건부 요청을 보내 304 면 기존 결과를 그대로 사용
+    같은 주소를 동시에 요청하면 한 번만 받아옴
+    """
+    with _pages_lock:
+        page = _pages.setdefault(url, _CachedPage())
+    with page.lock:
+        if page.value is not None and time.monotonic() - page.fetched_at < ttl:
+            return page.value
+        headers = {}
+        if page.value is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        response = session.get(url, headers=headers, timeout=TIMEOUT)
+        if response.status_code == 304 and page.value is not None:
+            page.fetched_at = time.monotonic()
+            return page.value
+        # 요청 실패 처리
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch the page: {response.status_code}")
+        page.value = parse(response.text)
+        page.etag = response.headers.get("ETag")
+        page.last_modified = response.headers.get("Last-Modified")
+        page.fetched_at = time.monotonic()
+        return page.value
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def parse_main_news(text, base_url=MAIN_NEWS_URL):
+    """네이버 금융 뉴스 페이지의 주요 뉴스 목록"""
+    tree = html.fromstring(text)
+    sections = tree.xpath(f"//div[{_has_class('main_news')}]")
+    if not sections:
+        raise Exception("News section not found on the page.")
+    articles = []
+    for item in sections[0].iter("li"):
+        links = item.xpath(".//a")
+        if links:
+            link_tag = links[0]
+            title = "".join(part.strip() for part in link_tag.itertext())
+            link = link_tag.get("href", "")
+            articles.append({"title": title, "link": base_url + link[5:]})
+    return articles
+
+
+def parse_search_news(text):
+    """네이버 뉴스 검색 결과의 기사 목록"""
+    tree = html.fromstring(text)
+    return [{"title": item.get("title"), "link": item.get("href")}
+            for item in tree.xpath(f"//a[{_has_class('news_tit')}]")]
+
+
+def get_main_news():
+    """네이버 금융 주요 뉴스 (캐시됨)"""
+    return fetch_parsed(MAIN_NEWS_URL, parse_main_news)
+
+
+def search_news(keyword):
+    """종목 관련 뉴스 검색 (캐시됨)"""
+    return fetch_parsed(SEARCH_NEWS_URL.format(keyword=quote(keyword)), parse_search_news)
+
+
+# 테스트 실행 (로컬 HTML 서버로 캐시/조건부 요청 확인)
+if __name__ == "__main__":
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    FIXTURE = """<html><body><div class="main_news"><ul>
+    <li><a href="/news/news_read.naver?article_id=1">첫 번째 <b>기사</b></a></li>
+    <li><a href="/news/news_read.naver?article_id=2">두 번째 기사</a></li>
+    </ul></div></body></html>""".encode("utf-8")
+    hits = {"200": 0, "304": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                hits["304"] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            hits["200"] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(FIXTURE)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/news/"
+
+    threads = [threading.Thread(target=fetch_parsed, args=(url, parse_main_news)) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(fetch_parsed(url, parse_main_news))
+    fetch_parsed(url, parse_main_news, ttl=0)
+    print(f"전체 응답 200: {hits['200']}회, 304: {hits['304']}회")
+    server.shutdown()
@@ -0,0 +1,332 @@
+import datetime
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import streamlit as st
+from filelock import FileLock
+
+# 로컬 OHLCV 저장소 위치 (종목별 Parquet 파일 + 동기화 범위 메타데이터)
+STORE_DIR = "./data/ohlcv"
+
+# 오늘 데이터는 장중에 바뀌므로 이 시간이 지나면 마지막 구간을 다시 받아옴
+TODAY_REFRESH = datetime.timedelta(minutes=10)
+
+# 전체 종목 종가/거래량을 한곳에 모은 표 (스크리너가 종목 파일 수천 개를 매번 읽지 않도록)
+# <STORE_DIR>/_panel/base.parquet + 종목을 저장할 때마다 새로 받은 행만 담은 조각 파일
+# 여러 프로세스가 같은 저장소를 쓰므로 panel 파일을 쓰고 읽고 합치는 동안은 panel.lock 파일 잠금을 잡음
+PANEL_DIR = "_panel"
+# 조각 파일이 이만큼 쌓이면 조각을 쓴 쪽이 바로 base 로 합침 (어느 페이지에서 저장하든 조각 수가 이 이하로 유지)
+PANEL_COMPACT_PARTS = 20
+# batch() 안에서는 이만큼 종목이 모일 때마다 조각 파일 하나로 씀
+PANEL_BATCH_SYMBOLS = 200
+
+
+def _to_date(value):
+    """str / datetime / Timestamp 를 date 로 통일"""
+    if value is None:
+        return None
+    return pd.Timestamp(value).date()
+
+
+def _fdr_source(symbol, start, end):
+    import FinanceDataReader as fdr
+
+    return fdr.DataReader(symbol, start, end)
+
+
+class OHLCVStore:
+    """
+    FinanceDataReader 결과를 종목별로 디스크에 저장하고,
+    저장된 범위 밖의 날짜만 원본에서 추가로 받아오는 저장소
+    전체 종목 종가/거래량 표(panel)도 함께 관리해, 저장할 때마다 새로 받은 행만 조각으로 덧붙임
+    source: (symbol, start, end) -> DataFrame 인 함수 (테스트 시 스텁으로 교체 가능)
+    """
+
+    def __init__(self, root=STORE_DIR, source=None, today=None):
+        self.root = root
+        self.source = source or _fdr_source
+        self._today = today
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._panel_lock = threading.Lock()
+        self._pending = []
+        self._batch_depth = 0
+        self._part_ids = itertools.count()
+        os.makedirs(os.path.join(root, PANEL_DIR), exist_ok=True)
+        self._panel_file_lock = FileLock(os.path.join(root, PANEL_DIR, "panel.lock"))
+        with self._panel_file_lock:
+            if not os.path.exists(self._panel_base()) and not self._symbol_keys():
+                # 새 저장소는 빈 표에서 시작 (기존 저장소는 처음 읽을 때 종목 파일로 한 번 만듦)
+                self._write_panel(self._empty_panel())
+
+    def today(self):
+        return self._today() if self._today else datetime.date.today()
+
+    def _lock(self, symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    @staticmethod
+    def key(symbol):
+        """종목 심볼 -> 파일 이름과 panel 의 symbol 열에 쓰는 키"""
+        return symbol.replace(":", "_").replace("/", "_")
+
+    def _paths(self, symbol):
+        key = self.key(symbol)
+        return os.path.join(self.root, f"{key}.parquet"), os.path.join(self.root, f"{key}.json")
+
+    def _symbol_keys(self):
+        """디스크에 저장된 종목 키 목록"""
+        return sorted(name[:-len(".parquet")] for name in os.listdir(self.root)
+                      if name.endswith(".parquet") and os.path.exists(os.path.join(self.root, name[:-len(".parquet")] + ".json")))
+
+    def _load(self, symbol):
+        data_path, meta_path = self._paths(symbol)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return pd.DataFrame(), None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        return pd.read_parquet(data_path), meta
+
+    def _save(self, symbol, df, meta, changed=None):
+        """종목 데이터 저장 (changed: 이번에 새로 받은 행 — 없으면 전체를 panel 에 반영)"""
+        data_path, meta_path = self._paths(symbol)
+        # 다른 프로세스가 읽는 중에도 깨진 파일이 보이지 않도록 임시 파일에 쓰고 교체
+        df.to_parquet(data_path + ".tmp")
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._record(self.key(symbol), df if changed is None else changed)
+
+    # 전체 종목 종가/거래량 표 (긴 형식: Date 인덱스, symbol / Close / Volume 열)
+
+    def _panel_base(self):
+        return os.path.join(self.root, PANEL_DIR, "base.parquet")
+
+    def _panel_parts(self):
+        directory = os.path.join(self.root, PANEL_DIR)
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.startswith("part-") and name.endswith(".parquet"))
+
+    @staticmethod
+    def _empty_panel():
+        return pd.DataFrame({"symbol": pd.Categorical([]), "Close": np.empty(0), "Volume": np.empty(0)},
+                            index=pd.DatetimeIndex([], name="Date"))
+
+    @staticmethod
+    def _panel_rows(key, df):
+        """종목 데이터 -> panel 행"""
+        volume = df["Volume"].to_numpy(dtype=float) if "Volume" in df else np.full(len(df), np.nan)
+        return pd.DataFrame({"symbol": key, "Close": df["Close"].to_numpy(dtype=float), "Volume": volume},
+                            index=pd.DatetimeIndex(df.index, name="Date"))
+
+    def _write_panel(self, panel, path=None):
+        path = path or self._panel_base()
+        panel = panel.astype({"symbol": "category"})
+        panel.to_parquet(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def _record(self, key, rows):
+        """새로 받은 행을 panel 조각으로 남김 (batch 중이면 모아서 씀)"""
+        if rows.empty or "Close" not in rows:
+            return
+        with self._panel_lock:
+            self._pending.append(self._panel_rows(key, rows))
+            if self._batch_depth and len(self._pending) < PANEL_BATCH_SYMBOLS:
+                return
+            self._flush()
+
+    def _flush(self):
+        """모아 둔 행을 조각 파일 하나로 쓰고, 조각이 PANEL_COMPACT_PARTS 개 이상이면 합침 (_panel_lock 을 잡은 상태에서 호출)"""
+        if not self._pending:
+            return
+        part = pd.concat(self._pending)
+        self._pending = []
+        name = f"part-{time.time_ns()}-{os.getpid()}-{next(self._part_ids)}.parquet"
+        with self._panel_file_lock:
+            self._write_panel(part, os.path.join(self.root, PANEL_DIR, name))
+            if len(self._panel_parts()) >= PANEL_COMPACT_PARTS:
+                # base 가 아직 없는 기존 저장소면 종목 파일로 만들면서 조각을 정리
+                self._compact() if os.path.exists(self._panel_base()) else self._rebuild_panel()
+
+    def _read_panel(self):
+        """base 와 조각 파일을 합친 panel 과 읽은 조각 목록 (파일 잠금을 잡은 상태에서 호출)"""
+        parts = self._panel_parts()
+        frames = [pd.read_parquet(self._panel_base())] + [pd.read_parquet(part) for part in parts]
+        if not parts:
+            return frames[0], parts
+        # 같은 (날짜, 종목)은 나중에 저장한 값 사용 (장중에 다시 받은 오늘 종가 등)
+        panel = pd.concat(frames).astype({"symbol": "category"})
+        latest = ~pd.MultiIndex.from_arrays([panel.index, panel["symbol"]]).duplicated(keep="last")
+        return panel[latest], parts
+
+    def _compact(self):
+        """조각 파일을 base 로 합치고 지움 (파일 잠금을 잡은 상태에서 호출 — 다른 프로세스가 읽는 중인 조각은 지우지 않음)"""
+        panel, parts = self._read_panel()
+        if parts:
+            self._write_panel(panel)
+            for part in parts:
+                os.remove(part)
+
+    @contextmanager
+    def batch(self):
+        """여러 종목을 연달아 동기화할 때 panel 조각을 종목마다가 아니라 PANEL_BATCH_SYMBOLS 종목마다 씀"""
+        with self._panel_lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._panel_lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._flush()
+
+    def _rebuild_panel(self, max_workers=16):
+        """기존 저장소: 종목 파일 전체로 panel 을 한 번 만듦 (그 뒤로는 조각만 덧붙임, 파일 잠금을 잡은 상태에서 호출)"""
+        for part in self._panel_parts():
+            os.remove(part)
+        keys = self._symbol_keys()
+
+        def load(key):
+            df = pd.read_parquet(os.path.join(self.root, f"{key}.parquet"))
+            return self._panel_rows(key, df) if "Close" in df and not df.empty else None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = [frame for frame in pool.map(load, keys) if frame is not None]
+        self._write_panel(pd.concat(frames) if frames else self._empty_panel())
+
+    def panel(self, start=None):
+        """
+        전체 종목 종가/거래량 (Date 인덱스, symbol / Close / Volume 열, start 이후만)
+        base 와 조각 파일(최대 PANEL_COMPACT_PARTS 개)만 읽음
+        """
+        with self._panel_lock:
+            self._flush()
+            with self._panel_file_lock:
+                if not os.path.exists(self._panel_base()):
+                    self._rebuild_panel()
+                panel, _ = self._read_panel()
+        if start is not None:
+            panel = panel[panel.index >= pd.Timestamp(_to_date(start))]
+        return panel
+
+    def _fetch(self, symbol, start, end):
+        df = self.source(symbol, start, end)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df.index = pd.to_datetime(df.index)
+        return df
+
+    def sync(self, symbol, start, end):
+        """[start, end] 구간 중 저장소에 없는 부분만 받아와 저장하고 전체 데이터를 반환"""
+        today = self.today()
+        start, end = _to_date(start), min(_to_date(end), today)
+        with self._lock(symbol):
+            df, meta = self._load(symbol)
+            now = datetime.datetime.now()
+            parts = []
+            if meta is None:
+                parts.append(self._fetch(symbol, start, end))
+                lo, hi = start, end
+            else:
+                lo, hi = _to_date(meta["start"]), _to_date(meta["end"])
+                synced_at = datetime.datetime.fromisoformat(meta["synced_at"])
+                if start < lo:
+                    parts.append(self._fetch(symbol, start, lo - datetime.timedelta(days=1)))
+                    lo = start
+                stale_today = hi >= today and now - synced_at > TODAY_REFRESH
+                if end > hi or (end >= hi and stale_today):
+                    # 마지막 저장일은 장중 값일 수 있으므로 그날부터 다시 받음
+                    parts.append(self._fetch(symbol, hi, end))
+                    hi = max(hi, end)
+            if not parts:
+                return df
+            fetched = [p for p in parts if not p.empty]
+            merged = pd.concat([df] + fetched)
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            changed = pd.concat(fetched) if fetched else pd.DataFrame()
+            self._save(symbol, merged, {"start": lo.isoformat(), "end": hi.isoformat(), "synced_at": now.isoformat()},
+                       changed)
+            return merged
+
+    def read(self, symbol, start, end=None):
+        """fdr.DataReader 와 같은 의미의 구간 조회 (end 포함), 데이터는 디스크에서 제공"""
+        end = end if end is not None else self.today()
+        df = self.sync(symbol, start, end)
+        if df.empty:
+            return df
+        return df.loc[pd.Timestamp(_to_date(start)):pd.Timestamp(_to_date(end))].copy()
+
+    def read_local(self, symbol, start=None):
+        """원본에 요청하지 않고 디스크에 있는 데이터만 조회 (없으면 빈 DataFrame)"""
+        df, _ = self._load(symbol)
+        if df.empty or start is None:
+            return df
+        return df.loc[pd.Timestamp(_to_date(start)):]
+
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    """프로세스 전체에서 공유하는 저장소"""
+    return OHLCVStore()
+
+
+def read(symbol, start, end=None):
+    """페이지에서 fdr.DataReader 대신 사용하는 함수"""
+    return get_store().read(symbol, start, end)
+
+
+# 테스트 실행 (네트워크 없이 스텁 데이터 소스로 증분 동기화 확인)
+if __name__ == "__main__":
+    import tempfile
+
+    calls = []
+
+    def stub_source(symbol, start, end):
+        calls.append((_to_date(start), _to_date(end)))
+        index = pd.bdate_range(start, end, name="Date")
+        close = np.arange(len(index), dtype=float) + 100
+        return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1}, index=index)
+
+    fixed_today = datetime.date(2024, 6, 28)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OHLCVStore(tmp, source=stub_source, today=lambda: fixed_today)
+        first = store.read("KRX:005930", fixed_today - datetime.timedelta(days=30), fixed_today)
+        again = store.read("KRX:005930", fixed_today - datetime.timedelta(days=10), fixed_today)
+        older = store.read("KRX:005930", fixed_today - datetime.timedelta(days=60), fixed_today)
+        print(f"원본 호출 {len(calls)}회: {calls}")
+        print(len(first), len(again), len(older))
+
+        # 한 종목씩 저장해도 조각 파일은 PANEL_COMPACT_PARTS 개를 넘지 않음
+        for i in range(PANEL_COMPACT_PARTS * 3):
+            store.read(f"KRX:{i:06d}", fixed_today - datetime.timedelta(days=10), fixed_today)
+        assert len(store._panel_parts()) < PANEL_COMPACT_PARTS
+        assert store.panel()["symbol"].nunique() == PANEL_COMPACT_PARTS * 3 + 1
+
+        # 여러 프로세스가 동시에 저장/합치기를 해도, 읽는 쪽이 지워진 조각을 만나지 않고 모든 종목이 남음
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        def write_symbols(worker):
+            writer = OHLCVStore(tmp, source=stub_source, today=lambda: fixed_today)
+            for i in range(40):
+                writer.read(f"KRX:{worker}{i:05d}", fixed_today - datetime.timedelta(days=10), fixed_today)
+            return worker
+
+        with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context("fork")) as pool:
+            futures = [pool.submit(write_symbols, worker) for worker in range(1, 5)]
+            reads = 0
+            while not all(future.done() for future in futures):
+                store.panel()
+                reads += 1
+            [future.result() for future in futures]
+        symbols = store.panel()["symbol"].nunique()
+        assert symbols == PANEL_COMPACT_PARTS * 3 + 1 + 4 * 40, symbols
+        print(f"프로세스 4개 x 종목 40개 동시 저장 중 panel 읽기 {reads}회, 종목 {symbols}개, 조각 {len(store._panel_parts())}개")
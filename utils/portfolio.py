@@ -0,0 +1,133 @@
+import datetime
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import listing, ohlcv_store
+
+# 동시에 가격을 받아오는 최대 스레드 수
+MAX_WORKERS = 8
+
+
+def resolve_code(name):
+    """회사명 -> 종목코드 (이미 종목코드면 그대로)"""
+    if str(name).isdigit():
+        return str(name)
+    return listing.get_ticker_symbol(name)
+
+
+def _fetch_close(code, start_date, end_date, read):
+    if code is None:
+        return pd.Series(dtype=float)
+    try:
+        df = read(f"KRX:{code}", start_date, end_date)
+    except Exception:
+        return pd.Series(dtype=float)
+    return df["Close"] if not df.empty else pd.Series(dtype=float)
+
+
+def fetch_price_matrix(names, start_date, end_date, max_workers=MAX_WORKERS, read=None):
+    """
+    보유 종목들의 종가를 병렬로 받아 (날짜 x 종목) 행렬 하나로 조립
+    거래가 없는 날은 직전 종가로 채우고, 데이터가 없는 종목은 NaN 으로 남김
+    """
+    read = read or ohlcv_store.read
+    names = list(names)
+    if not names:
+        return pd.DataFrame()
+    codes = [resolve_code(name) for name in names]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(codes)))) as pool:
+        closes = list(pool.map(lambda code: _fetch_close(code, start_date, end_date, read), codes))
+
+    dates = pd.DatetimeIndex(sorted(set().union(*(close.index for close in closes))))
+    if dates.empty:
+        return pd.DataFrame()
+    # 한 번만 할당하고 종목별 열을 채움
+    matrix = np.full((len(dates), len(names)), np.nan)
+    for j, close in enumerate(closes):
+        if not close.empty:
+            matrix[dates.get_indexer(close.index), j] = close.to_numpy(dtype=float)
+    prices = pd.DataFrame(matrix, index=dates, columns=names)
+    return prices.ffill()
+
+
+def asset_history(prices, quantities, cash):
+    """날짜별 (보유 주식 평가액, 총 자산) — 가격 행렬과 보유 수량의 내적"""
+    values = np.nan_to_num(prices.to_numpy()) @ np.asarray(quantities, dtype=float)
+    return pd.DataFrame({"value": values, "total_asset": values + cash}, index=prices.index)
+
+
+def fetch_last_prices(names, today=None, lookback_days=14, read=None):
+    """보유 종목 전체의 최근 종가를 한 번에 조회 (종목 순서대로, 없으면 NaN)"""
+    today = today or datetime.date.today()
+    prices = fetch_price_matrix(names, today - datetime.timedelta(days=lookback_days), today, read=read)
+    if prices.empty:
+        return np.full(len(names), np.nan)
+    return prices.iloc[-1].to_numpy(dtype=float)
+
+
+class Portfolio:
+    """보유 종목을 NumPy 배열(수량, 평균 매입가)로 들고 평가 지표를 한 번에 계산"""
+
+    def __init__(self, names, quantities, cost_basis, cash, seed_money, realized_pnl=0):
+        self.names = list(names)
+        self.quantities = np.asarray(quantities, dtype=float)
+        self.cost_basis = np.asarray(cost_basis, dtype=float)
+        self.cash = cash
+        self.seed_money = seed_money
+        self.realized_pnl = realized_pnl
+
+    @classmethod
+    def from_user(cls, user):
+        stocks = list(user.stocks)
+        return cls([stock.name for stock in stocks],
+                    [stock.count for stock in stocks],
+                    [stock.purchase_price for stock in stocks],
+                    user.money,
+                    user.seed_money,
+                    getattr(user, "realized_pnl", 0))
+
+    @property
+    def version(self):
+        """보유 내역(종목, 수량, 현금)이 바뀔 때만 바뀌는 값 (계산 결과 캐시 키)"""
+        data = repr((self.names, self.quantities.tolist(), float(self.cash)))
+        return hashlib.sha1(data.encode()).hexdigest()[:12]
+
+    def mark_to_market(self, last_prices):
+        """
+        현재가 기준 평가 (현재가가 없는 종목은 매입가로 평가)
+        반환값: 종목별 표(positions)와 합계 지표 딕셔너리
+        """
+        last_prices = np.asarray(last_prices, dtype=float)
+        prices = np.where(np.isnan(last_prices), self.cost_basis, last_prices)
+        market_value = prices * self.quantities
+        cost_value = self.cost_basis * self.quantities
+        unrealized = market_value - cost_value
+
+        total_stock_value = market_value.sum()
+        total_asset = self.cash + total_stock_value
+        proceeds = total_asset - self.seed_money
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = market_value / total_asset if total_asset else np.zeros_like(market_value)
+            returns = np.where(cost_value > 0, unrealized / cost_value * 100, 0.0)
+
+        positions = pd.DataFrame({
+            "종목": self.names,
+            "구매가": self.cost_basis,
+            "현재가": prices,
+            "보유 개수": self.quantities.astype(int),
+            "자산 가치": market_value,
+            "평가 손익": unrealized,
+            "수익률(%)": returns,
+            "비중(%)": weights * 100,
+        })
+        return {
+            "positions": positions,
+            "total_stock_value": total_stock_value,
+            "total_asset": total_asset,
+            "cash": self.cash,
+            "unrealized_pnl": unrealized.sum(),
+            "realized_pnl": self.realized_pnl,
+            "proceeds": proceeds,
+            "roi": proceeds / self.seed_money * 100 if self.seed_money else 0.0,
+        }
@@ -0,0 +1,245 @@
+import collections
+import datetime
+import os
+import threading
+import time
+import pandas as pd
+import requests
+import streamlit as st
+
+# 네이버 실시간 시세 (여러 종목을 쉼표로 묶어 한 번에 요청)
+REALTIME_URL = "https://polling.finance.naver.com/api/realtime/domestic/stock/{codes}"
+# 한 번에 요청할 최대 종목 수
+BATCH_SIZE = 50
+# (연결, 응답) 타임아웃 초
+TIMEOUT = (3, 5)
+
+# 폴러가 시세를 받아오는 간격, 페이지가 화면을 다시 그리는 간격 (초)
+POLL_INTERVAL = 10
+REFRESH_SECONDS = 10
+# 이 시간 동안 아무 세션도 보지 않은 종목은 폴링 목록에서 뺌 (초)
+WATCH_TTL = 300
+# 처음 보는 종목의 첫 시세를 기다리는 최대 시간 (초)
+FIRST_QUOTE_TIMEOUT = 5
+
+# 설정하면 실시간 시세 대신 이 CSV(날짜/시각 인덱스, 열 = 종목코드)를 재생 (테스트/오프라인용)
+REPLAY_ENV = "QUOTE_REPLAY"
+
+Quote = collections.namedtuple("Quote", "price time")
+
+
+def _daily_close(codes):
+    """실시간 시세를 못 받은 종목은 로컬 저장소의 마지막 일봉 종가 사용"""
+    from utils import ohlcv_store
+
+    today = datetime.date.today()
+    prices = {}
+    for code in codes:
+        df = ohlcv_store.get_store().read(f"KRX:{code}", today - datetime.timedelta(days=14), today)
+        if not df.empty:
+            prices[code] = float(df["Close"].iloc[-1])
+    return prices
+
+
+def naver_source(codes, session=None):
+    """
+    종목코드 목록 -> {종목코드: 현재가}
+    BATCH_SIZE 개씩 묶어 요청하고, 실패한 묶음은 일봉 종가로 대신함
+    """
+    session = session or requests
+    prices, missing = {}, []
+    for i in range(0, len(codes), BATCH_SIZE):
+        batch = codes[i:i + BATCH_SIZE]
+        try:
+            response = session.get(REALTIME_URL.format(codes=",".join(batch)), timeout=TIMEOUT,
+                                   headers={"User-Agent": "Mozilla/5.0"})
+            response.raise_for_status()
+            for item in response.json().get("datas", []):
+                prices[item["itemCode"]] = float(str(item["closePrice"]).replace(",", ""))
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+        missing += [code for code in batch if code not in prices]
+    if missing:
+        prices.update(_daily_close(missing))
+    return prices
+
+
+class ReplayFeed:
+    """
+    기록해 둔 시세를 한 줄씩 재생하는 소스 (실시간 시세 대신 테스트에서 사용)
+    frame: 시각 인덱스, 열 = 종목코드, 값 = 가격인 DataFrame
+    호출할 때마다 다음 줄로 넘어가고, 끝에 닿으면 loop=True 면 처음부터, 아니면 마지막 줄을 계속 반환
+    """
+
+    def __init__(self, frame, loop=False):
+        self.frame = frame.sort_index()
+        self.frame.columns = [str(column).zfill(6) for column in self.frame.columns]
+        self.loop = loop
+        self.position = -1
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path, loop=False):
+        return cls(pd.read_csv(path, index_col=0, parse_dates=True, dtype=float), loop)
+
+    def __call__(self, codes):
+        with self._lock:
+            if self.position + 1 < len(self.frame):
+                self.position += 1
+            elif self.loop:
+                self.position = 0
+            row = self.frame.iloc[self.position]
+        return {code: float(row[code]) for code in codes if code in row.index and pd.notna(row[code])}
+
+
+class QuoteService:
+    """
+    프로세스 하나에 폴러 스레드 하나: 세션들이 watch 한 종목 전체의 시세를 한 번에 받아 마지막 가격을 보관
+    세션은 upstream 에 직접 요청하지 않고 여기서 읽기만 함
+    source: (종목코드 목록) -> {종목코드: 가격} 인 함수 (기본은 네이버 실시간 시세, 테스트 시 ReplayFeed)
+    """
+
+    def __init__(self, source=None, interval=POLL_INTERVAL, watch_ttl=WATCH_TTL, clock=time.monotonic):
+        self.source = source or naver_source
+        self.interval = interval
+        self.watch_ttl = watch_ttl
+        self._clock = clock
+        self._prices = {}
+        self._watched = {}
+        self._pinned = set()
+        self._listeners = []
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="quote-poller", daemon=True)
+            self._thread.start()
+
+    def watch(self, code):
+        """종목을 폴링 목록에 넣음 (처음 보는 종목이면 폴러를 바로 깨움)"""
+        with self._changed:
+            is_new = code not in self._watched
+            self._watched[code] = self._clock()
+            self._ensure_thread()
+        if is_new:
+            self._wake.set()
+
+    def pin(self, code):
+        """세션이 보지 않아도 계속 받을 종목 (미체결 주문이 있는 종목 등)"""
+        with self._changed:
+            is_new = code not in self._pinned and code not in self._watched
+            self._pinned.add(code)
+            self._ensure_thread()
+        if is_new:
+            self._wake.set()
+
+    def unpin(self, code):
+        with self._changed:
+            self._pinned.discard(code)
+
+    def add_listener(self, listener):
+        """시세를 받을 때마다 listener({종목코드: 가격}, 받은 시각) 호출 (폴러 스레드에서)"""
+        self._listeners.append(listener)
+
+    def last(self, code):
+        """마지막으로 받은 시세 (없으면 None)"""
+        with self._changed:
+            return self._prices.get(code)
+
+    def get(self, code, timeout=FIRST_QUOTE_TIMEOUT):
+        """watch 하고 마지막 시세 반환 — 아직 받은 적이 없으면 첫 폴링을 timeout 초까지 기다림"""
+        self.watch(code)
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while code not in self._prices:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+            return self._prices[code]
+
+    def watched(self):
+        """최근 WATCH_TTL 초 안에 어느 세션이든 본 종목과 고정한 종목 (오래된 종목은 목록에서 지움)"""
+        now = self._clock()
+        with self._changed:
+            for code in [code for code, seen in self._watched.items() if now - seen > self.watch_ttl]:
+                del self._watched[code]
+            return sorted(self._pinned.union(self._watched))
+
+    def poll_once(self):
+        """보고 있는 종목 전체를 한 번에 받아와 갱신 (받은 종목 수 반환)"""
+        codes = self.watched()
+        if not codes:
+            return 0
+        prices = self.source(codes)
+        now = datetime.datetime.now()
+        with self._changed:
+            for code, price in prices.items():
+                self._prices[code] = Quote(price, now)
+            self.polls += 1
+            self._changed.notify_all()
+        for listener in self._listeners:
+            listener(prices, now)
+        return len(prices)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"시세 갱신 실패: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+def _default_source():
+    path = os.getenv(REPLAY_ENV)
+    return ReplayFeed.from_csv(path) if path else None
+
+
+@st.cache_resource(show_spinner=False)
+def get_service():
+    """프로세스 전체에서 공유하는 시세 서비스"""
+    return QuoteService(_default_source())
+
+
+# 테스트 실행 (네트워크 없이 재생 소스로, 여러 세션이 봐도 폴링은 한 번씩인지 확인)
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    ticks = pd.DataFrame({"005930": [70000, 70100, 70200, 70300], "000660": [180000, 181000, 182000, 183000]},
+                         index=pd.date_range("2026-10-16 09:00", periods=4, freq="min"))
+    calls = []
+
+    feed = ReplayFeed(ticks)
+
+    def counted(codes):
+        calls.append(list(codes))
+        return feed(codes)
+
+    service = QuoteService(counted, interval=0.2)
+    # 세션 20개가 같은 두 종목을 동시에 조회
+    with ThreadPoolExecutor(20) as pool:
+        first = list(pool.map(lambda i: service.get(["005930", "000660"][i % 2]), range(20)))
+    assert all(quote is not None for quote in first), first
+    time.sleep(0.7)
+    print(f"세션 20개 조회, upstream 호출 {len(calls)}회: {calls}")
+    print("005930:", service.last("005930"), "000660:", service.last("000660"))
+    assert service.last("005930").price == 70300 and service.last("000660").price == 183000
+    service.stop()
+
+    # 아무도 보지 않는 종목은 WATCH_TTL 뒤 폴링 목록에서 빠짐
+    now = [0.0]
+    idle = QuoteService(ReplayFeed(ticks), clock=lambda: now[0])
+    idle._watched["005930"] = 0.0
+    now[0] = WATCH_TTL + 1
+    assert idle.watched() == []
+    print("확인 완료")
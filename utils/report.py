@@ -0,0 +1,202 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+import streamlit as st
+
+# 리포트 생성 설정 — 프롬프트를 바꾸면 PROMPT_VERSION 을 올려 이전 캐시를 무효화
+MODEL = "gpt-4o-mini"
+PROMPT_VERSION = 1
+SYSTEM_PROMPT = "너는 주식 데이터 분석 전문가야."
+USER_PROMPT = "{ticker} 종목의 최근 뉴스 및 데이터를 기반으로. \
+                    앞으로의 주가 전망에 대해 5줄 이내 리포트써줘. 종목 코드는 말 안해도 돼. \
+                    글자 크기는 최대 15pt 이내로 써줘. 마지막에 이 종목을 **추천하는지 비추천하는지** 판단해서 문장 넣어줘. "
+
+# 캐시 유지 시간(초)과 최대 개수
+REPORT_TTL = 6 * 60 * 60
+CACHE_SIZE = 512
+
+
+@st.cache_resource(show_spinner=False)
+def get_client(api_key, base_url=None):
+    """API 키별로 한 번만 만드는 OpenAI 클라이언트 (openai 패키지는 처음 쓸 때 import)"""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+class _Flight:
+    """진행 중인 리포트 요청 — 같은 요청을 기다리는 모든 세션에 토큰을 나눠 줌"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def push(self, text):
+        with self.condition:
+            self.chunks.append(text)
+            self.condition.notify_all()
+
+    def finish(self, error=None):
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def stream(self):
+        """지금까지 받은 토큰부터 순서대로, 새 토큰이 오면 이어서 yield"""
+        position = 0
+        while True:
+            with self.condition:
+                while position == len(self.chunks) and not self.done:
+                    self.condition.wait()
+                chunks = self.chunks[position:]
+                done, error = self.done, self.error
+            position += len(chunks)
+            yield from chunks
+            if done and position == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    def text(self):
+        return "".join(self.stream())
+
+
+class _Cached:
+    """이미 완성된 리포트"""
+
+    def __init__(self, text):
+        self._text = text
+
+    def stream(self):
+        yield self._text
+
+    def text(self):
+        return self._text
+
+
+class ReportService:
+    """(종목, 거래일, 프롬프트 버전) 단위로 리포트를 캐시하고 동시 요청을 하나로 합침"""
+
+    def __init__(self, ttl=REPORT_TTL, size=CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._cache = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _get_cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        created, text = entry
+        if time.monotonic() - created > self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return text
+
+    def _store(self, key, text):
+        with self._lock:
+            self._cache[key] = (time.monotonic(), text)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+            self._flights.pop(key, None)
+
+    def start(self, client, ticker, trading_date=None):
+        """캐시된 리포트 또는 진행 중인 요청을 반환 (필요할 때만 새 요청 시작)"""
+        trading_date = trading_date or datetime.date.today()
+        key = (ticker, trading_date, PROMPT_VERSION)
+        with self._lock:
+            text = self._get_cached(key)
+            if text is not None:
+                return _Cached(text)
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight
+            flight = self._flights[key] = _Flight()
+        threading.Thread(target=self._run, args=(client, ticker, key, flight), daemon=True).start()
+        return flight
+
+    def _run(self, client, ticker, key, flight):
+        try:
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": USER_PROMPT.format(ticker=ticker)},
+                ],
+                stream=True,
+            )
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    flight.push(chunk.choices[0].delta.content)
+        except Exception as e:
+            # 실패한 요청은 캐시하지 않고 다음 요청이 다시 시도하게 함
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.finish(e)
+            return
+        self._store(key, "".join(flight.chunks))
+        flight.finish()
+
+
+@st.cache_resource(show_spinner=False)
+def get_service():
+    """프로세스 전체에서 공유하는 리포트 서비스"""
+    return ReportService()
+
+
+def start_report(client, ticker, trading_date=None):
+    return get_service().start(client, ticker, trading_date)
+
+
+# 테스트 실행 (로컬 chat-completions 스텁 서버로 캐시/요청 합치기 확인)
+if __name__ == "__main__":
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from openai import OpenAI
+
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            requests_seen.append(self.path)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for word in ["삼성전자는 ", "반도체 업황 ", "회복으로 ", "**추천**합니다."]:
+                chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": MODEL,
+                         "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(0.05)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    service = ReportService()
+
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(service.start(client, "005930").text())) for _ in range(20)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    print(results[0], f"/ 동시 요청 20개 -> 업스트림 {len(requests_seen)}회")
+    print("".join(service.start(client, "005930").stream()), f"/ 캐시 후 업스트림 {len(requests_seen)}회")
+    server.shutdown()
@@ -0,0 +1,223 @@
+import datetime
+import numpy as np
+import pandas as pd
+from utils import ohlcv_store, portfolio
+
+# 1년 거래일 수 (연율화), 위험 지표 계산에 쓰는 과거 기간
+TRADING_DAYS = 252
+LOOKBACK_DAYS = 365
+
+# VaR 신뢰수준, 몬테카를로 경로 수 / 기간(거래일) / 한 번에 만드는 경로 수 (메모리 상한)
+CONFIDENCE = 0.95
+MC_PATHS = 10_000
+MC_HORIZON = 10
+MC_CHUNK = 1_000
+
+# 최대 낙폭 계산 기준 — 계좌의 일별 자산 스냅샷(equity)이 있으면 실제 기록, 없으면 지금 보유 종목을 과거 가격에 대입한 가정
+REALIZED = "실제 총 자산"
+HYPOTHETICAL = "현재 보유 가정"
+
+# 베타 기준 지수 (FinanceDataReader 의 KOSPI 지수 심볼)
+BENCHMARK = "KS11"
+
+
+def returns_matrix(prices):
+    """
+    (날짜 x 종목) 종가 행렬 -> 일간 수익률 행렬 (NumPy)
+    상장 전이라 가격이 없는 날의 수익률은 0 으로 둠
+    """
+    values = prices.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = values[1:] / values[:-1] - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def covariance(returns):
+    """표본 공분산 행렬과 상관계수 행렬 (열 = 종목)"""
+    centered = returns - returns.mean(axis=0)
+    cov = centered.T @ centered / max(len(returns) - 1, 1)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    corr[~np.isfinite(corr)] = 0.0
+    np.fill_diagonal(corr, 1.0)
+    return cov, corr
+
+
+def annualized_volatility(returns, weights=None):
+    """종목별 연 변동성 (weights 를 주면 포트폴리오 연 변동성)"""
+    if weights is None:
+        return returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    cov, _ = covariance(returns)
+    return float(np.sqrt(weights @ cov @ weights * TRADING_DAYS))
+
+
+def historical_var(portfolio_returns, confidence=CONFIDENCE):
+    """과거 수익률 분포로 구한 (VaR, CVaR) — 손실률(양수)"""
+    cutoff = np.quantile(portfolio_returns, 1 - confidence)
+    tail = portfolio_returns[portfolio_returns <= cutoff]
+    return float(-cutoff), float(-tail.mean()) if tail.size else float(-cutoff)
+
+
+def _cholesky(cov):
+    """공분산 행렬의 촐레스키 분해 (종목 수가 관측일보다 많아 양의 정부호가 아니면 고윳값을 0 이상으로 보정)"""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+
+def monte_carlo_var(returns, weights, confidence=CONFIDENCE, paths=MC_PATHS, horizon=MC_HORIZON, chunk=MC_CHUNK,
+                    seed=0):
+    """
+    다변량 정규분포로 horizon 거래일 동안의 종목별 일간 수익률 경로를 만들고, 복리로 쌓은 포트폴리오 손실률의 (VaR, CVaR)
+    경로는 chunk 개씩 만들어 메모리는 chunk x horizon x 종목 수 만큼만 씀
+    """
+    mean = returns.mean(axis=0)
+    cov, _ = covariance(returns)
+    factor = _cholesky(cov)
+    rng = np.random.default_rng(seed)
+    outcomes = np.empty(paths)
+    for start in range(0, paths, chunk):
+        size = min(chunk, paths - start)
+        shocks = rng.standard_normal((size, horizon, len(mean))) @ factor.T + mean
+        growth = np.prod(1 + shocks, axis=1)
+        outcomes[start:start + size] = growth @ weights - 1
+    return historical_var(outcomes, confidence)
+
+
+def beta(portfolio_returns, benchmark_returns):
+    """기준 지수 대비 베타 (공분산 / 지수 분산)"""
+    if len(portfolio_returns) < 2:
+        return float("nan")
+    cov = np.cov(portfolio_returns, benchmark_returns)
+    return float(cov[0, 1] / cov[1, 1]) if cov[1, 1] else float("nan")
+
+
+def max_drawdown(values):
+    """최대 낙폭 (음수 비율)과 고점/저점 위치"""
+    values = np.asarray(values, dtype=float)
+    peaks = np.maximum.accumulate(values)
+    drawdowns = values / peaks - 1
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(values[:trough + 1]))
+    return float(drawdowns[trough]), peak, trough
+
+
+def analyze(prices, quantities, cash=0, benchmark=None, confidence=CONFIDENCE, paths=MC_PATHS, horizon=MC_HORIZON,
+            equity=None):
+    """
+    보유 종목 위험 지표 한 번에 계산
+    prices: (날짜 x 종목) 종가 행렬, quantities: 종목별 보유 수량, benchmark: 기준 지수 종가 Series (없으면 베타 생략)
+    equity: 계좌의 일별 총 자산 스냅샷 Series (utils.equity) — 있으면 최대 낙폭을 실제 기록으로 계산
+    비중과 VaR 는 주식 평가액 기준, 최대 낙폭은 현금을 포함한 총 자산 기준 (drawdown_basis 에 기준 표시)
+    """
+    quantities = np.asarray(quantities, dtype=float)
+    returns = returns_matrix(prices)
+    last = np.nan_to_num(prices.ffill().iloc[-1].to_numpy(dtype=float))
+    values = last * quantities
+    stock_value = values.sum()
+    weights = values / stock_value if stock_value else np.zeros_like(values)
+    portfolio_returns = returns @ weights
+
+    _, corr = covariance(returns)
+    var, cvar = historical_var(portfolio_returns, confidence)
+    mc_var, mc_cvar = monte_carlo_var(returns, weights, confidence, paths, horizon)
+    if equity is not None and len(equity.dropna()) >= 2:
+        history, basis = equity.dropna(), REALIZED
+    else:
+        history, basis = portfolio.asset_history(prices, quantities, cash)["total_asset"], HYPOTHETICAL
+    drawdown, peak, trough = max_drawdown(history.to_numpy())
+
+    portfolio_beta = float("nan")
+    if benchmark is not None and not benchmark.empty:
+        aligned = benchmark.reindex(prices.index).ffill()
+        benchmark_returns = returns_matrix(aligned.to_frame())[:, 0]
+        portfolio_beta = beta(portfolio_returns, benchmark_returns)
+
+    names = list(prices.columns)
+    return {
+        "stock_value": stock_value,
+        "volatility": annualized_volatility(returns, weights),
+        "assets": pd.DataFrame({
+            "종목": names,
+            "비중(%)": weights * 100,
+            "연 변동성(%)": annualized_volatility(returns) * 100,
+        }),
+        "correlation": pd.DataFrame(corr, index=names, columns=names),
+        "var": var,
+        "cvar": cvar,
+        "mc_var": mc_var,
+        "mc_cvar": mc_cvar,
+        "beta": portfolio_beta,
+        "max_drawdown": drawdown,
+        "drawdown_peak": history.index[peak],
+        "drawdown_trough": history.index[trough],
+        "drawdown_basis": basis,
+        "confidence": confidence,
+        "horizon": horizon,
+        "days": len(returns),
+    }
+
+
+def fetch_benchmark(start_date, end_date, read=None):
+    """기준 지수(KOSPI) 종가 (못 받으면 빈 Series)"""
+    read = read or ohlcv_store.read
+    try:
+        df = read(BENCHMARK, start_date, end_date)
+    except Exception:
+        return pd.Series(dtype=float)
+    return df["Close"] if not df.empty else pd.Series(dtype=float)
+
+
+def portfolio_risk(names, quantities, cash, today=None, lookback_days=LOOKBACK_DAYS, equity=None):
+    """보유 종목의 과거 1년 가격으로 위험 지표 계산 (가격이 없으면 None), equity 는 같은 기간만 잘라 최대 낙폭에 씀"""
+    today = today or datetime.date.today()
+    start = today - datetime.timedelta(days=lookback_days)
+    prices = portfolio.fetch_price_matrix(names, start, today)
+    if prices.empty or len(prices) < 3:
+        return None
+    if equity is not None:
+        equity = equity.loc[pd.Timestamp(start):]
+    return analyze(prices, quantities, cash, fetch_benchmark(start, today), equity=equity)
+
+
+# 테스트 실행: 종목 100개, 2년치 가격, 몬테카를로 경로 10,000개 계산 시간
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(1)
+    n_days, n_assets = 500, 100
+    market = rng.normal(0.0003, 0.01, n_days)
+    loadings = rng.uniform(0.5, 1.5, n_assets)
+    daily = market[:, None] * loadings + rng.normal(0, 0.015, (n_days, n_assets))
+    dates = pd.bdate_range(end="2026-10-16", periods=n_days + 1)
+    prices = pd.DataFrame(10000 * np.vstack([np.ones(n_assets), np.cumprod(1 + daily, axis=0)]), index=dates,
+                          columns=[f"종목{i}" for i in range(n_assets)])
+    kospi = pd.Series(2500 * np.concatenate([[1], np.cumprod(1 + market)]), index=dates)
+    quantities = rng.integers(1, 100, n_assets)
+
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        report = analyze(prices, quantities, 1_000_000, kospi)
+        best = min(best, time.perf_counter() - start)
+    print(f"종목 {n_assets}개, {n_days}일, 경로 {MC_PATHS:,}개 x {MC_HORIZON}일: {best * 1000:.0f}ms")
+    print(f"연 변동성 {report['volatility']:.2%}, 베타 {report['beta']:.2f}, "
+          f"1일 VaR {report['var']:.2%} / CVaR {report['cvar']:.2%}, "
+          f"{MC_HORIZON}일 몬테카를로 VaR {report['mc_var']:.2%} / CVaR {report['mc_cvar']:.2%}, "
+          f"최대 낙폭 {report['max_drawdown']:.2%}")
+
+    # 베타는 종목 부하의 가중 평균과 비슷해야 함
+    weights = report["assets"]["비중(%)"].to_numpy() / 100
+    assert abs(report["beta"] - weights @ loadings) < 0.1, (report["beta"], weights @ loadings)
+    # 실제 자산 스냅샷이 있으면 최대 낙폭은 그 기록 기준 (지금 보유 종목을 과거에 대입하지 않음)
+    assert report["drawdown_basis"] == HYPOTHETICAL
+    equity = pd.Series([100.0, 120.0, 90.0, 130.0], index=dates[-4:])
+    realized = analyze(prices, quantities, 1_000_000, kospi, equity=equity)
+    assert realized["drawdown_basis"] == REALIZED and abs(realized["max_drawdown"] + 0.25) < 1e-12
+    assert realized["drawdown_peak"] == dates[-3] and realized["drawdown_trough"] == dates[-2]
+
+    # 정규분포 가정이면 몬테카를로 10일 VaR 는 대략 1일 VaR x sqrt(10)
+    print(f"몬테카를로 VaR / (1일 VaR x sqrt({MC_HORIZON})) = {report['mc_var'] / (report['var'] * np.sqrt(MC_HORIZON)):.2f}")
@@ -0,0 +1,212 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import indicators, ohlcv_store
+
+# 연율화에 쓰는 연간 거래일 수
+TRADING_DAYS = 252
+# 전체 종목 동기화에 쓰는 스레드 수
+SYNC_WORKERS = 8
+
+
+def _ffill(x):
+    """날짜 축(마지막 축) 방향 forward-fill, 앞쪽 NaN 은 그대로"""
+    valid = ~np.isnan(x)
+    index = np.where(valid, np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    filled = np.take_along_axis(x, index, axis=-1)
+    # 첫 유효값 이전은 NaN 유지
+    filled[~np.maximum.accumulate(valid, axis=-1)] = np.nan
+    return filled
+
+
+def load_universe(codes, lookback_days=400, today=None, store=None):
+    """
+    로컬 저장소에 있는 종목들의 종가/거래량을 (종목 x 날짜) 행렬 두 개로 정렬
+    종목 파일을 하나씩 읽지 않고 저장소가 관리하는 전체 종목 표(panel)를 한 번 읽어 채움
+    반환값: (종목코드 목록, 날짜 인덱스, 종가 행렬, 거래량 행렬) — 데이터가 없는 종목은 제외
+    """
+    store = store or ohlcv_store.get_store()
+    today = today or datetime.date.today()
+    panel = store.panel(today - datetime.timedelta(days=lookback_days))
+    keys = {store.key(f"KRX:{code}"): code for code in codes}
+    panel = panel[panel["symbol"].isin(list(keys))]
+    if panel.empty:
+        return [], pd.DatetimeIndex([]), np.empty((0, 0)), np.empty((0, 0))
+
+    symbols = panel["symbol"].astype("category")
+    present = set(symbols.cat.categories[np.unique(symbols.cat.codes)])
+    found = [key for key in keys if key in present]  # codes 순서 유지
+    dates = pd.DatetimeIndex(np.unique(panel.index))
+    rows = symbols.cat.set_categories(found).cat.codes.to_numpy()
+    columns = dates.get_indexer(panel.index)
+    close = np.full((len(found), len(dates)), np.nan)
+    volume = np.full((len(found), len(dates)), np.nan)
+    close[rows, columns] = panel["Close"].to_numpy(dtype=float)
+    volume[rows, columns] = panel["Volume"].to_numpy(dtype=float)
+    return [keys[key] for key in found], dates, _ffill(close), volume
+
+
+class UniverseSync:
+    """
+    전체 종목의 최근 데이터를 로컬 저장소로 받아오는 백그라운드 작업 (이미 도는 중이면 새로 시작하지 않음)
+    SYNC_WORKERS 개 스레드로 받아오고 panel 조각은 store.batch() 로 묶어 씀, 페이지는 done / total 만 읽어 진행률 표시
+    """
+
+    def __init__(self, store=None, max_workers=SYNC_WORKERS):
+        self.store = store
+        self.max_workers = max_workers
+        self.done = 0
+        self.failed = 0
+        self.total = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, codes, lookback_days, today=None):
+        """동기화 시작 (이미 도는 중이면 False)"""
+        with self._lock:
+            if self.running:
+                return False
+            codes = list(codes)
+            self.done, self.failed, self.total = 0, 0, len(codes)
+            self._thread = threading.Thread(target=self._run, args=(codes, lookback_days, today or datetime.date.today()),
+                                            name="universe-sync", daemon=True)
+            self._thread.start()
+            return True
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, codes, lookback_days, today):
+        store = self.store or ohlcv_store.get_store()
+        start = today - datetime.timedelta(days=lookback_days)
+
+        def sync(code):
+            try:
+                store.read(f"KRX:{code}", start, today)
+                return True
+            except Exception:
+                return False
+
+        with store.batch(), ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for ok in pool.map(sync, codes):
+                self.done += 1
+                self.failed += not ok
+
+
+def _period_return(close, days):
+    if close.shape[1] <= days:
+        return np.full(close.shape[0], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (close[:, -1] / close[:, -1 - days] - 1) * 100
+
+
+def screen(codes, close, volume, names=None, window=20):
+    """
+    모든 종목의 지표를 한 번에 계산한 표
+    수익률(1/5/20일), 연율화 변동성, 거래량 급증 배수, RSI, 20일 이동평균 대비 괴리율
+    """
+    codes = list(codes)
+    if not codes:
+        return pd.DataFrame()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_returns = np.diff(np.log(close), axis=1)[:, -window:]
+        volatility = np.nanstd(log_returns, axis=1) * np.sqrt(TRADING_DAYS) * 100
+        recent_volume = volume[:, -1]
+        average_volume = np.nanmean(volume[:, -window - 1:-1], axis=1)
+        volume_spike = recent_volume / average_volume
+        # 앞쪽 NaN(상장 전)은 첫 종가로 채워 지표 계산이 전파되지 않게 함
+        first = np.take_along_axis(close, np.argmax(~np.isnan(close), axis=1)[:, None], axis=1)
+        filled = np.where(np.isnan(close), first, close)
+        rsi = indicators.rsi(filled, 14)[:, -1]
+        sma = indicators.sma(filled, window)[:, -1]
+        sma_gap = (close[:, -1] / sma - 1) * 100
+    table = pd.DataFrame({
+        "종목코드": codes,
+        "종가": close[:, -1],
+        "1일 수익률(%)": _period_return(close, 1),
+        "5일 수익률(%)": _period_return(close, 5),
+        "20일 수익률(%)": _period_return(close, 20),
+        "변동성(%)": volatility,
+        "거래량 급증(배)": volume_spike,
+        "RSI 14": rsi,
+        f"{window}일선 괴리율(%)": sma_gap,
+    })
+    if names is not None:
+        table.insert(1, "회사명", [names.get(code, "") for code in codes])
+    return table
+
+
+def apply_filters(table, min_return=None, max_volatility=None, min_volume_spike=None,
+                  rsi_range=None, above_sma=False, sort_by="20일 수익률(%)", ascending=False, window=20):
+    """screen() 결과에 조건을 적용하고 정렬"""
+    mask = np.ones(len(table), dtype=bool)
+    if min_return is not None:
+        mask &= table["20일 수익률(%)"].to_numpy() >= min_return
+    if max_volatility is not None:
+        mask &= table["변동성(%)"].to_numpy() <= max_volatility
+    if min_volume_spike is not None:
+        mask &= table["거래량 급증(배)"].to_numpy() >= min_volume_spike
+    if rsi_range is not None:
+        rsi = table["RSI 14"].to_numpy()
+        mask &= (rsi >= rsi_range[0]) & (rsi <= rsi_range[1])
+    if above_sma:
+        mask &= table[f"{window}일선 괴리율(%)"].to_numpy() > 0
+    return table[mask].sort_values(sort_by, ascending=ascending, na_position="last")
+
+
+# 벤치마크 (KRX 전체 규모의 가상 데이터): 종목 파일별 읽기와 통합 표 읽기, 지표 계산
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(0)
+    tickers, days = 2700, 300
+    dates = pd.bdate_range(end=datetime.date.today(), periods=days)
+    close = 10_000 * np.exp(np.cumsum(rng.normal(0, 0.02, (tickers, days)), axis=1))
+    close[:100, :50] = np.nan  # 최근 상장 종목
+    volume = rng.integers(1_000, 1_000_000, (tickers, days)).astype(float)
+    codes = [f"{i:06d}" for i in range(tickers)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ohlcv_store.OHLCVStore(tmp)
+        meta = {"start": str(dates[0].date()), "end": str(dates[-1].date()), "synced_at": datetime.datetime.now().isoformat()}
+        with store.batch():
+            for i, code in enumerate(codes):
+                listed = ~np.isnan(close[i])
+                frame = pd.DataFrame({"Close": close[i, listed], "Volume": volume[i, listed]}, index=dates[listed])
+                store._save(f"KRX:{code}", frame, meta)
+
+        # 예전 방식: 종목 파일을 하나씩 읽음
+        started = time.perf_counter()
+        with ThreadPoolExecutor(16) as pool:
+            list(pool.map(lambda code: store.read_local(f"KRX:{code}", dates[0]), codes))
+        per_file = time.perf_counter() - started
+
+        started = time.perf_counter()
+        loaded_codes, loaded_dates, loaded_close, loaded_volume = load_universe(codes, 500, store=store)
+        first_load = time.perf_counter() - started
+        assert loaded_codes == codes and np.allclose(loaded_close, _ffill(close), equal_nan=True)
+
+        # 한 종목이 하루치 새로 받은 뒤 (조각 하나만 더 읽음)
+        store._save("KRX:000000", pd.DataFrame({"Close": [1.0], "Volume": [1.0]}, index=[dates[-1]]), meta)
+        started = time.perf_counter()
+        _, _, updated, _ = load_universe(codes, 500, store=store)
+        next_load = time.perf_counter() - started
+        assert updated[0, -1] == 1.0
+
+        started = time.perf_counter()
+        table = screen(loaded_codes, loaded_close, loaded_volume)
+        result = apply_filters(table, min_return=0, rsi_range=(30, 70), above_sma=True)
+        elapsed = time.perf_counter() - started
+    print(result.head())
+    print(f"{tickers}종목 x {days}일 불러오기: 종목 파일별 {per_file:.2f}초 -> 통합 표 {first_load * 1000:.0f}ms "
+          f"(한 종목 갱신 후 {next_load * 1000:.0f}ms)")
+    print(f"스크리닝: {elapsed * 1000:.1f}ms, 조건 통과 {len(result)}종목")
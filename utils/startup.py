@@ -0,0 +1,90 @@
+import ast
+import os
+import subprocess
+import sys
+from collections import Counter
+
+# 페이지별 import 시간 예산(초) — 새 프로세스에서 페이지 맨 위 import 문만 실행한 시간
+PAGE_BUDGETS = {
+    "main.py": 2.0,
+    "pages/mypage.py": 2.0,
+    "pages/stock_trading.py": 2.0,
+    "pages/search_charts.py": 2.0,
+    "pages/ai_stock_analysis.py": 2.0,
+    "pages/screener.py": 2.0,
+}
+
+# 페이지를 여는 것만으로는 불러오면 안 되는 무거운 패키지 (실제로 쓰는 코드에서 import)
+DEFERRED_PACKAGES = ("tensorflow", "keras", "sklearn", "scipy", "matplotlib", "FinanceDataReader", "openai",
+                     "onnxruntime", "ai_edge_litert", "tf2onnx")
+
+# 측정용 자식 프로세스: import 문 실행 시간과 -X importtime 기록(표준 에러)
+_PROBE = """
+import time
+start = time.perf_counter()
+{imports}
+print(time.perf_counter() - start)
+"""
+
+
+def page_imports(path):
+    """페이지 맨 위의 import 문만 뽑아냄 (페이지 본문은 Streamlit 없이 실행할 수 없으므로)"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse_importtime(stderr):
+    """-X importtime 출력 -> [(모듈, 자체 시간 us, 누적 시간 us)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def profile_page(path, root="."):
+    """
+    페이지 import 프로파일
+    반환값: {"seconds": 걸린 시간, "packages": 최상위 패키지별 자체 시간(초) Counter, "modules": 불러온 모듈 이름 목록}
+    """
+    code = _PROBE.format(imports=page_imports(os.path.join(root, path)))
+    env = {**os.environ, "PYTHONPATH": os.path.abspath(root)}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=root, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"{path} import 실패:\n{result.stderr[-2000:]}")
+    rows = parse_importtime(result.stderr)
+    packages = Counter()
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us / 1e6
+    return {
+        "seconds": float(result.stdout.split()[-1]),
+        "packages": packages,
+        "modules": [name for name, _, _ in rows],
+    }
+
+
+def check(budgets=PAGE_BUDGETS, deferred=DEFERRED_PACKAGES, root="."):
+    """모든 페이지를 측정하고 예산 초과/금지 패키지 import 목록 반환 (비어 있으면 통과)"""
+    problems = []
+    for path, budget in budgets.items():
+        profile = profile_page(path, root)
+        loaded = sorted({name.split(".")[0] for name in profile["modules"]} & set(deferred))
+        top = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in profile["packages"].most_common(5))
+        print(f"{path:<28} {profile['seconds']:.2f}s / {budget:.1f}s  ({top})")
+        if profile["seconds"] > budget:
+            problems.append(f"{path}: {profile['seconds']:.2f}s > 예산 {budget:.1f}s")
+        if loaded:
+            problems.append(f"{path}: 페이지 로드 시 {', '.join(loaded)} import")
+    return problems
+
+
+# 실행: python -m utils.startup (예산을 넘거나 무거운 패키지를 바로 불러오는 페이지가 있으면 종료 코드 1)
+if __name__ == "__main__":
+    problems = check()
+    for problem in problems:
+        print("실패:", problem)
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,339 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+import streamlit as st
+from utils.account import Holdings, Stock, Trade, TradeError, User
+
+# 계좌 DB 위치와 커넥션 풀 크기
+DB_PATH = "./data/accounts.db"
+POOL_SIZE = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    seed_money INTEGER NOT NULL,
+    money INTEGER NOT NULL,
+    realized_pnl REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS positions (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    name TEXT NOT NULL,
+    purchase_price REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, name)
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    time TEXT NOT NULL,
+    side TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    count INTEGER NOT NULL,
+    cash_after INTEGER,
+    count_after INTEGER
+);
+CREATE INDEX IF NOT EXISTS trades_user_name ON trades (user_id, name);
+"""
+
+# 자주 쓰는 SQL 은 상수로 두어 커넥션별 statement 캐시에서 재사용되게 함
+SQL_INSERT_USER = "INSERT INTO users (name, seed_money, money) VALUES (?, ?, ?)"
+SQL_SELECT_USER = "SELECT id, name, seed_money, money, realized_pnl FROM users WHERE name = ?"
+SQL_SELECT_POSITIONS = "SELECT name, purchase_price, count FROM positions WHERE user_id = ? ORDER BY rowid"
+# 거래는 세션마다 다른 User 객체에서 올 수 있으므로 DB 값을 기준으로 조건부 상대 갱신
+SQL_DEBIT_CASH = "UPDATE users SET money = money - ? WHERE id = ? AND money >= ?"
+SQL_CREDIT_CASH = "UPDATE users SET money = money + ?, realized_pnl = realized_pnl + ? WHERE id = ?"
+SQL_SELECT_CASH = "SELECT money, realized_pnl FROM users WHERE id = ?"
+SQL_ADD_POSITION = """
+INSERT INTO positions (user_id, name, purchase_price, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (user_id, name) DO UPDATE SET
+    purchase_price = (purchase_price * count + excluded.purchase_price * excluded.count) / (count + excluded.count),
+    count = count + excluded.count
+"""
+SQL_REDUCE_POSITION = "UPDATE positions SET count = count - ? WHERE user_id = ? AND name = ? AND count >= ?"
+SQL_SELECT_POSITION = "SELECT purchase_price, count FROM positions WHERE user_id = ? AND name = ?"
+SQL_DELETE_EMPTY_POSITION = "DELETE FROM positions WHERE user_id = ? AND name = ? AND count = 0"
+SQL_INSERT_TRADE = """
+INSERT INTO trades (user_id, time, side, name, price, count, cash_after, count_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_SELECT_TRADES = "SELECT time, side, name, price, count FROM trades WHERE user_id = ? ORDER BY id"
+SQL_SELECT_TRADES_SINCE = """
+SELECT id, time, side, name, price, count, cash_after, count_after FROM trades WHERE user_id = ? AND id > ? ORDER BY id
+"""
+
+# 기존 DB 에 나중에 추가된 열 (테이블, 열, 타입) — 예전 거래는 NULL
+ADDED_COLUMNS = [("trades", "cash_after", "INTEGER"), ("trades", "count_after", "INTEGER")]
+
+# 예전 DB 의 users.money 는 REAL 이라 현금이 실수(0.0원)로 읽히고 오차가 쌓임 — 정수 열로 다시 만들어 옮김
+SQL_MIGRATE_MONEY = """
+CREATE TABLE users_new (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    seed_money INTEGER NOT NULL,
+    money INTEGER NOT NULL,
+    realized_pnl REAL NOT NULL DEFAULT 0
+);
+INSERT INTO users_new SELECT id, name, seed_money, CAST(ROUND(money) AS INTEGER), realized_pnl FROM users;
+DROP TABLE users;
+ALTER TABLE users_new RENAME TO users;
+"""
+
+
+def _migrate(conn):
+    """예전 스키마로 만든 DB 에 빠진 열 추가, 현금 열을 정수로 변경"""
+    for table, column, kind in ADDED_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+    kinds = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(users)")}
+    if kinds["money"] != "INTEGER":
+        # 다른 테이블이 users 를 참조하므로 외래 키 검사를 끄고 한 트랜잭션에서 바꿈
+        conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            conn.executescript(f"BEGIN IMMEDIATE;{SQL_MIGRATE_MONEY}COMMIT;")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+
+
+class ConnectionPool:
+    """스레드 간에 나눠 쓰는 SQLite 커넥션 풀 (WAL 모드)"""
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._size = size
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            _migrate(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               isolation_level=None, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self._size
+                if can_create:
+                    self._created += 1
+            conn = self._connect() if can_create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+class PersistentUser(User):
+    """
+    거래를 DB 에 바로 반영하는 User
+    같은 계좌를 여러 세션이 각자 불러와도, 잔액/보유량 검사와 갱신은 DB 에서 하고 결과를 객체로 다시 읽어 옴
+    """
+
+    def __init__(self, store, user_id, name, money, seed_money=None):
+        super().__init__(name, money)
+        if seed_money is not None:
+            self.seed_money = seed_money
+        self.user_id = user_id
+        self._store = store
+
+    def buy(self, stock_name, stock_price, stock_count, time=None):
+        return self._store.trade(self, Trade(Trade.BUY, stock_name, stock_price, stock_count, time))
+
+    def sell(self, stock_name, stock_price, stock_count, time=None):
+        return self._store.trade(self, Trade(Trade.SELL, stock_name, stock_price, stock_count, time))
+
+    @contextmanager
+    def transaction(self, stock_name):
+        """객체 상태와 함께 DB 반영도 되돌림 (같은 저장소의 다른 계좌와 한 트랜잭션으로 묶임)"""
+        with self._store.atomic(), super().transaction(stock_name):
+            yield
+
+
+class AccountStore:
+    """
+    계좌 저장소: users(현금) / positions(현재 보유, 미리 계산된 값) / trades(거래 기록)
+    batch() 안에서 발생한 거래는 모아서 한 트랜잭션으로 기록
+    """
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.pool = ConnectionPool(path, pool_size)
+        self._local = threading.local()
+
+    def create_user(self, name, money):
+        """새 계좌 생성 (같은 이름이 있으면 None)"""
+        try:
+            with self.pool.transaction() as conn:
+                user_id = conn.execute(SQL_INSERT_USER, (name, money, money)).lastrowid
+        except sqlite3.IntegrityError:
+            return None
+        return PersistentUser(self, user_id, name, money)
+
+    def load_user(self, name):
+        """계좌와 현재 보유 종목 불러오기 (없으면 None) — 거래 기록을 다시 계산하지 않음"""
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_SELECT_USER, (name,)).fetchone()
+            if row is None:
+                return None
+            user_id, name, seed_money, money, realized_pnl = row
+            positions = conn.execute(SQL_SELECT_POSITIONS, (user_id,)).fetchall()
+        user = PersistentUser(self, user_id, name, money, seed_money)
+        user.realized_pnl = realized_pnl
+        user.stocks = Holdings()
+        for stock_name, purchase_price, count in positions:
+            user.stocks.append(Stock(stock_name, purchase_price, count))
+        return user
+
+    def load_trades(self, user_id):
+        with self.pool.connection() as conn:
+            rows = conn.execute(SQL_SELECT_TRADES, (user_id,)).fetchall()
+        return [Trade(side, name, price, count, time=time) for time, side, name, price, count in rows]
+
+    def load_trades_since(self, user_id, after_id=0):
+        """after_id 다음 거래부터 [(id, 시각, 구분, 종목, 가격, 수량, 거래 후 현금, 거래 후 보유 수량)]"""
+        with self.pool.connection() as conn:
+            return conn.execute(SQL_SELECT_TRADES_SINCE, (user_id, after_id)).fetchall()
+
+    @contextmanager
+    def _writer(self):
+        """batch() 안이면 그 트랜잭션, 아니면 거래 하나만의 트랜잭션"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+        else:
+            with self.pool.transaction() as conn:
+                yield conn
+
+    def trade(self, user, trade):
+        """
+        거래 하나를 한 트랜잭션에서 반영하고 거래 기록 반환, 실패 시 TradeError (아무것도 바꾸지 않음)
+        현금/보유 수량은 조건부 상대 갱신(money = money - ? WHERE money >= ?)이라 다른 세션의 거래를 덮어쓰지 않음
+        """
+        # 현금은 원 단위 정수로 보관
+        user_id, name, amount = user.user_id, trade.name, round(trade.price * trade.count)
+        with self._writer() as conn:
+            if trade.side == Trade.BUY:
+                if conn.execute(SQL_DEBIT_CASH, (amount, user_id, amount)).rowcount == 0:
+                    user.money, user.realized_pnl = conn.execute(SQL_SELECT_CASH, (user_id,)).fetchone()
+                    raise TradeError(f"잔액 부족: 현재 잔액은 {user.money:,}원입니다.")
+                conn.execute(SQL_ADD_POSITION, (user_id, name, trade.price, trade.count))
+            else:
+                if conn.execute(SQL_REDUCE_POSITION, (trade.count, user_id, name, trade.count)).rowcount == 0:
+                    row = conn.execute(SQL_SELECT_POSITION, (user_id, name)).fetchone()
+                    if row is None:
+                        raise TradeError(f"{user.name}님은 {name}을 보유하고 있지 않습니다.")
+                    raise TradeError(f"현재 {user.name}님의 {name} 보유량은 {row[1]}개입니다. 매도할 수 없습니다.")
+                purchase_price, _ = conn.execute(SQL_SELECT_POSITION, (user_id, name)).fetchone()
+                conn.execute(SQL_CREDIT_CASH, (amount, (trade.price - purchase_price) * trade.count, user_id))
+                conn.execute(SQL_DELETE_EMPTY_POSITION, (user_id, name))
+            # 갱신된 값을 객체로 다시 읽어 옴 (다른 세션의 거래도 반영됨)
+            user.money, user.realized_pnl = conn.execute(SQL_SELECT_CASH, (user_id,)).fetchone()
+            position = conn.execute(SQL_SELECT_POSITION, (user_id, name)).fetchone()
+            count_after = position[1] if position else 0
+            conn.execute(SQL_INSERT_TRADE, (user_id, trade.time.isoformat(), trade.side, name, trade.price, trade.count,
+                                            user.money, count_after))
+        stock = user.stocks.get(name)
+        if position is None:
+            if stock is not None:
+                user.stocks.remove(stock)
+        elif stock is None:
+            user.stocks.append(Stock(name, position[0], position[1]))
+        else:
+            stock.purchase_price, stock.count = position
+        user.ledger.append(trade)
+        return trade
+
+    @contextmanager
+    def atomic(self):
+        """안의 거래를 모두 반영하거나 예외가 나면 하나도 반영하지 않음 (batch() 안이면 SAVEPOINT 로 그 부분만 되돌림)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self.batch():
+                yield
+            return
+        conn.execute("SAVEPOINT atomic")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK TO atomic")
+            conn.execute("RELEASE atomic")
+            raise
+        conn.execute("RELEASE atomic")
+
+    @contextmanager
+    def batch(self):
+        """주문 재생 등 거래가 많을 때 한 트랜잭션으로 기록 (실패한 거래는 그 거래만 반영되지 않음)"""
+        if getattr(self._local, "conn", None) is not None:
+            yield
+            return
+        with self.pool.transaction() as conn:
+            self._local.conn = conn
+            try:
+                yield
+            finally:
+                self._local.conn = None
+
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    """프로세스 전체에서 공유하는 계좌 저장소"""
+    return AccountStore()
+
+
+# 테스트 실행
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AccountStore(os.path.join(tmp, "accounts.db"))
+        user = store.create_user("테스트", 10_000_000)
+        user.buy_stock("삼성전자", 50_000, 10)
+        user.sell_stock("삼성전자", 60_000, 4)
+        loaded = store.load_user("테스트")
+        print(loaded.money, loaded.realized_pnl, [(s.name, s.count) for s in loaded.stocks], len(store.load_trades(loaded.user_id)))
+
+        # 같은 계좌를 두 세션이 따로 불러와 거래해도 서로 덮어쓰지 않음
+        store.create_user("kim", 1_000_000)
+        first, second = store.load_user("kim"), store.load_user("kim")
+        results = [session.buy_stock("삼성전자", 100_000, 5) for session in (first, second, first)]
+        kim = store.load_user("kim")
+        assert kim.money == 0 and kim.stocks.get("삼성전자").count == 10, (kim.money, kim.stocks.get("삼성전자").count)
+        assert "잔액 부족" in results[2] and first.money == 0 and isinstance(kim.money, int)
+        # 두 번째 세션은 자기 객체에 종목이 없어도 DB 에 이미 있으므로 새 종목이 아님
+        assert "새로" in results[0] and "새로" not in results[1], results
+        print("두 세션 거래:", results)
+
+        started = time.perf_counter()
+        with store.batch():
+            for i in range(10_000):
+                user.buy(f"종목{i % 100}", 10, 1)
+        print(f"거래 10,000건 일괄 기록: {time.perf_counter() - started:.3f}초")
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import streamlit as st
+
+# 페이지의 네트워크/모델 작업을 돌리는 스레드 수 (프로세스 전체 공유)
+MAX_WORKERS = 16
+
+
+@st.cache_resource(show_spinner=False)
+def get_executor():
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="page-task")
+
+
+class Job:
+    """백그라운드 작업과, 결과를 그릴 페이지 위치(placeholder)"""
+    __slots__ = ("future", "placeholder", "render", "on_error")
+
+    def __init__(self, future, placeholder, render, on_error):
+        self.future = future
+        self.placeholder = placeholder
+        self.render = render
+        self.on_error = on_error
+
+    def result(self):
+        """결과가 바로 필요할 때 (버튼 처리 등) 기다려서 받음"""
+        return self.future.result()
+
+
+def _show_error(e):
+    st.error(f"⚠️ 오류가 발생했습니다: {e}")
+
+
+def start(fn, *args, render, on_error=_show_error, loading="불러오는 중...", **kwargs):
+    """
+    fn(*args, **kwargs)를 백그라운드에서 시작하고 현재 위치에 자리를 잡아 둠
+    결과는 fill() 에서 render(result) 로 그려짐 (Streamlit 호출은 스크립트 스레드에서만 함)
+    """
+    placeholder = st.empty()
+    if loading:
+        placeholder.caption(f"⏳ {loading}")
+    future = get_executor().submit(fn, *args, **kwargs)
+    return Job(future, placeholder, render, on_error)
+
+
+def view(job, render, on_error=_show_error, loading="불러오는 중..."):
+    """이미 시작한 작업의 결과를 현재 위치에 한 번 더 그림 (같은 작업을 다시 돌리지 않음)"""
+    placeholder = st.empty()
+    if loading:
+        placeholder.caption(f"⏳ {loading}")
+    return Job(job.future, placeholder, render, on_error)
+
+
+def fill(*jobs):
+    """
+    끝나는 순서대로 각 자리를 채움 — 전체 시간은 가장 느린 작업 하나만큼
+    작업이나 render 가 실패하면 그 자리에 on_error 를 그리고 나머지 자리는 계속 채움
+    """
+    by_future = {}
+    for job in jobs:
+        if job is not None:
+            by_future.setdefault(job.future, []).append(job)
+    for future in as_completed(by_future):
+        for job in by_future[future]:
+            with job.placeholder.container():
+                try:
+                    job.render(future.result())
+                except Exception as e:
+                    job.on_error(e)
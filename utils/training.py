@@ -0,0 +1,255 @@
+import copy
+import datetime
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import forecast, inference, models, ohlcv_store
+
+# 학습 데이터 기간과 검증 구간 (마지막 VALIDATION_DAYS 거래일은 학습에 쓰지 않음)
+TRAIN_DAYS = 365 * 5
+VALIDATION_DAYS = 120
+
+# 학습 설정
+EPOCHS = 30
+BATCH_SIZE = 64
+SHUFFLE_BUFFER = 10_000
+PATIENCE = 3
+
+# 학습 결과 저장 위치: model/trained/<모델 키>/v<버전>.h5 (목록은 models.MANIFEST_PATH)
+TRAINED_DIR = "trained"
+
+
+def build_model(window=forecast.WINDOW, features=1):
+    """기존 keras_model_*.h5 와 같은 구조의 LSTM 모델"""
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(window, features)),
+        tf.keras.layers.LSTM(50, activation="relu", return_sequences=True),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.LSTM(60, activation="relu", return_sequences=True),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.LSTM(80, activation="relu", return_sequences=True),
+        tf.keras.layers.Dropout(0.4),
+        tf.keras.layers.LSTM(120, activation="relu"),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer="adam", loss="mean_squared_error")
+    return model
+
+
+def make_dataset(series_list, window=forecast.WINDOW, batch_size=BATCH_SIZE, shuffle=False):
+    """
+    스케일된 종가 시계열들로 (입력 창, 다음 날 값) 데이터셋 생성
+    창은 tf.data 안에서 만들고(메모리에 복사본을 두지 않음), 첫 에폭 후 cache, 학습 중 prefetch
+    """
+    import tensorflow as tf
+
+    datasets, count = [], 0
+    for series in series_list:
+        if len(series) <= window:
+            continue
+        ds = tf.data.Dataset.from_tensor_slices(np.asarray(series, dtype=np.float32)[:, None])
+        datasets.append(ds.window(window + 1, shift=1, drop_remainder=True)
+                        .flat_map(lambda w: w.batch(window + 1)))
+        count += len(series) - window
+    if not datasets:
+        return None
+    ds = datasets[0]
+    for other in datasets[1:]:
+        ds = ds.concatenate(other)
+    # flat_map 뒤에는 길이를 모르므로 알려 줌 (진행 표시/에폭 끝 처리용)
+    ds = ds.apply(tf.data.experimental.assert_cardinality(count))
+    ds = ds.map(lambda w: (w[:window], w[window]), num_parallel_calls=tf.data.AUTOTUNE).cache()
+    if shuffle:
+        ds = ds.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def _safe_name(key):
+    """모델 키를 폴더 이름으로 쓸 수 있게 변환"""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", key)
+
+
+def _load_closes(codes, today, store_dir):
+    """로컬 저장소에서 학습 기간의 종가 (데이터가 부족한 종목은 제외)"""
+    store = ohlcv_store.OHLCVStore(store_dir)
+    start = today - datetime.timedelta(days=TRAIN_DAYS)
+    closes = {}
+    for code in codes:
+        df = store.read_local(f"KRX:{code}", start)
+        df = df.loc[:pd.Timestamp(today)] if not df.empty else df
+        if "Close" in df and len(df) > forecast.WINDOW + VALIDATION_DAYS:
+            closes[code] = df["Close"].dropna()
+    return closes
+
+
+def train_group(key, codes, version, today, store_dir=ohlcv_store.STORE_DIR, model_dir=models.MODEL_DIR,
+                epochs=EPOCHS, threads=None):
+    """
+    종목 묶음 하나(종목 하나 또는 업종 하나)로 모델을 학습해 저장하고 매니페스트 항목 반환
+    스케일러는 종목마다 학습 구간의 최저/최고가로 맞춤 (검증 구간 정보가 섞이지 않게)
+    """
+    import tensorflow as tf
+    from utils import evaluation
+
+    if threads:
+        # 여러 프로세스가 코어를 나눠 쓰도록 프로세스당 스레드 수 제한
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    closes = _load_closes(codes, today, store_dir)
+    if not closes:
+        return None
+
+    scaler, train_series, valid_series = {}, [], []
+    for code, close in closes.items():
+        values = close.to_numpy(dtype=float)
+        split = len(values) - VALIDATION_DAYS
+        low, high = float(values[:split].min()), float(values[:split].max())
+        scaler[code] = {"min": low, "max": high}
+        scaled = forecast.scale(values, scaler[code])
+        train_series.append(scaled[:split])
+        valid_series.append(scaled[split - forecast.WINDOW:])
+
+    train_ds = make_dataset(train_series, shuffle=True)
+    valid_ds = make_dataset(valid_series)
+    model = build_model()
+    stop = tf.keras.callbacks.EarlyStopping(patience=PATIENCE, restore_best_weights=True)
+    history = model.fit(train_ds, validation_data=valid_ds, epochs=epochs, callbacks=[stop], verbose=0)
+
+    # 앱과 같은 방식(걸어가며 예측)으로 검증 구간 정확도 측정
+    horizon_scores = []
+    for code, close in closes.items():
+        pred, actual, last_close = evaluation.walk_forward(model, close.to_numpy()[-(VALIDATION_DAYS + forecast.WINDOW):],
+                                                           scaler=scaler[code])
+        horizon_scores.append(evaluation.score(pred, actual, last_close).set_index("기간(일)"))
+    mean_scores = sum(horizon_scores) / len(horizon_scores)
+
+    relative_path = os.path.join(TRAINED_DIR, _safe_name(key), f"v{version}.h5")
+    path = os.path.join(model_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    model.save(path)
+    # 가벼운 추론 백엔드용 변환 파일도 함께 저장
+    inference.export(path, model=model)
+
+    first = min(close.index[0] for close in closes.values())
+    last = max(close.index[-1] for close in closes.values())
+    return {
+        "version": version,
+        "path": relative_path,
+        "tickers": list(closes),
+        "scaler": scaler,
+        "train_start": str(first.date()),
+        "train_end": str(last.date()),
+        "validation_days": VALIDATION_DAYS,
+        "epochs": len(history.history["loss"]),
+        "metrics": {
+            "val_loss": float(min(history.history["val_loss"])),
+            "horizons": {str(h): {name: float(value) for name, value in row.items()} for h, row in mean_scores.iterrows()},
+        },
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def fit_scalers(codes, today=None, store_dir=ohlcv_store.STORE_DIR):
+    """
+    전용 모델이 없어 기본 모델로 예측하는 종목의 스케일러를 학습 기간 종가의 최저/최고가로 맞춰 scalers.json 에 저장
+    예측 서비스는 이 값(또는 매니페스트의 값)을 읽기만 함
+    """
+    today = today or datetime.date.today()
+    fitted = {}
+    for code, close in _load_closes(codes, today, store_dir).items():
+        key = models.model_key_for(code)
+        info = models.model_info(key)
+        if info is not None and code in info.get("scaler", {}):
+            continue
+        fitted.setdefault(key, {})[code] = forecast.fit_scaler(close.to_numpy())
+    for key, scalers in fitted.items():
+        models.save_scalers(key, scalers)
+        print(f"{key}: 종목 {len(scalers)}개 스케일러 저장")
+    return fitted
+
+
+def _train_job(job):
+    key, codes, version, today, store_dir, model_dir, epochs, threads = job
+    try:
+        return key, train_group(key, codes, version, today, store_dir, model_dir, epochs, threads), None
+    except Exception as e:
+        return key, None, str(e)
+
+
+def save_manifest(manifest, model_dir=models.MODEL_DIR):
+    path = os.path.join(model_dir, os.path.basename(models.MANIFEST_PATH))
+    os.makedirs(model_dir, exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def sector_groups(codes):
+    """상장 목록의 업종별로 종목을 묶음 (업종 정보가 없으면 종목별)"""
+    from utils import listing
+
+    stock_info = listing.load_listing()
+    if "업종" not in stock_info:
+        return {code: [code] for code in codes}
+    sectors = dict(zip(stock_info["종목코드"].astype(str).str.zfill(6), stock_info["업종"].astype(str)))
+    groups = {}
+    for code in codes:
+        groups.setdefault(sectors.get(code, code), []).append(code)
+    return groups
+
+
+def train(groups, today=None, store_dir=ohlcv_store.STORE_DIR, model_dir=models.MODEL_DIR, epochs=EPOCHS, processes=None):
+    """
+    {모델 키: [종목코드, ...]} 묶음마다 별도 프로세스(CPU)에서 학습하고 매니페스트 갱신
+    이전 버전 파일은 지우지 않고 매니페스트에 이력으로 남김 (앱은 마지막 버전을 사용)
+    """
+    today = today or datetime.date.today()
+    processes = max(1, min(processes or os.cpu_count() or 1, len(groups)))
+    threads = max(1, (os.cpu_count() or 1) // processes)
+    # 공유 캐시를 고치지 않도록 복사해서 갱신
+    manifest = copy.deepcopy(models.load_manifest(os.path.join(model_dir, os.path.basename(models.MANIFEST_PATH))))
+    jobs = [(key, codes, len(manifest["models"].get(key, [])) + 1, today, store_dir, model_dir, epochs, threads)
+            for key, codes in groups.items()]
+
+    # TensorFlow 는 fork 후 안전하지 않으므로 spawn 으로 새 프로세스 시작
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for key, entry, error in pool.map(_train_job, jobs):
+            if entry is None:
+                print(f"학습 실패 ({key}): {error or '데이터 부족'}")
+                continue
+            manifest["models"].setdefault(key, []).append(entry)
+            for code in entry["tickers"]:
+                manifest["tickers"][code] = key
+            # 묶음 하나가 끝날 때마다 저장해 중간에 멈춰도 결과가 남게 함
+            save_manifest(manifest, model_dir)
+            print(f"{key} v{entry['version']}: val_loss {entry['metrics']['val_loss']:.5f}")
+    return manifest
+
+
+# 배치 실행: python -m utils.training 005930 000660 [--sector] [--epochs N] [--processes N] [--scalers]
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="종목별/업종별 LSTM 모델 학습")
+    parser.add_argument("codes", nargs="*", help="종목코드 (생략 시 로컬 저장소의 모든 종목)")
+    parser.add_argument("--sector", action="store_true", help="업종별로 묶어서 학습")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--scalers", action="store_true", help="학습 없이 기본 모델용 종목 스케일러만 저장")
+    args = parser.parse_args()
+
+    codes = args.codes or sorted(name[len("KRX_"):-len(".parquet")] for name in os.listdir(ohlcv_store.STORE_DIR)
+                                 if name.startswith("KRX_") and name.endswith(".parquet"))
+    if args.scalers:
+        fit_scalers(codes)
+    else:
+        groups = sector_groups(codes) if args.sector else {code: [code] for code in codes}
+        train(groups, epochs=args.epochs, processes=args.processes)